@@ -0,0 +1,469 @@
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from markdown_it import MarkdownIt
+
+# Docling Ray output layout (see examples/ray/data/docling/ray_data_process.py)
+DOCLING_MARKDOWN_DIR = "markdown"
+DOCLING_PARQUET_GLOB = "parquet/run-*/*.parquet"
+
+DEFAULT_ENCODING = "cl100k_base"
+BLOCK_SEPARATOR = "\n\n"  # between blocks in a chunk
+
+# A document source: a path, or an iterable of Markdown strings or
+# (filename, markdown) pairs
+Source = Union[str, Path, Iterable[Union[str, Tuple[str, str]]]]
+
+
+@cache
+def get_encoding(name: str = DEFAULT_ENCODING) -> Any:
+    """Build a tiktoken encoding once per process and reuse it."""
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+
+def _resolve_encoding(encoding: Any) -> Any:
+    """Accept an encoding name or any object with encode/decode methods."""
+    return get_encoding(encoding) if isinstance(encoding, str) else encoding
+
+
+def _encode(encoding: Any, text: str) -> List[int]:
+    # Special-token strings in a document are plain text, not control tokens
+    return getattr(encoding, "encode_ordinary", encoding.encode)(text)
+
+
+def _char_boundary(encoding: Any, ids: List[int], offset: int, lower: int) -> int:
+    """
+    Move a cut back to the nearest offset in (lower, offset] that does not
+    split a UTF-8 character, i.e. whose next token does not begin with a
+    continuation byte.  Encodings without byte-level tokens never split
+    characters; if no such offset exists the cut is left where it is.
+    """
+    token_bytes = getattr(encoding, "decode_single_token_bytes", None)
+    if token_bytes is None:
+        return offset
+    cut = offset
+    while cut > lower and cut < len(ids):
+        first = token_bytes(ids[cut])[:1]
+        if not first or not 0x80 <= first[0] <= 0xBF:
+            return cut
+        cut -= 1
+    return offset if cut <= lower else cut
+
+
+def markdown_blocks(text: str) -> List[str]:
+    """
+    Split Markdown text into block-level elements.
+
+    Headings, paragraphs, list items, tables, code and blockquotes each
+    become one block, so chunk boundaries never fall inside them.
+
+    Args:
+        text: The markdown text to split
+
+    Returns:
+        List of block texts in document order
+    """
+    blocks = []
+    buf = []
+    for tok in MarkdownIt().parse(text):
+        if tok.block and tok.type.endswith("_open"):
+            buf = []
+        elif tok.block and tok.type.endswith("_close"):
+            if buf:
+                blocks.append("\n".join(buf).strip())
+                buf = []
+        elif tok.content:
+            buf.append(tok.content)
+    if buf:
+        blocks.append("\n".join(buf).strip())
+    return [block for block in blocks if block]
+
+
+def chunk_markdown(
+    text: str,
+    min_tokens: int = 6000,
+    max_tokens: int = 8000,
+    overlap: int = 1000,
+    encoding: Any = DEFAULT_ENCODING,
+) -> List[Dict[str, Any]]:
+    """
+    Split Markdown text into chunks of min_tokens to max_tokens tokens.
+
+    Blocks are encoded once into a single token stream, and the prefix sums
+    of their token counts give the offset where each block ends.  Each
+    chunk ends at the last block boundary within max_tokens, or is cut at
+    max_tokens if that boundary would leave it shorter than min_tokens.
+    The next chunk starts exactly overlap tokens before the end of the
+    previous one.  Cuts inside a block are moved back to the nearest token
+    that starts a character, so byte-level encodings never split a
+    multi-byte character (the overlap can then be a few tokens longer).
+    Boundaries are scanned once, so packing is linear in the number of
+    blocks, and chunk sizes are exact without encoding the chunks again.
+    Only the final chunk may be shorter than min_tokens.
+
+    Args:
+        text: The markdown text to be chunked
+        min_tokens: Minimum number of tokens per chunk (except the last)
+        max_tokens: Maximum number of tokens per chunk
+        overlap: Number of tokens repeated from the previous chunk
+        encoding: tiktoken encoding name, or an object with encode/decode
+
+    Returns:
+        List of {"chunk", "num_tokens"} dicts
+    """
+    if not 0 <= overlap < min_tokens <= max_tokens:
+        raise ValueError("Expected 0 <= overlap < min_tokens <= max_tokens")
+    encoding = _resolve_encoding(encoding)
+
+    separator = _encode(encoding, BLOCK_SEPARATOR)
+    ids: List[int] = []
+    boundaries = []  # prefix sums: token offset where each block ends
+    for block in markdown_blocks(text):
+        if ids:
+            ids.extend(separator)
+        ids.extend(_encode(encoding, block))
+        boundaries.append(len(ids))
+
+    spans = []
+    start, next_boundary = 0, 0
+    while len(ids) - start > max_tokens:
+        limit = start + max_tokens
+        while next_boundary < len(boundaries) and boundaries[next_boundary] <= limit:
+            next_boundary += 1
+        end = boundaries[next_boundary - 1] if next_boundary else 0
+        at_boundary = end >= start + min_tokens
+        if not at_boundary:
+            # No block boundary in range: cut inside the block
+            end = _char_boundary(encoding, ids, limit, start + overlap)
+        spans.append((start, end))
+        if at_boundary and not overlap:
+            start = end + len(separator)  # open the next chunk at its first block
+        else:
+            start = _char_boundary(encoding, ids, end - overlap, start)
+    if start < len(ids):
+        spans.append((start, len(ids)))
+
+    return [
+        {"chunk": encoding.decode(ids[start:end]), "num_tokens": end - start}
+        for start, end in spans
+    ]
+
+
+def _markdown_files(root: Path) -> Iterator[Tuple[str, str]]:
+    for path in sorted(root.rglob("*.md")):
+        yield str(path.relative_to(root)), path.read_text(encoding="utf-8")
+
+
+def _parquet_documents(files: List[Path]) -> Iterator[Tuple[str, str]]:
+    """
+    Successful documents of Parquet files with a markdown column.
+
+    Whole-document rows are yielded as they are read.  Page-range rows of a
+    document that has no whole-document row are joined in page order once
+    every file is read; the first file holding a page range wins.
+
+    Raises:
+        ValueError: If the successful page ranges of such a document do not
+            cover all of its pages
+    """
+    whole = set()
+    parts: Dict[str, Tuple[Dict[int, Tuple[int, str]], int]] = {}
+    for path in files:
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        columns = [
+            c
+            for c in ("filename", "page_range", "status", "source_pages")
+            if c in names
+        ]
+        for batch in parquet_file.iter_batches(
+            batch_size=64, columns=["markdown", *columns]
+        ):
+            for i, row in enumerate(batch.to_pylist()):
+                if row.get("status", "success") != "success":
+                    continue
+                filename = row.get("filename") or f"{path.name}:{i}"
+                if row.get("page_range"):
+                    start, end = map(int, row["page_range"].split("-"))
+                    ranges, _ = parts.setdefault(
+                        filename, ({}, row.get("source_pages") or 0)
+                    )
+                    ranges.setdefault(start, (end, row["markdown"] or ""))
+                elif row["markdown"]:
+                    whole.add(filename)
+                    yield filename, row["markdown"]
+
+    for filename, (ranges, num_pages) in parts.items():
+        if filename in whole:
+            continue
+        markdown, next_page = [], 1
+        while next_page in ranges:
+            end, text = ranges[next_page]
+            markdown.append(text)
+            next_page = end + 1
+        if next_page == 1 or (num_pages and next_page != num_pages + 1):
+            raise ValueError(
+                f"Page ranges of {filename} do not cover pages 1-{num_pages or '?'};"
+                " convert it again"
+            )
+        yield filename, BLOCK_SEPARATOR.join(markdown)
+
+
+def iter_markdown_documents(source: Source) -> Iterator[Tuple[str, str]]:
+    """
+    Stream Markdown documents as (filename, markdown) pairs.
+
+    Args:
+        source: One of
+            - a Docling Ray output directory: Markdown files under markdown/
+              and, with OUTPUT_FORMAT=parquet, the markdown column of
+              parquet/run-*/ shards (newest run first, page-range rows of
+              a sharded document joined in page order)
+            - any other directory, searched recursively for .md files
+            - a single .md or .parquet file
+            - an iterable of Markdown strings or (filename, markdown) pairs
+
+    Returns:
+        Iterator of (filename, markdown), each filename yielded once
+    """
+    if not isinstance(source, (str, Path)):
+        for i, doc in enumerate(source):
+            yield (f"document-{i:05d}", doc) if isinstance(doc, str) else tuple(doc)
+        return
+
+    path = Path(source)
+    if path.suffix == ".md":
+        docs = iter([(path.name, path.read_text(encoding="utf-8"))])
+    elif path.suffix == ".parquet":
+        docs = _parquet_documents([path])
+    else:
+        markdown_dir = path / DOCLING_MARKDOWN_DIR
+        parquet_files = sorted(path.glob(DOCLING_PARQUET_GLOB), reverse=True)
+        if markdown_dir.is_dir() or parquet_files:
+            docs = chain(
+                _parquet_documents(parquet_files),
+                _markdown_files(markdown_dir) if markdown_dir.is_dir() else [],
+            )
+        else:
+            docs = _markdown_files(path)
+
+    seen = set()
+    for filename, markdown in docs:
+        if filename not in seen:
+            seen.add(filename)
+            yield filename, markdown
+
+
+_worker_encoding: Any = None
+
+
+def _init_chunk_worker(encoding: Any) -> None:
+    global _worker_encoding
+    _worker_encoding = _resolve_encoding(encoding)
+
+
+def _chunk_document(
+    doc: Tuple[str, str],
+    min_tokens: int,
+    max_tokens: int,
+    overlap: int,
+    encoding: Any = None,
+    source_key: str = "",
+) -> List[Dict[str, Any]]:
+    filename, markdown = doc
+    if encoding is None:
+        encoding = _worker_encoding
+    chunks = chunk_markdown(markdown, min_tokens, max_tokens, overlap, encoding)
+    return [
+        {"filename": filename, "chunk_index": i, **chunk, "source_key": source_key}
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def _source_key(markdown: str, params: str) -> str:
+    """Identify a document's content and the settings it was chunked with."""
+    digest = hashlib.sha256(params.encode())
+    digest.update(markdown.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()[:16]
+
+
+def _chunk_in_worker(args: Tuple) -> List[Dict[str, Any]]:
+    return _chunk_document(*args)
+
+
+def _write_shard(records: List[Dict[str, Any]], path: Path) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    if path.suffix == ".parquet":
+        pq.write_table(pa.Table.from_pylist(records), tmp_path)
+    else:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    tmp_path.replace(path)
+
+
+def _read_shard(path: Path, columns: Optional[List[str]] = None) -> List[Dict]:
+    """Read a shard's records; requested columns it lacks read as None."""
+    if path.suffix == ".parquet":
+        names = pq.read_schema(path).names
+        records = pq.read_table(
+            path, columns=[c for c in columns if c in names] if columns else None
+        ).to_pylist()
+    else:
+        with path.open(encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+    if columns:
+        records = [{c: r.get(c) for c in columns} for r in records]
+    return records
+
+
+def _drop_stale_chunks(shards: List[Path], current: Dict[str, str]) -> List[Path]:
+    """Rewrite shards without the chunks of superseded document versions.
+
+    A record is stale when its filename is in ``current`` with a different
+    source key.  Shards left empty are deleted; the remaining are returned.
+    """
+    kept = []
+    for shard in shards:
+        records = _read_shard(shard)
+        fresh = [
+            r
+            for r in records
+            if current.get(r["filename"], r.get("source_key")) == r.get("source_key")
+        ]
+        if len(fresh) == len(records):
+            kept.append(shard)
+        elif fresh:
+            _write_shard(fresh, shard)
+            kept.append(shard)
+        else:
+            shard.unlink()
+    return kept
+
+
+def chunk_documents(
+    source: Source,
+    output_dir: Union[str, Path],
+    min_tokens: int = 6000,
+    max_tokens: int = 8000,
+    overlap: int = 1000,
+    encoding: Any = DEFAULT_ENCODING,
+    num_proc: Optional[int] = None,
+    shard_size: int = 1000,
+    output_format: str = "jsonl",
+) -> List[Path]:
+    """
+    Chunk Markdown documents in parallel and write the chunks as shards.
+
+    Documents are streamed from source and chunked in a process pool, each
+    worker building its encoding once.  Chunks are written to
+    chunks-NNNNN.<jsonl|parquet> shards of about shard_size chunks as they
+    are produced.  Each chunk records a source_key, a hash of its
+    document's Markdown, the token range, the overlap and the encoding.
+    Documents already chunked in output_dir with the same source_key are
+    skipped, so an interrupted or extended run picks up where it left off.
+    A document whose content or chunk settings changed is chunked again and
+    its earlier chunks are removed from the old shards.
+
+    Args:
+        source: Directory, file or iterable accepted by iter_markdown_documents
+        output_dir: Directory for the chunk shards
+        min_tokens: Minimum number of tokens per chunk (except a
+            document's last)
+        max_tokens: Maximum number of tokens per chunk
+        overlap: Number of tokens repeated from the previous chunk
+        encoding: tiktoken encoding name, or a picklable object with
+            encode/decode methods
+        num_proc: Number of worker processes (None or 1 = chunk in-process)
+        shard_size: Chunks per shard; a document is never split across shards
+        output_format: "jsonl" or "parquet"
+
+    Returns:
+        Paths of all shards in output_dir, including earlier runs'
+    """
+    if output_format not in ("jsonl", "parquet"):
+        raise ValueError(f"Unsupported output format: {output_format}")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = sorted(output_dir.glob("chunks-*.jsonl")) + sorted(
+        output_dir.glob("chunks-*.parquet")
+    )
+    done: Dict[str, set] = {}  # filename -> source keys of its chunks
+    for shard in shards:
+        for r in _read_shard(shard, columns=["filename", "source_key"]):
+            done.setdefault(r["filename"], set()).add(r["source_key"])
+    # Continue after the highest shard number, even if earlier ones are gone
+    next_index = max((int(p.stem.split("-")[-1]) + 1 for p in shards), default=0)
+
+    encoding_name = (
+        encoding if isinstance(encoding, str) else getattr(encoding, "name", "")
+    ) or type(encoding).__name__
+    params = json.dumps([min_tokens, max_tokens, overlap, encoding_name])
+    superseded: Dict[str, str] = {}  # filename -> current key, for stale chunks
+
+    def pending_docs() -> Iterator[Tuple[Tuple[str, str], str]]:
+        for doc in iter_markdown_documents(source):
+            key = _source_key(doc[1], params)
+            keys = done.get(doc[0], set())
+            if keys - {key}:
+                superseded[doc[0]] = key
+            if key not in keys:
+                yield doc, key
+
+    docs = pending_docs()
+
+    pool = None
+    if num_proc and num_proc > 1:
+        pool = ProcessPoolExecutor(
+            num_proc, initializer=_init_chunk_worker, initargs=(encoding,)
+        )
+        encoding = None
+    else:
+        encoding = _resolve_encoding(encoding)
+
+    buffer: List[Dict[str, Any]] = []
+    new_shards = []
+
+    def flush() -> None:
+        nonlocal buffer, next_index
+        path = output_dir / f"chunks-{next_index:05d}.{output_format}"
+        _write_shard(buffer, path)
+        new_shards.append(path)
+        buffer, next_index = [], next_index + 1
+
+    try:
+        # Submit a bounded window at a time so the source is read lazily
+        window = (num_proc or 1) * 16
+        while batch := list(islice(docs, window)):
+            args = [
+                (doc, min_tokens, max_tokens, overlap, encoding, key)
+                for doc, key in batch
+            ]
+            if pool is not None:
+                results = pool.map(_chunk_in_worker, args)
+            else:
+                results = (_chunk_document(*a) for a in args)
+            for records in results:
+                buffer.extend(records)
+                if len(buffer) >= shard_size:
+                    flush()
+        if buffer:
+            flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Only after the new chunks are written, so a crash never loses both
+    if superseded:
+        shards = _drop_stale_chunks(shards, superseded)
+    return shards + new_shards
@@ -1,15 +1,82 @@
-import json
-from typing import Any, List, Optional
+import hashlib
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, Union
 
 import polars as pl
 
+# Eager or lazy input; functions taking a Frame return the same kind
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
 
-def get_avg_summaries_per_raw_doc(df: pl.DataFrame) -> float:
+
+def _column_names(df: Union[pl.DataFrame, pl.LazyFrame]) -> List[str]:
+    """Column names without materialising a LazyFrame."""
+    if isinstance(df, pl.LazyFrame):
+        return df.collect_schema().names()
+    return df.columns
+
+
+def scan_generated_data(
+    path: Union[str, Path], columns: Optional[List[str]] = None
+) -> pl.LazyFrame:
+    """
+    Lazily scan generated data from NDJSON or Parquet files.
+
+    Args:
+        path: A .jsonl/.json/.parquet file, or a directory searched
+            recursively for Parquet files (preferred) or JSON lines files
+        columns: Columns to keep; the selection is pushed down into the scan
+
+    Returns:
+        LazyFrame over all matching files
+    """
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(path.glob("**/*.parquet")) or sorted(
+            p for p in path.glob("**/*") if p.suffix in (".jsonl", ".json")
+        )
+    else:
+        files = [path]
+    if not files:
+        raise FileNotFoundError(f"No Parquet or JSON lines files found in {path}")
+
+    if files[0].suffix == ".parquet":
+        lf = pl.scan_parquet(files)
+    else:
+        lf = pl.scan_ndjson(files)
+    return lf.select(columns) if columns else lf
+
+
+def sink_training_mix(
+    datasets: List[Union[pl.DataFrame, pl.LazyFrame]], path: Union[str, Path]
+) -> None:
+    """
+    Concatenate datasets into one training mix and write it to disk.
+
+    Lazy inputs run on the streaming engine, so the mix is written without
+    ever being held in memory as a whole.
+
+    Args:
+        datasets: Knowledge datasets to combine; missing columns are null-filled
+        path: Output file, Parquet for a .parquet suffix, JSON lines otherwise
+    """
+    mix = pl.concat([ds.lazy() for ds in datasets], how="diagonal_relaxed")
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if Path(path).suffix == ".parquet":
+        mix.sink_parquet(path)
+    else:
+        mix.sink_ndjson(path)
+
+
+def get_avg_summaries_per_raw_doc(df: Union[pl.DataFrame, pl.LazyFrame]) -> float:
     """
     Calculate average summaries per raw document in the dataset.
 
     Args:
-        df: Input dataframe with document and raw_document columns
+        df: Input dataframe (or LazyFrame) with document and raw_document columns
 
     Returns:
         Average number of summaries per raw document
@@ -18,28 +85,31 @@ def get_avg_summaries_per_raw_doc(df: pl.DataFrame) -> float:
     summary_counts = df.group_by("raw_document").agg(
         pl.col("document").n_unique().alias("unique_summaries")
     )
+    if isinstance(summary_counts, pl.LazyFrame):
+        return (
+            summary_counts.select(pl.col("unique_summaries").mean())
+            .collect(engine="streaming")
+            .item()
+        )
     avg_summaries = summary_counts["unique_summaries"].mean()
 
     return avg_summaries
 
 
-def sample_doc_qa(
-    df: pl.DataFrame, n_docs_per_raw: int = 50, qa_per_doc: int = 3
-) -> pl.DataFrame:
-    """
-    Sample Q&A pairs from documents with optional reasoning.
+def _summary_key(seed: int) -> pl.Expr:
+    """Seeded random sort key of each summary, derived from its text.
 
-    Note: 'document' column contains summaries, 'raw_document' contains original documents.
-    n_docs_per_raw is the number of unique summaries to sample per raw document.
+    The key depends only on the text and seed, so a given seed picks the
+    same summaries in any row order, eager or lazy.  Expr.hash may change
+    between Polars versions, which can change the sample but not its size.
+    """
+    return pl.col("document").hash(seed=seed)
 
-    Args:
-        df: Input dataframe with document and Q&A data
-        n_docs_per_raw: Maximum number of unique summaries to sample per raw document (cut size)
-        qa_per_doc: Maximum number of Q&A pairs per document/summary
 
-    Returns:
-        Sampled dataframe with Q&A pairs
-    """
+def _sample_ranked(
+    df: Frame, cut_sizes: List[int], qa_per_doc: int, seed: int
+) -> Frame:
+    """Sample summaries for the largest cut, keeping their summary_rank."""
     # Validate required columns
     required_cols = [
         "question",
@@ -48,16 +118,19 @@ def sample_doc_qa(
         "raw_document",
         "document_outline",
     ]
-    missing_cols = [col for col in required_cols if col not in df.columns]
+    columns = _column_names(df)
+    missing_cols = [col for col in required_cols if col not in columns]
     if missing_cols:
         raise ValueError(f"Missing required columns: {missing_cols}")
 
-    # Check if cut size is feasible
-    avg_summaries = get_avg_summaries_per_raw_doc(df)
-    if avg_summaries < n_docs_per_raw:
-        print(
-            f"⚠️ Warning: Cut size {n_docs_per_raw} exceeds available summaries (avg: {avg_summaries:.1f} per raw document)"
-        )
+    # Check if cut sizes are feasible; a LazyFrame is not collected for this
+    if isinstance(df, pl.DataFrame):
+        avg_summaries = get_avg_summaries_per_raw_doc(df)
+        for cut in cut_sizes:
+            if avg_summaries < cut:
+                print(
+                    f"⚠️ Warning: Cut size {cut} exceeds available summaries (avg: {avg_summaries:.1f} per raw document)"
+                )
 
     # Create Q&A pair structure
     df = df.with_columns([pl.struct(["question", "response"]).alias("qa_pair")])
@@ -69,7 +142,7 @@ def sample_doc_qa(
         pl.col("document_outline").first(),
     ]
 
-    if "parse_response_dict_reasoning_content" in df.columns:
+    if "parse_response_dict_reasoning_content" in columns:
         df = df.with_columns([
             pl.col("parse_response_dict_reasoning_content").alias("reasoning")
         ])
@@ -78,9 +151,13 @@ def sample_doc_qa(
     # Group by document (summaries) and aggregate Q&A pairs
     df = df.group_by("document").agg(agg_cols)
 
-    # Sample unique summaries per raw document
-    sampled_docs = df.group_by("raw_document").map_groups(
-        lambda g: g.sample(n=min(n_docs_per_raw, g.height))
+    # Sample unique summaries per raw document: keep the first n of a
+    # seeded random ranking within each raw document
+    sampled_docs = (
+        df.with_columns(_summary_key(seed).alias("summary_rank"))
+        .with_columns(pl.col("summary_rank").rank("ordinal").over("raw_document"))
+        .filter(pl.col("summary_rank") <= max(cut_sizes))
+        .sort("raw_document", "summary_rank")
     )
 
     # Limit Q&A pairs per summary and explode
@@ -97,6 +174,58 @@ def sample_doc_qa(
     return sampled_docs
 
 
+def sample_doc_qa(
+    df: Frame, n_docs_per_raw: int = 50, qa_per_doc: int = 3, seed: int = 42
+) -> Frame:
+    """
+    Sample Q&A pairs from documents with optional reasoning.
+
+    Note: 'document' column contains summaries, 'raw_document' contains original documents.
+    n_docs_per_raw is the number of unique summaries to sample per raw document.
+
+    Args:
+        df: Input dataframe (or LazyFrame) with document and Q&A data
+        n_docs_per_raw: Maximum number of unique summaries to sample per raw document (cut size)
+        qa_per_doc: Maximum number of Q&A pairs per document/summary
+        seed: Seed of the per-raw-document summary sampling
+
+    Returns:
+        Sampled dataframe with Q&A pairs, lazy if the input was lazy
+    """
+    return _sample_ranked(df, [n_docs_per_raw], qa_per_doc, seed).drop("summary_rank")
+
+
+def sample_doc_qa_cuts(
+    df: Frame, cut_sizes: List[int], qa_per_doc: int = 3, seed: int = 42
+) -> Frame:
+    """
+    Sample Q&A pairs for several cut sizes at once.
+
+    All cuts share one seeded ranking, so smaller cuts are subsets of
+    larger ones.  Each row appears once, with a min_cut column holding the
+    smallest cut that includes it; filtering min_cut <= cut gives exactly
+    sample_doc_qa(df, cut, qa_per_doc, seed).
+
+    Args:
+        df: Input dataframe (or LazyFrame) with document and Q&A data
+        cut_sizes: Cut sizes (summaries per raw document) to sample
+        qa_per_doc: Maximum number of Q&A pairs per document/summary
+        seed: Seed of the per-raw-document summary sampling
+
+    Returns:
+        Sampled dataframe for the largest cut with a min_cut column
+    """
+    cuts = sorted(set(cut_sizes))
+    min_cut = pl.when(pl.col("summary_rank") <= cuts[0]).then(cuts[0])
+    for cut in cuts[1:]:
+        min_cut = min_cut.when(pl.col("summary_rank") <= cut).then(cut)
+    return (
+        _sample_ranked(df, cuts, qa_per_doc, seed)
+        .with_columns(min_cut.alias("min_cut"))
+        .drop("summary_rank")
+    )
+
+
 def _clean_response_text(df: pl.DataFrame) -> pl.DataFrame:
     """Clean response text by removing markers and whitespace."""
     return df.with_columns(
@@ -108,7 +237,7 @@ def _clean_response_text(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def _create_metadata(df: pl.DataFrame) -> pl.Expr:
+def _create_metadata() -> pl.Expr:
     """Create metadata JSON structure."""
     return (
         pl.struct([
@@ -116,79 +245,49 @@ def _create_metadata(df: pl.DataFrame) -> pl.Expr:
             pl.lit("document_knowledge_qa").alias("dataset"),
             pl.col("raw_document"),
         ])
-        .map_elements(json.dumps)
+        .struct.json_encode()
         .alias("metadata")
     )
 
 
-def _create_messages_with_reasoning(record: dict) -> List[dict]:
-    """Create message structure with reasoning (thinking)."""
-    return [
-        {
-            "role": "user",
-            "content": f"{record['document_outline']}\n{record['document']}\n\n{record['question']}",
-            "thinking": None,
-        },
-        {
-            "role": "assistant",
-            "content": record["response"],
-            "thinking": record["reasoning"],
-        },
-    ]
-
-
-def _create_messages_with_reasoning_no_document(record: dict) -> List[dict]:
-    """Create message structure with reasoning."""
-    return [
-        {
-            "role": "user",
-            "content": f"In {record['document_outline']}, {record['question']}",
-            "thinking": None,
-        },
-        {
-            "role": "assistant",
-            "content": record["response"],
-            "thinking": record["reasoning"],
-        },
-    ]
-
-
-def _create_messages_without_reasoning(record: dict) -> List[dict]:
-    """Create message structure without reasoning."""
-    return [
-        {
-            "role": "user",
-            "content": f"{record['document_outline']}\n{record['document']}\n\n{record['question']}",
-            "thinking": None,
-        },
-        {"role": "assistant", "content": record["response"], "thinking": ""},
-    ]
-
+def _create_messages(has_reasoning: bool, keep_document_in_context: bool) -> pl.Expr:
+    """Create the user/assistant message list as a native Polars expression."""
+    if keep_document_in_context:
+        user_content = pl.format(
+            "{}\n{}\n\n{}", "document_outline", "document", "question"
+        )
+    else:
+        user_content = pl.format("In {}, {}", "document_outline", "question")
+    thinking = pl.col("reasoning") if has_reasoning else pl.lit("")
 
-def _create_messages_without_reasoning_no_document(record: dict) -> List[dict]:
-    """Create message structure without reasoning."""
-    return [
-        {
-            "role": "user",
-            "content": f"In {record['document_outline']}, {record['question']}",
-            "thinking": None,
-        },
-        {"role": "assistant", "content": record["response"], "thinking": ""},
-    ]
+    user = pl.struct(
+        role=pl.lit("user"),
+        content=user_content,
+        thinking=pl.lit(None, dtype=pl.String),
+    )
+    assistant = pl.struct(
+        role=pl.lit("assistant"),
+        content=pl.col("response"),
+        thinking=thinking.cast(pl.String),
+    )
+    return pl.concat_list([user, assistant]).alias("messages")
 
 
 def generate_knowledge_qa_dataset(
-    generated_dataset: pl.DataFrame,
+    generated_dataset: Frame,
     keep_columns: Optional[List[str]] = None,
     pre_training: bool = False,
     dataset_name: str = "document_knowledge_qa",
     keep_document_in_context: bool = False,
-) -> pl.DataFrame:
+) -> Frame:
     """
     Generate knowledge Q&A dataset in chat format.
 
+    Built from native Polars expressions only, so a LazyFrame input stays
+    lazy and can be streamed.
+
     Args:
-        generated_dataset: Input dataframe with Q&A data
+        generated_dataset: Input dataframe (or LazyFrame) with Q&A data
         keep_columns: Additional columns to keep in output
         pre_training: Whether to add unmask column for pre-training
         dataset_name: Name for the dataset metadata
@@ -207,64 +306,20 @@ def generate_knowledge_qa_dataset(
         "document_outline",
         "raw_document",
     ]
-    missing_cols = [
-        col for col in required_cols if col not in generated_dataset.columns
-    ]
+    columns = _column_names(generated_dataset)
+    missing_cols = [col for col in required_cols if col not in columns]
     if missing_cols:
         raise ValueError(f"Missing required columns: {missing_cols}")
 
     # Clean response text
     generated_dataset = _clean_response_text(generated_dataset)
 
-    # Create base columns
-    base_columns = [_create_metadata(generated_dataset)]
-
-    # Handle reasoning column
-    has_reasoning = "reasoning" in generated_dataset.columns
-
     # TODO: Fix the name of reasoning column, test with reasoning model
-    if has_reasoning and not keep_document_in_context:
-        message_columns = [
-            "question",
-            "response",
-            "document",
-            "document_outline",
-            "reasoning",
-        ]
-        messages_expr = (
-            pl.struct(message_columns)
-            .map_elements(_create_messages_with_reasoning_no_document)
-            .alias("messages")
-        )
-    elif has_reasoning and keep_document_in_context:
-        message_columns = [
-            "question",
-            "response",
-            "document",
-            "document_outline",
-            "reasoning",
-        ]
-        messages_expr = (
-            pl.struct(message_columns)
-            .map_elements(_create_messages_with_reasoning)
-            .alias("messages")
-        )
-    elif keep_document_in_context:
-        message_columns = ["question", "response", "document", "document_outline"]
-        messages_expr = (
-            pl.struct(message_columns)
-            .map_elements(_create_messages_without_reasoning)
-            .alias("messages")
-        )
-    else:
-        message_columns = ["question", "response", "document", "document_outline"]
-        messages_expr = (
-            pl.struct(message_columns)
-            .map_elements(_create_messages_without_reasoning_no_document)
-            .alias("messages")
-        )
-
-    base_columns.append(messages_expr)
+    has_reasoning = "reasoning" in columns
+    base_columns = [
+        _create_metadata(),
+        _create_messages(has_reasoning, keep_document_in_context),
+    ]
 
     # Apply transformations
     knowledge_ds = generated_dataset.with_columns(base_columns)
@@ -281,34 +336,285 @@ def generate_knowledge_qa_dataset(
     return knowledge_ds
 
 
+def _message_keys(messages: pl.Series) -> List[str]:
+    """Stable content hash of each row's messages, used as the cache key."""
+    encoded = messages.list.eval(pl.element().struct.json_encode()).list.join("\n")
+    return [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in encoded]
+
+
+def _token_cache_dir(cache_dir: str, tokenizer: Any) -> Path:
+    """Cache directory for one tokenizer; lengths are only valid for that tokenizer."""
+    name = getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+    digest = hashlib.sha256(str(name).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"token_lengths_{digest}"
+
+
+def _read_token_cache(cache_dir: Path) -> Dict[str, int]:
+    parts = sorted(cache_dir.glob("*.parquet")) if cache_dir.is_dir() else []
+    if not parts:
+        return {}
+    cache = pl.read_parquet(parts)
+    return dict(zip(cache["key"], cache["token_length"], strict=True))
+
+
+def _count_chunk(tokenizer: Any, chunk: List[List[dict]]) -> List[int]:
+    """Render the chat templates of a chunk of rows and encode them in one call."""
+    texts = [
+        tokenizer.apply_chat_template(messages, tokenize=False) for messages in chunk
+    ]
+    # Fast tokenizers encode a whole batch in parallel in Rust
+    if callable(tokenizer):
+        return [len(ids) for ids in tokenizer(texts)["input_ids"]]
+    return [len(tokenizer.encode(text)) for text in texts]
+
+
+_worker_tokenizer: Any = None
+
+
+def _init_count_worker(tokenizer: Any) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _count_chunk_in_worker(chunk: List[List[dict]]) -> List[int]:
+    return _count_chunk(_worker_tokenizer, chunk)
+
+
+def _close_counter(
+    pool: Optional[ProcessPoolExecutor],
+    new_lengths: Dict[str, int],
+    cache_dir: Optional[Path],
+) -> None:
+    if pool is not None:
+        pool.shutdown()
+    if cache_dir is not None and new_lengths:
+        # Append the new lengths as one more part; earlier parts stay as they are
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        part = cache_dir / f"part-{uuid.uuid4().hex}.parquet"
+        tmp_path = part.with_suffix(".tmp")
+        pl.DataFrame(
+            {"key": list(new_lengths), "token_length": list(new_lengths.values())},
+            schema={"key": pl.String, "token_length": pl.Int32},
+        ).write_parquet(tmp_path)
+        tmp_path.replace(part)
+        new_lengths.clear()
+
+
+class _TokenCounter:
+    """
+    Adds token_length to one batch of rows at a time.
+
+    The token cache is read and the worker pool started once per counter,
+    and the lengths it counts are appended to the cache in one part file
+    when it is closed (or garbage collected, for a dropped lazy query).
+    """
+
+    def __init__(
+        self,
+        tokenizer: Any,
+        column_name: str = "messages",
+        batch_size: int = 1000,
+        num_proc: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+    ):
+        self.tokenizer = tokenizer
+        self.column_name = column_name
+        self.batch_size = batch_size
+        self.cache_dir = None
+        self.cached: Dict[str, int] = {}
+        if cache_dir is not None:
+            self.cache_dir = _token_cache_dir(cache_dir, tokenizer)
+            self.cached = _read_token_cache(self.cache_dir)
+        self.new_lengths: Dict[str, int] = {}
+        self.pool = None
+        if num_proc and num_proc > 1:
+            self.pool = ProcessPoolExecutor(
+                num_proc, initializer=_init_count_worker, initargs=(tokenizer,)
+            )
+        self._finalizer = weakref.finalize(
+            self, _close_counter, self.pool, self.new_lengths, self.cache_dir
+        )
+
+    def __call__(self, df: pl.DataFrame) -> pl.DataFrame:
+        messages = df[self.column_name]
+        lengths: List[Optional[int]] = [None] * len(df)
+        keys = None
+        if self.cache_dir is not None:
+            keys = _message_keys(messages)
+            lengths = [self.cached.get(key) for key in keys]
+
+        todo = [i for i, length in enumerate(lengths) if length is None]
+        if todo:
+            rows = messages.gather(todo).to_list()
+            chunks = [
+                rows[i : i + self.batch_size]
+                for i in range(0, len(rows), self.batch_size)
+            ]
+            if self.pool is not None:
+                counted = list(self.pool.map(_count_chunk_in_worker, chunks))
+            else:
+                counted = [_count_chunk(self.tokenizer, chunk) for chunk in chunks]
+            for i, length in zip(todo, chain.from_iterable(counted), strict=True):
+                lengths[i] = length
+
+            if keys is not None:
+                new_lengths = {keys[i]: lengths[i] for i in todo}
+                self.cached.update(new_lengths)
+                self.new_lengths.update(new_lengths)
+
+        return df.with_columns(pl.Series("token_length", lengths, dtype=pl.Int32))
+
+    def count_lazy(self, lf: pl.LazyFrame) -> pl.LazyFrame:
+        """Count each batch of a LazyFrame as the streaming engine produces it."""
+        schema = lf.collect_schema()
+        schema["token_length"] = pl.Int32
+        return lf.map_batches(self, schema=schema, streamable=True)
+
+    def close(self) -> None:
+        """Stop the worker pool and write newly counted lengths to the cache."""
+        self._finalizer()
+
+    def __enter__(self) -> "_TokenCounter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
 def count_len_in_tokens(
-    df: pl.DataFrame, tokenizer: Any, column_name: str = "messages"
-) -> pl.DataFrame:
+    df: Frame,
+    tokenizer: Any,
+    column_name: str = "messages",
+    batch_size: int = 1000,
+    num_proc: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Frame:
     """
     Count token length of messages using tokenizer.
 
+    Rows are rendered with the chat template and encoded in chunks of
+    batch_size, one batched tokenizer call per chunk.  Lengths match
+    tokenizer.encode on the rendered template.
+
     Args:
         df: Input dataframe
         tokenizer: HuggingFace tokenizer with apply_chat_template method
         column_name: Column containing messages to tokenize
+        batch_size: Rows rendered and encoded per tokenizer call
+        num_proc: Worker processes for rendering and encoding (None = in-process)
+        cache_dir: Directory for an on-disk cache of token lengths keyed by
+            a hash of each row's messages (None = no cache)
 
     Returns:
-        Dataframe with added token_length column
+        Dataframe with added token_length column; a LazyFrame input is
+        counted batch by batch as the streaming engine produces it, with
+        one worker pool for the whole query and its new lengths cached
+        once the LazyFrame is released
     """
-    if column_name not in df.columns:
+    if column_name not in _column_names(df):
         raise ValueError(f"Column '{column_name}' not found in dataframe")
 
-    def apply_chat_template(messages: List[dict]) -> str:
-        """Apply chat template to messages."""
-        return tokenizer.apply_chat_template(messages, tokenize=False)
+    counter = _TokenCounter(tokenizer, column_name, batch_size, num_proc, cache_dir)
+    if isinstance(df, pl.LazyFrame):
+        return counter.count_lazy(df)
+    with counter:
+        return counter(df)
 
-    def count_tokens(text: str) -> int:
-        """Count tokens in text."""
-        return len(tokenizer.encode(text))
 
-    return df.with_columns(
-        pl.col(column_name)
-        .map_elements(apply_chat_template, return_dtype=pl.String)
-        .map_elements(count_tokens, return_dtype=pl.Int32)
-        .alias("token_length")
+def knowledge_qa_cuts(
+    df: Union[pl.DataFrame, pl.LazyFrame],
+    tokenizer: Any,
+    cut_sizes: List[int],
+    qa_per_doc: int = 3,
+    seed: int = 42,
+    sample: bool = True,
+    keep_columns: Optional[List[str]] = None,
+    pre_training: bool = False,
+    keep_document_in_context: bool = False,
+    spill_dir: Optional[Union[str, Path]] = None,
+    **count_kwargs: Any,
+) -> Dict[int, Tuple[Union[pl.DataFrame, pl.LazyFrame], dict]]:
+    """
+    Build the knowledge Q&A dataset of every cut size in one pass.
+
+    Rows are sampled once for the largest cut (see sample_doc_qa_cuts),
+    formatted and tokenized once, and each cut is then a filter of that
+    result.
+
+    A LazyFrame input with spill_dir runs that pass on the streaming engine
+    into spill_dir/knowledge.parquet, and every cut is a LazyFrame scanning
+    it, so the datasets are never held in memory (see sink_training_mix).
+    Without spill_dir the tokenized rows are collected.
+
+    Args:
+        df: Input dataframe (or LazyFrame) with document and Q&A data
+        tokenizer: HuggingFace tokenizer with apply_chat_template method
+        cut_sizes: Cut sizes (summaries per raw document) to produce
+        qa_per_doc: Maximum number of Q&A pairs per document/summary
+        seed: Seed of the per-raw-document summary sampling
+        sample: Whether to sample; when False every cut gets all rows
+        keep_columns: Additional columns to keep in output
+        pre_training: Whether to add unmask column for pre-training
+        keep_document_in_context: Whether to put the document in the user turn
+        spill_dir: Directory for the tokenized rows of a LazyFrame input
+        **count_kwargs: Passed to count_len_in_tokens (batch_size, num_proc, cache_dir)
+
+    Returns:
+        Mapping of cut size to (dataset, statistics); datasets are lazy for
+        a LazyFrame input with spill_dir
+    """
+    if keep_columns is None:
+        keep_columns = []
+    cuts = sorted(set(cut_sizes))
+
+    if sample:
+        rows = sample_doc_qa_cuts(df, cuts, qa_per_doc=qa_per_doc, seed=seed)
+    else:
+        rows = df.with_columns(pl.lit(cuts[0]).alias("min_cut"))
+
+    # Statistics need the document columns whether or not they are kept
+    internal = ["min_cut"] + [
+        col for col in ("document", "raw_document") if col not in keep_columns
+    ]
+    knowledge = generate_knowledge_qa_dataset(
+        rows,
+        keep_columns=keep_columns + internal,
+        pre_training=pre_training,
+        keep_document_in_context=keep_document_in_context,
     )
+    if "messages" not in _column_names(knowledge):
+        raise ValueError("Column 'messages' not found in dataframe")
+
+    # One counter for the whole pass: one worker pool, one cache update
+    with _TokenCounter(tokenizer, "messages", **count_kwargs) as counter:
+        if isinstance(knowledge, pl.DataFrame):
+            knowledge = counter(knowledge)
+        elif spill_dir is not None:
+            spill_path = Path(spill_dir) / "knowledge.parquet"
+            spill_path.parent.mkdir(parents=True, exist_ok=True)
+            counter.count_lazy(knowledge).sink_parquet(spill_path)
+            knowledge = pl.scan_parquet(spill_path)
+        else:
+            knowledge = counter.count_lazy(knowledge).collect(engine="streaming")
+
+    datasets = [knowledge.filter(pl.col("min_cut") <= cut) for cut in cuts]
+    stats_frames = pl.collect_all([
+        dataset.lazy().select(
+            pl.len().alias("samples"),
+            pl.col("document").n_unique().alias("unique_docs"),
+            pl.col("raw_document").n_unique().alias("unique_raw_docs"),
+            pl.col("token_length").sum().alias("total_tokens"),
+        )
+        for dataset in datasets
+    ])
+
+    results = {}
+    for cut, dataset, frame in zip(cuts, datasets, stats_frames, strict=True):
+        stats = frame.row(0, named=True)
+        unique_docs, unique_raw_docs = stats["unique_docs"], stats["unique_raw_docs"]
+        stats["avg_docs_per_raw"] = (
+            unique_docs / unique_raw_docs if unique_raw_docs else 0
+        )
+        stats["total_tokens"] = int(stats["total_tokens"])
+        results[cut] = (dataset.drop(internal), stats)
+    return results
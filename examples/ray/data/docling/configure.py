@@ -8,14 +8,22 @@ Docling actor pools to convert PDFs to Markdown/JSON on a Kubernetes cluster.
 Usage:
     python configure.py --interactive
     python configure.py --num-files 10000 --num-workers 8 --worker-cpus 8 --worker-memory 16
+    python configure.py --num-files 10000 --benchmark ./sample-pdfs
+    python configure.py --worker-group small:4:8:16 --worker-group large:2:32:128
+    python configure.py --num-files 10000 --ingest-runs /mnt/data/output/_summaries
 """
 
 import argparse
+import glob
+import heapq
 import json
 import math
+import multiprocessing
+import os
 import sys
-from dataclasses import dataclass, field
-from typing import List
+import time
+from dataclasses import dataclass, field, replace
+from typing import List, Tuple
 
 # ─── Constants & Defaults ────────────────────────────────────────────────────
 
@@ -25,7 +33,9 @@ HEAD_RAY_NUM_CPUS = (
 )
 DEFAULT_HEAD_CPUS = 4  # Kubernetes CPU allocation for the head pod
 DEFAULT_HEAD_MEMORY_GB = 8  # Kubernetes memory allocation for the head pod
-MIN_MEMORY_PER_ACTOR_GB = 4  # Docling needs at least 4 GB per actor
+MIN_MEMORY_PER_PIPELINE_GB = 4  # Docling needs at least 4 GB per loaded pipeline
+DEFAULT_NUM_SPARE_CONVERTERS = 0  # Warm standby converters per actor
+DEFAULT_PIPELINE_PROFILE = "auto"  # Loads both the "full" and "fast" pipelines
 DEFAULT_BATCH_SIZE = 4  # Files per map_batches call
 DEFAULT_REPARTITION_FACTOR = 40  # Blocks = max_actors × this factor
 DEFAULT_OBJECT_STORE_PROPORTION = 0.1  # Low because we pass paths, not bytes
@@ -35,10 +45,43 @@ DEFAULT_CPUS_PER_ACTOR = 2  # CPUs allocated to each Docling actor
 AVG_SECONDS_FAST = 5  # Small/simple PDFs
 AVG_SECONDS_SLOW = 20  # Large/complex PDFs with tables
 
+# Per-file work model, shared with ray_data_process.py for block packing
+EST_SECONDS_PER_FILE = 1.0  # Fixed cost: read, parse, write outputs
+EST_SECONDS_PER_PAGE = 0.8  # Layout + table models on a few CPUs
+EST_BYTES_PER_PAGE = 100 * 1024  # Page-count proxy when only the size is known
+STRAGGLER_TAIL_FRACTION = 0.05  # Largest block vs. per-actor share of the work
+
+# Benchmark mode (--benchmark): local runs used to calibrate the model
+BENCHMARK_CPUS = [1, 2, 4, 8]  # cpus_per_actor settings tried (up to local CPUs)
+BENCHMARK_MAX_FILES = 8  # PDFs converted per setting
+BATCH_SIZE_OPTIONS = [1, 2, 4, 8, 16]
+MAX_BATCH_SECONDS = 120  # Ray only reschedules between batches; keep them short
+
+# Run-summary ingestion (--ingest-runs): thresholds for flagging bottlenecks
+CPU_BOUND_UTILIZATION = 0.8  # Actors busy for this share of the wall clock
+MEMORY_BOUND_FRACTION = 0.85  # Peak converter RSS vs. memory per actor
+STRAGGLER_IMBALANCE = 1.5  # Busiest actor vs. median actor busy time
+STRAGGLER_FILE_FRACTION = 0.25  # Slowest single file vs. wall clock
+
 
 # ─── Data Structures ─────────────────────────────────────────────────────────
 
 
+@dataclass
+class WorkerGroup:
+    """One RayCluster worker group (a ``workerGroupSpecs`` entry)."""
+
+    name: str
+    replicas: int
+    cpus: int
+    memory_gb: int
+
+    # --- Derived (computed by calculate()) ---
+    schedulable_cpus: int = 0
+    actors_per_worker: int = 0
+    memory_per_actor_gb: float = 0.0
+
+
 @dataclass
 class PipelineConfig:
     """All input and derived configuration for the pipeline."""
@@ -53,9 +96,21 @@ class PipelineConfig:
     cpus_per_actor: int = DEFAULT_CPUS_PER_ACTOR
     do_ocr: bool = False
     do_table_structure: bool = True
+    num_spare_converters: int = DEFAULT_NUM_SPARE_CONVERTERS
+    pipeline_profile: str = DEFAULT_PIPELINE_PROFILE
     batch_size: int = DEFAULT_BATCH_SIZE
     repartition_factor: int = DEFAULT_REPARTITION_FACTOR
     object_store_proportion: float = DEFAULT_OBJECT_STORE_PROPORTION
+    # Heterogeneous worker groups; when set they replace num_workers,
+    # worker_cpus and worker_memory_gb
+    worker_groups: List[WorkerGroup] = field(default_factory=list)
+    # Estimated seconds per file (see estimate_file_cost); empty = unknown
+    file_costs: List[float] = field(default_factory=list)
+    # Measured (cpus_per_actor, pages/s per actor) pairs from --benchmark
+    benchmark_samples: List[Tuple[int, float]] = field(default_factory=list)
+    benchmark_pages_per_file: float = 0.0
+    # Findings from past run summaries (see summarize_run)
+    past_runs: List[dict] = field(default_factory=list)
 
     # --- Derived (computed by calculate()) ---
     schedulable_cpus: int = 0
@@ -64,6 +119,7 @@ class PipelineConfig:
     min_actors: int = 0
     object_store_memory_gb: float = 0.0
     memory_per_actor_gb: float = 0.0
+    min_memory_per_actor_gb: float = 0.0
     total_blocks: int = 0
     files_per_block: float = 0.0
     batches_per_block: int = 0
@@ -71,36 +127,383 @@ class PipelineConfig:
     total_cluster_memory_gb: int = 0
     estimated_time_fast_s: float = 0.0
     estimated_time_slow_s: float = 0.0
+    estimated_time_model_s: float = 0.0
+    max_block_cost_s: float = 0.0
+    recommended_repartition_factor: int = 0
+    # Fitted seconds/page = serial + parallel / cpus_per_actor (--benchmark)
+    fitted_serial_s: float = 0.0
+    fitted_parallel_s: float = 0.0
+    cluster_pages_per_s: float = 0.0
 
     # --- Validation messages ---
     errors: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
 
 
+# ─── Work Estimation ─────────────────────────────────────────────────────────
+
+
+def estimate_file_cost(
+    size_bytes: int,
+    num_pages: int = 0,
+    seconds_per_page: float = EST_SECONDS_PER_PAGE,
+) -> float:
+    """Estimated conversion seconds for one PDF from its size or page count."""
+    if num_pages <= 0:
+        num_pages = max(1.0, size_bytes / EST_BYTES_PER_PAGE)
+    return EST_SECONDS_PER_FILE + seconds_per_page * num_pages
+
+
+def pack_blocks(costs: List[float], num_blocks: int) -> List[List[int]]:
+    """Pack files into blocks of roughly equal estimated cost.
+
+    Longest-processing-time-first greedy: files are taken in descending cost
+    order and each goes to the currently lightest block.  Returns lists of
+    indices into ``costs``, heaviest block first and each block ordered
+    longest file first, so the expensive work is scheduled early.
+    """
+    num_blocks = min(num_blocks, len(costs))
+    if num_blocks <= 0:
+        return []
+    heap = [(0.0, b) for b in range(num_blocks)]
+    blocks = [[] for _ in range(num_blocks)]
+    loads = [0.0] * num_blocks
+    for i in sorted(range(len(costs)), key=lambda i: costs[i], reverse=True):
+        load, b = heapq.heappop(heap)
+        blocks[b].append(i)
+        loads[b] = load + costs[i]
+        heapq.heappush(heap, (loads[b], b))
+    order = sorted(range(num_blocks), key=lambda b: loads[b], reverse=True)
+    return [blocks[b] for b in order]
+
+
+def _max_block_cost(costs: List[float], num_blocks: int) -> float:
+    blocks = pack_blocks(costs, num_blocks)
+    return sum(costs[i] for i in blocks[0]) if blocks else 0.0
+
+
+def recommend_repartition_factor(costs: List[float], max_actors: int) -> int:
+    """Smallest repartition factor whose heaviest packed block stays short.
+
+    The target is STRAGGLER_TAIL_FRACTION of one actor's share of the work,
+    or the single largest file when that is bigger (no partitioning can
+    split a file).  The average block must also meet the tail target so
+    dynamic scheduling can absorb estimation error.  Fewer blocks means
+    less scheduling overhead, so the smallest factor meeting both is
+    returned.
+    """
+    if not costs or max_actors <= 0:
+        return DEFAULT_REPARTITION_FACTOR
+    target = max(
+        sum(costs) / max_actors * STRAGGLER_TAIL_FRACTION,
+        max(costs),
+    )
+    hi = max(1, len(costs) // max_actors)
+    lo = min(math.ceil(1 / STRAGGLER_TAIL_FRACTION), hi)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _max_block_cost(costs, max_actors * mid) <= target:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def scan_file_costs(
+    input_dir: str, num_files: int, seconds_per_page: float = EST_SECONDS_PER_PAGE
+) -> List[float]:
+    """Estimate per-file costs from the PDF sizes under ``input_dir``.
+
+    A directory smaller than ``num_files`` is treated as a representative
+    sample and its costs are repeated to the full corpus size.
+    """
+    paths = glob.glob(f"{input_dir}/**/*.pdf", recursive=True)[:num_files]
+    costs = [
+        estimate_file_cost(os.path.getsize(p), seconds_per_page=seconds_per_page)
+        for p in paths
+    ]
+    if costs and len(costs) < num_files:
+        costs = [costs[i % len(costs)] for i in range(num_files)]
+    return costs
+
+
+# ─── Benchmark & Auto-tuning ─────────────────────────────────────────────────
+
+
+def _benchmark_worker(
+    paths: List[str], cpus: int, do_ocr: bool, do_table_structure: bool
+) -> Tuple[int, float]:
+    """Convert ``paths`` with one Docling converter limited to ``cpus`` threads.
+
+    Runs in a freshly spawned process so the thread settings apply before
+    torch loads, as in the pipeline's converter subprocess.  Returns pages
+    converted and seconds taken, excluding model loading.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(cpus)
+    os.environ["MKL_NUM_THREADS"] = str(cpus)
+
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import (
+        AcceleratorOptions,
+        PdfPipelineOptions,
+    )
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = do_ocr
+    pipeline_options.do_table_structure = do_table_structure
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        num_threads=cpus, device="cpu"
+    )
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+    converter.initialize_pipeline(InputFormat.PDF)
+
+    pages = 0
+    start = time.time()
+    for path in paths:
+        pages += len(converter.convert(path).document.pages)
+    return pages, time.time() - start
+
+
+def run_benchmark(
+    sample_dir: str,
+    cpus_options: List[int],
+    max_files: int = BENCHMARK_MAX_FILES,
+    do_ocr: bool = False,
+    do_table_structure: bool = True,
+) -> Tuple[List[Tuple[int, float]], float]:
+    """Measure one actor's pages/s at each CPU count on a local PDF sample.
+
+    Returns ``(cpus, pages_per_second)`` samples and the average pages per
+    file of the sample.  Requires Docling to be installed locally.
+    """
+    paths = sorted(glob.glob(f"{sample_dir}/**/*.pdf", recursive=True))[:max_files]
+    if not paths:
+        sys.exit(f"No PDFs found under {sample_dir}")
+    ctx = multiprocessing.get_context("spawn")
+    samples, pages = [], 0
+    for cpus in cpus_options:
+        with ctx.Pool(1) as pool:
+            pages, seconds = pool.apply(
+                _benchmark_worker, (paths, cpus, do_ocr, do_table_structure)
+            )
+        rate = pages / seconds if seconds > 0 else 0.0
+        print(
+            f"  benchmark: cpus_per_actor={cpus}  {pages} pages in {seconds:.1f}s "
+            f"({rate:.2f} pages/s)",
+            file=sys.stderr,
+        )
+        samples.append((cpus, rate))
+    return samples, pages / len(paths)
+
+
+def fit_throughput_curve(samples: List[Tuple[int, float]]) -> Tuple[float, float]:
+    """Fit seconds per page = serial + parallel / cpus to benchmark samples.
+
+    Least squares in 1/cpus, with both terms kept non-negative.  Samples
+    at a single cpus value cannot separate the two terms; like a single
+    sample, their mean is taken as perfectly parallel, so repeating a
+    measurement does not change the model.  Returns ``(serial, parallel)``.
+    """
+    points = [(1 / cpus, 1 / rate) for cpus, rate in samples if cpus > 0 and rate > 0]
+    if not points:
+        return 0.0, 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    if len({x for x, _ in points}) == 1:
+        return 0.0, mean_y / mean_x
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    parallel = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+    serial = mean_y - parallel * mean_x
+    if parallel < 0:
+        return mean_y, 0.0
+    if serial < 0:
+        return 0.0, sum(x * y for x, y in points) / sum(x * x for x, _ in points)
+    return serial, parallel
+
+
+def fitted_pages_per_second(serial: float, parallel: float, cpus: int) -> float:
+    seconds_per_page = serial + parallel / cpus
+    return 1 / seconds_per_page if seconds_per_page > 0 else 0.0
+
+
+def autotune(cfg: PipelineConfig) -> PipelineConfig:
+    """Search the actor shape and partitioning for the highest throughput.
+
+    Tries every ``cpus_per_actor`` that fits a worker and keeps the settings
+    ``validate()`` accepts (memory per actor, CPUs); the most cluster pages/s
+    wins, fewer CPUs per actor on a tie.  ``file_costs`` are rescaled to the
+    measured seconds per page, ``repartition_factor`` takes the cost model's
+    recommendation and ``batch_size`` is the largest option that fits in a
+    block while keeping a batch under MAX_BATCH_SECONDS.
+
+    Samples from a single ``cpus_per_actor`` say nothing about how
+    throughput scales with CPUs, so the configured shape is kept then.
+    """
+    largest_cpus = max([g.cpus for g in cfg.worker_groups], default=cfg.worker_cpus)
+    measured_cpus = {cpus for cpus, rate in cfg.benchmark_samples if rate > 0}
+    if len(measured_cpus) >= 2:
+        cpus_options = range(1, largest_cpus - OVERHEAD_CPUS + 1)
+    else:
+        cpus_options = [cfg.cpus_per_actor]
+    best = None
+    for cpus in cpus_options:
+        candidate = validate(calculate(replace(cfg, cpus_per_actor=cpus)))
+        if candidate.errors:
+            continue
+        if (
+            best is None
+            or candidate.cluster_pages_per_s > best.cluster_pages_per_s * 1.001
+        ):
+            best = candidate
+    if best is None or best.cluster_pages_per_s <= 0:
+        return cfg
+
+    seconds_per_page = best.max_actors / best.cluster_pages_per_s
+    costs = [c * seconds_per_page / EST_SECONDS_PER_PAGE for c in cfg.file_costs]
+    tuned = calculate(replace(best, file_costs=costs))
+    if tuned.recommended_repartition_factor:
+        tuned = calculate(
+            replace(tuned, repartition_factor=tuned.recommended_repartition_factor)
+        )
+    batch_seconds = max(cfg.benchmark_pages_per_file, 1.0) * seconds_per_page
+    fitting = [
+        b
+        for b in BATCH_SIZE_OPTIONS
+        if b <= max(1.0, tuned.files_per_block)
+        and b * batch_seconds <= MAX_BATCH_SECONDS
+    ]
+    return calculate(replace(tuned, batch_size=max(fitting, default=1)))
+
+
+# ─── Run Summaries ───────────────────────────────────────────────────────────
+
+
+def load_run_summaries(paths: List[str]) -> List[dict]:
+    """Read run summaries written by ray_data_process (files or directories)."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        else:
+            files.append(path)
+    summaries = []
+    for path in files:
+        with open(path) as f:
+            summaries.append(json.load(f))
+    return summaries
+
+
+def summarize_run(summary: dict) -> dict:
+    """Measured throughput of one run and what bounded it.
+
+    Pages per second per actor counts only files the actors converted
+    (cache hits excluded).  A run is flagged CPU-bound when its actors were
+    busy most of the wall clock, memory-bound when a converter's peak RSS
+    came close to the memory per actor, and straggler-bound when one actor
+    or one file kept the run going after the others had finished.
+    """
+    config = summary["config"]
+    actors = summary["actors"]
+    wall_clock = summary["wall_clock_s"]
+    pages = sum(a["converted_pages"] for a in actors)
+    seconds = sum(a["converted_s"] for a in actors)
+    busy = sorted(a["busy_s"] for a in actors)
+    utilization = sum(busy) / (len(busy) * wall_clock) if busy and wall_clock else 0.0
+    median_busy = busy[len(busy) // 2] if busy else 0.0
+    max_file_s = max((a["max_file_s"] for a in actors), default=0.0)
+    peak_rss_gb = max((a["peak_rss_mb"] for a in actors), default=0.0) / 1024
+    memory_per_actor_gb = config["cluster_memory_gb"] / max(config["max_actors"], 1)
+
+    bounds = []
+    if utilization >= CPU_BOUND_UTILIZATION:
+        bounds.append(
+            f"CPU-bound: actors busy {utilization:.0%} of the wall clock; "
+            f"more actors or CPUs will shorten the run"
+        )
+    if peak_rss_gb >= memory_per_actor_gb * MEMORY_BOUND_FRACTION:
+        bounds.append(
+            f"memory-bound: converter peak RSS {peak_rss_gb:.1f} GB vs "
+            f"~{memory_per_actor_gb:.1f} GB per actor"
+            + (
+                f"; {summary['timeouts']} timeouts may be OOM kills"
+                if summary["timeouts"]
+                else ""
+            )
+        )
+    if busy and busy[-1] >= median_busy * STRAGGLER_IMBALANCE:
+        bounds.append(
+            f"straggler-bound: busiest actor {busy[-1]:.0f}s vs median "
+            f"{median_busy:.0f}s; raise repartition_factor or enable PACK_BLOCKS"
+        )
+    elif wall_clock and max_file_s >= wall_clock * STRAGGLER_FILE_FRACTION:
+        bounds.append(
+            f"straggler-bound: slowest file took {max_file_s:.0f}s of a "
+            f"{wall_clock:.0f}s run; consider SHARD_PAGES"
+        )
+
+    return {
+        "run": summary["run"],
+        "cpus_per_actor": config["cpus_per_actor"],
+        "actors": len(actors),
+        "pages_per_s_per_actor": pages / seconds if seconds > 0 else 0.0,
+        "pages_per_file": summary["pages"] / max(summary["success"], 1),
+        "utilization": utilization,
+        "bounds": bounds,
+    }
+
+
 # ─── Core Logic ──────────────────────────────────────────────────────────────
 
 
-def calculate(cfg: PipelineConfig) -> PipelineConfig:
-    """Apply all equations to derive configuration values from inputs."""
+def min_memory_per_actor(num_spare_converters: int, pipeline_profile: str) -> float:
+    """Memory in GB an actor needs for its converter subprocesses.
 
-    # CPUs available for actors on each worker (reserve OVERHEAD_CPUS for raylet etc.)
-    cfg.schedulable_cpus = cfg.worker_cpus - OVERHEAD_CPUS
+    The active converter and every spare each load one Docling pipeline per
+    profile in use, both "full" and "fast" with ``pipeline_profile="auto"``.
+    """
+    profiles = 2 if pipeline_profile == "auto" else 1
+    return MIN_MEMORY_PER_PIPELINE_GB * (1 + num_spare_converters) * profiles
 
-    # How many actors fit on one worker
-    cfg.actors_per_worker = cfg.schedulable_cpus // cfg.cpus_per_actor
 
-    # Cluster-wide actor pool bounds
-    cfg.max_actors = cfg.num_workers * cfg.actors_per_worker
-    cfg.min_actors = max(cfg.num_workers, cfg.max_actors // 3)
+def calculate(cfg: PipelineConfig) -> PipelineConfig:
+    """Apply all equations to derive configuration values from inputs."""
 
-    # Memory carving: object store gets a slice, rest is split among actors
-    cfg.object_store_memory_gb = cfg.worker_memory_gb * cfg.object_store_proportion
-    if cfg.actors_per_worker > 0:
-        cfg.memory_per_actor_gb = (
-            cfg.worker_memory_gb - cfg.object_store_memory_gb
-        ) / cfg.actors_per_worker
+    cfg.min_memory_per_actor_gb = min_memory_per_actor(
+        cfg.num_spare_converters, cfg.pipeline_profile
+    )
+    if cfg.worker_groups:
+        _calculate_groups(cfg)
     else:
-        cfg.memory_per_actor_gb = 0.0
+        # CPUs available for actors on each worker (reserve OVERHEAD_CPUS for raylet etc.)
+        cfg.schedulable_cpus = cfg.worker_cpus - OVERHEAD_CPUS
+
+        # How many actors fit on one worker, by CPUs and by converter memory
+        usable_memory_gb = cfg.worker_memory_gb * (1 - cfg.object_store_proportion)
+        cfg.actors_per_worker = max(
+            0,
+            min(
+                cfg.schedulable_cpus // cfg.cpus_per_actor,
+                int(usable_memory_gb // cfg.min_memory_per_actor_gb),
+            ),
+        )
+
+        # Cluster-wide actor pool bounds
+        cfg.max_actors = cfg.num_workers * cfg.actors_per_worker
+        cfg.min_actors = max(cfg.num_workers, cfg.max_actors // 3)
+
+        # Memory carving: object store gets a slice, rest is split among actors
+        cfg.object_store_memory_gb = cfg.worker_memory_gb * cfg.object_store_proportion
+        if cfg.actors_per_worker > 0:
+            cfg.memory_per_actor_gb = (
+                cfg.worker_memory_gb - cfg.object_store_memory_gb
+            ) / cfg.actors_per_worker
+        else:
+            cfg.memory_per_actor_gb = 0.0
 
     # Data partitioning
     cfg.total_blocks = cfg.max_actors * cfg.repartition_factor
@@ -114,22 +517,110 @@ def calculate(cfg: PipelineConfig) -> PipelineConfig:
     )
 
     # Cluster totals (head + workers)
-    cfg.total_cluster_cpus = cfg.head_cpus + (cfg.num_workers * cfg.worker_cpus)
-    cfg.total_cluster_memory_gb = cfg.head_memory_gb + (
-        cfg.num_workers * cfg.worker_memory_gb
-    )
+    if cfg.worker_groups:
+        cfg.total_cluster_cpus = cfg.head_cpus + sum(
+            g.replicas * g.cpus for g in cfg.worker_groups
+        )
+        cfg.total_cluster_memory_gb = cfg.head_memory_gb + sum(
+            g.replicas * g.memory_gb for g in cfg.worker_groups
+        )
+    else:
+        cfg.total_cluster_cpus = cfg.head_cpus + (cfg.num_workers * cfg.worker_cpus)
+        cfg.total_cluster_memory_gb = cfg.head_memory_gb + (
+            cfg.num_workers * cfg.worker_memory_gb
+        )
 
-    # Time estimates
-    if cfg.max_actors > 0:
+    # Throughput curve fitted to --benchmark samples
+    if cfg.benchmark_samples:
+        cfg.fitted_serial_s, cfg.fitted_parallel_s = fit_throughput_curve(
+            cfg.benchmark_samples
+        )
+        cfg.cluster_pages_per_s = cfg.max_actors * fitted_pages_per_second(
+            cfg.fitted_serial_s, cfg.fitted_parallel_s, cfg.cpus_per_actor
+        )
+
+    # Time estimates: measured when benchmarked, otherwise the fast/slow range
+    if cfg.cluster_pages_per_s > 0:
+        cfg.estimated_time_fast_s = cfg.num_files * (
+            EST_SECONDS_PER_FILE / cfg.max_actors
+            + max(cfg.benchmark_pages_per_file, 1.0) / cfg.cluster_pages_per_s
+        )
+        cfg.estimated_time_slow_s = cfg.estimated_time_fast_s
+    elif cfg.max_actors > 0:
         cfg.estimated_time_fast_s = (cfg.num_files * AVG_SECONDS_FAST) / cfg.max_actors
         cfg.estimated_time_slow_s = (cfg.num_files * AVG_SECONDS_SLOW) / cfg.max_actors
     else:
         cfg.estimated_time_fast_s = float("inf")
         cfg.estimated_time_slow_s = float("inf")
 
+    # Cost-model estimates, when per-file costs are known
+    if cfg.file_costs and cfg.max_actors > 0:
+        cfg.max_block_cost_s = _max_block_cost(cfg.file_costs, cfg.total_blocks)
+        cfg.estimated_time_model_s = max(
+            sum(cfg.file_costs) / cfg.max_actors, cfg.max_block_cost_s
+        )
+        cfg.recommended_repartition_factor = recommend_repartition_factor(
+            cfg.file_costs, cfg.max_actors
+        )
+
     return cfg
 
 
+def _place_actors(
+    group: WorkerGroup,
+    cpus_per_actor: int,
+    object_store_proportion: float,
+    min_memory_per_actor_gb: float,
+) -> WorkerGroup:
+    """Actors one worker of ``group`` can host, bounded by CPUs and memory."""
+    group = replace(group)
+    group.schedulable_cpus = group.cpus - OVERHEAD_CPUS
+    usable_memory_gb = group.memory_gb * (1 - object_store_proportion)
+    group.actors_per_worker = max(
+        0,
+        min(
+            group.schedulable_cpus // cpus_per_actor,
+            int(usable_memory_gb // min_memory_per_actor_gb),
+        ),
+    )
+    group.memory_per_actor_gb = (
+        usable_memory_gb / group.actors_per_worker if group.actors_per_worker else 0.0
+    )
+    return group
+
+
+def _calculate_groups(cfg: PipelineConfig) -> None:
+    """Per-group actor placement for heterogeneous clusters.
+
+    All actors share ``cpus_per_actor`` (one ActorPoolStrategy), so each
+    group hosts as many as both its CPUs and memory allow.  The group's
+    Ray ``num-cpus`` is then set to exactly those actors' CPUs (see
+    format_cluster_patch) so Ray cannot pack more onto a memory-bound node.
+    The cluster-wide fields summarise the groups: the pool size is the sum,
+    memory per actor the tightest group.
+    """
+    cfg.worker_groups = [
+        _place_actors(
+            g,
+            cfg.cpus_per_actor,
+            cfg.object_store_proportion,
+            cfg.min_memory_per_actor_gb,
+        )
+        for g in cfg.worker_groups
+    ]
+    placed = [g for g in cfg.worker_groups if g.actors_per_worker > 0]
+
+    cfg.num_workers = sum(g.replicas for g in cfg.worker_groups)
+    cfg.schedulable_cpus = max(g.schedulable_cpus for g in cfg.worker_groups)
+    cfg.actors_per_worker = max(g.actors_per_worker for g in cfg.worker_groups)
+    cfg.max_actors = sum(g.replicas * g.actors_per_worker for g in cfg.worker_groups)
+    cfg.min_actors = max(sum(g.replicas for g in placed), cfg.max_actors // 3)
+    cfg.object_store_memory_gb = max(
+        g.memory_gb * cfg.object_store_proportion for g in cfg.worker_groups
+    )
+    cfg.memory_per_actor_gb = min((g.memory_per_actor_gb for g in placed), default=0.0)
+
+
 def validate(cfg: PipelineConfig) -> PipelineConfig:
     """Check constraints and populate errors/warnings."""
     cfg.errors = []
@@ -142,13 +633,60 @@ def validate(cfg: PipelineConfig) -> PipelineConfig:
             f"but cpus_per_actor={cfg.cpus_per_actor}"
         )
 
-    if cfg.memory_per_actor_gb < MIN_MEMORY_PER_ACTOR_GB and cfg.actors_per_worker > 0:
+    memory_need = (
+        f"{cfg.min_memory_per_actor_gb:g} GB per actor "
+        f"({1 + cfg.num_spare_converters} converters x "
+        f"{2 if cfg.pipeline_profile == 'auto' else 1} pipelines x "
+        f"{MIN_MEMORY_PER_PIPELINE_GB} GB)"
+    )
+    if (
+        cfg.memory_per_actor_gb < cfg.min_memory_per_actor_gb
+        and cfg.actors_per_worker > 0
+    ):
         cfg.errors.append(
             f"Memory per actor too low: {cfg.memory_per_actor_gb:.1f} GB "
-            f"(minimum {MIN_MEMORY_PER_ACTOR_GB} GB). "
+            f"(minimum {memory_need}). "
             f"Increase worker_memory or reduce actors_per_worker."
         )
 
+    if cfg.max_actors == 0 and cfg.schedulable_cpus >= cfg.cpus_per_actor:
+        where = "No worker group" if cfg.worker_groups else "No worker"
+        cfg.errors.append(
+            f"{where} can host an actor with cpus_per_actor="
+            f"{cfg.cpus_per_actor} and {memory_need}. "
+            f"Increase worker memory, or lower NUM_SPARE_CONVERTERS or use a "
+            f"single PIPELINE_PROFILE."
+        )
+
+    idle = cfg.schedulable_cpus - cfg.actors_per_worker * cfg.cpus_per_actor
+    if (
+        not cfg.worker_groups
+        and cfg.actors_per_worker > 0
+        and idle >= cfg.cpus_per_actor
+    ):
+        cfg.warnings.append(
+            f"Memory-bound: {cfg.actors_per_worker} actor(s) per worker at "
+            f"{cfg.min_memory_per_actor_gb:g} GB each leave {idle} of "
+            f"{cfg.schedulable_cpus} schedulable CPUs idle, and Ray places "
+            f"actors by CPU.  Use cpus_per_actor="
+            f"{cfg.schedulable_cpus // cfg.actors_per_worker} or more worker memory."
+        )
+
+    for g in cfg.worker_groups:
+        idle = g.schedulable_cpus - g.actors_per_worker * cfg.cpus_per_actor
+        if g.actors_per_worker == 0 and cfg.max_actors > 0:
+            cfg.warnings.append(
+                f"Worker group '{g.name}' ({g.cpus} CPUs, {g.memory_gb} GB) "
+                f"fits no actors and will sit idle."
+            )
+        elif idle > 0:
+            cfg.warnings.append(
+                f"Worker group '{g.name}': {idle} of {g.schedulable_cpus} "
+                f"schedulable CPUs per worker stranded "
+                f"({g.actors_per_worker} x {cfg.cpus_per_actor}-CPU actors). "
+                f"Try another cpus_per_actor or --benchmark to search for one."
+            )
+
     if cfg.files_per_block > 50:
         cfg.warnings.append(
             f"Large blocks: ~{cfg.files_per_block:.0f} files/block. "
@@ -183,6 +721,26 @@ def validate(cfg: PipelineConfig) -> PipelineConfig:
             f"or lower repartition_factor."
         )
 
+    if (
+        cfg.recommended_repartition_factor
+        and cfg.recommended_repartition_factor != cfg.repartition_factor
+    ):
+        cfg.warnings.append(
+            f"Cost model recommends repartition_factor="
+            f"{cfg.recommended_repartition_factor} for this corpus "
+            f"(heaviest block ~{cfg.max_block_cost_s:.0f}s at "
+            f"{cfg.repartition_factor})."
+        )
+
+    if cfg.file_costs and cfg.max_actors > 0:
+        per_actor_s = sum(cfg.file_costs) / cfg.max_actors
+        if max(cfg.file_costs) > per_actor_s * STRAGGLER_TAIL_FRACTION:
+            cfg.warnings.append(
+                f"Largest file (~{max(cfg.file_costs):.0f}s) is a straggler "
+                f"relative to ~{per_actor_s:.0f}s of work per actor. "
+                f"Consider SHARD_PAGES to split large PDFs."
+            )
+
     return cfg
 
 
@@ -210,14 +768,25 @@ def format_summary(cfg: PipelineConfig) -> str:
     # Cluster
     lines.append("")
     lines.append("--- Cluster ---")
-    lines.append(
-        f"Workers:           {cfg.num_workers} x ({cfg.worker_cpus} CPUs, "
-        f"{cfg.worker_memory_gb} GB)"
-    )
-    lines.append(
-        f"Schedulable CPUs:  {cfg.schedulable_cpus} per worker "
-        f"({OVERHEAD_CPUS} reserved for overhead)"
-    )
+    if cfg.worker_groups:
+        for g in cfg.worker_groups:
+            lines.append(
+                f"Group {g.name + ':':<12}{g.replicas} x ({g.cpus} CPUs, "
+                f"{g.memory_gb} GB) -> {g.actors_per_worker} actors/worker, "
+                f"~{g.memory_per_actor_gb:.1f} GB each"
+            )
+        lines.append(
+            f"Schedulable CPUs:  {OVERHEAD_CPUS} per worker reserved for overhead"
+        )
+    else:
+        lines.append(
+            f"Workers:           {cfg.num_workers} x ({cfg.worker_cpus} CPUs, "
+            f"{cfg.worker_memory_gb} GB)"
+        )
+        lines.append(
+            f"Schedulable CPUs:  {cfg.schedulable_cpus} per worker "
+            f"({OVERHEAD_CPUS} reserved for overhead)"
+        )
     lines.append(
         f"Head node:         {cfg.head_cpus} CPUs, {cfg.head_memory_gb} GB "
         f"(Ray sees {HEAD_RAY_NUM_CPUS} CPUs — no actors scheduled)"
@@ -230,7 +799,8 @@ def format_summary(cfg: PipelineConfig) -> str:
     # Actors
     lines.append("")
     lines.append("--- Actors ---")
-    lines.append(f"Actors per worker: {cfg.actors_per_worker}")
+    if not cfg.worker_groups:
+        lines.append(f"Actors per worker: {cfg.actors_per_worker}")
     lines.append(
         f"Actor pool:        {cfg.min_actors}..{cfg.max_actors}  "
         f"({cfg.cpus_per_actor} CPUs, ~{cfg.memory_per_actor_gb:.1f} GB each)"
@@ -247,6 +817,42 @@ def format_summary(cfg: PipelineConfig) -> str:
     lines.append(
         f"Table structure:   {'Enabled' if cfg.do_table_structure else 'Disabled'}"
     )
+    lines.append(
+        f"Converters:        {1 + cfg.num_spare_converters} per actor "
+        f"({cfg.num_spare_converters} spare), profile {cfg.pipeline_profile}, "
+        f"~{cfg.min_memory_per_actor_gb:g} GB needed per actor"
+    )
+
+    # Benchmark
+    if cfg.benchmark_samples:
+        lines.append("")
+        lines.append("--- Measured Throughput ---")
+        lines.append(
+            f"Fit:               {cfg.fitted_serial_s:.3f}s + "
+            f"{cfg.fitted_parallel_s:.3f}s / cpus per page  "
+            f"(~{cfg.benchmark_pages_per_file:.1f} pages/file)"
+        )
+        lines.append("cpus  measured pages/s  fitted pages/s  pages/s per core")
+        for cpus, rate in cfg.benchmark_samples:
+            fitted = fitted_pages_per_second(
+                cfg.fitted_serial_s, cfg.fitted_parallel_s, cpus
+            )
+            lines.append(
+                f"{cpus:>4}  {rate:>16.2f}  {fitted:>14.2f}  {fitted / cpus:>16.2f}"
+            )
+
+    # Past runs
+    if cfg.past_runs:
+        lines.append("")
+        lines.append("--- Past Runs ---")
+        for run in cfg.past_runs:
+            lines.append(
+                f"{run['run']}: {run['actors']} actors x {run['cpus_per_actor']} CPUs, "
+                f"{run['pages_per_s_per_actor']:.2f} pages/s per actor, "
+                f"{run['utilization']:.0%} busy"
+            )
+            for bound in run["bounds"] or ["no bottleneck flagged"]:
+                lines.append(f"  - {bound}")
 
     # Data Partitioning
     lines.append("")
@@ -263,12 +869,24 @@ def format_summary(cfg: PipelineConfig) -> str:
     # Estimated Time
     lines.append("")
     lines.append("--- Estimated Time ---")
-    lines.append(
-        f"Fast ({AVG_SECONDS_FAST}s/file):    {_fmt_time(cfg.estimated_time_fast_s)}"
-    )
-    lines.append(
-        f"Slow ({AVG_SECONDS_SLOW}s/file):   {_fmt_time(cfg.estimated_time_slow_s)}"
-    )
+    if cfg.cluster_pages_per_s > 0:
+        lines.append(
+            f"Measured:          {_fmt_time(cfg.estimated_time_fast_s)}  "
+            f"({cfg.cluster_pages_per_s:.1f} pages/s cluster-wide)"
+        )
+    else:
+        lines.append(
+            f"Fast ({AVG_SECONDS_FAST}s/file):    {_fmt_time(cfg.estimated_time_fast_s)}"
+        )
+        lines.append(
+            f"Slow ({AVG_SECONDS_SLOW}s/file):   {_fmt_time(cfg.estimated_time_slow_s)}"
+        )
+    if cfg.file_costs:
+        lines.append(
+            f"Cost model:        {_fmt_time(cfg.estimated_time_model_s)}  "
+            f"(heaviest block ~{cfg.max_block_cost_s:.0f}s, "
+            f"recommended repartition_factor={cfg.recommended_repartition_factor})"
+        )
 
     # Errors & Warnings
     if cfg.errors:
@@ -299,6 +917,8 @@ def format_env_vars(cfg: PipelineConfig) -> str:
         f'    "CPUS_PER_ACTOR": "{cfg.cpus_per_actor}",',
         f'    "BATCH_SIZE": "{cfg.batch_size}",',
         f'    "REPARTITION_FACTOR": "{cfg.repartition_factor}",',
+        f'    "NUM_SPARE_CONVERTERS": "{cfg.num_spare_converters}",',
+        f'    "PIPELINE_PROFILE": "{cfg.pipeline_profile}",',
         f'    "OMP_NUM_THREADS": "{cfg.cpus_per_actor}",',
         f'    "MKL_NUM_THREADS": "{cfg.cpus_per_actor}",',
         f'    "RAY_DEFAULT_OBJECT_STORE_MEMORY_PROPORTION": "{cfg.object_store_proportion}",',
@@ -308,7 +928,32 @@ def format_env_vars(cfg: PipelineConfig) -> str:
 
 
 def format_cluster_config(cfg: PipelineConfig) -> str:
-    """CodeFlare SDK ClusterConfiguration snippet."""
+    """CodeFlare SDK ClusterConfiguration snippet.
+
+    The SDK creates a single worker group; with several groups the first is
+    configured here and the rest are added by format_cluster_patch.
+    """
+    if cfg.worker_groups:
+        first = cfg.worker_groups[0]
+        worker_note = (
+            f"    # Worker group '{first.name}' — the other "
+            f"{len(cfg.worker_groups) - 1} group(s) are added by the oc patch"
+        )
+        num_workers, worker_cpus, worker_memory_gb = (
+            first.replicas,
+            first.cpus,
+            first.memory_gb,
+        )
+    else:
+        worker_note = (
+            f"    # Worker pods — {cfg.schedulable_cpus} CPUs usable by actors "
+            f"+ {OVERHEAD_CPUS} for Ray overhead"
+        )
+        num_workers, worker_cpus, worker_memory_gb = (
+            cfg.num_workers,
+            cfg.worker_cpus,
+            cfg.worker_memory_gb,
+        )
     lines = [
         "",
         "--- ClusterConfiguration (CodeFlare SDK) ---",
@@ -323,12 +968,12 @@ def format_cluster_config(cfg: PipelineConfig) -> str:
         f"    head_memory_requests={cfg.head_memory_gb},",
         f"    head_memory_limits={cfg.head_memory_gb},",
         "",
-        f"    # Worker pods — {cfg.schedulable_cpus} CPUs usable by actors + {OVERHEAD_CPUS} for Ray overhead",
-        f"    num_workers={cfg.num_workers},",
-        f"    worker_cpu_requests={cfg.worker_cpus},",
-        f"    worker_cpu_limits={cfg.worker_cpus},",
-        f"    worker_memory_requests={cfg.worker_memory_gb},",
-        f"    worker_memory_limits={cfg.worker_memory_gb},",
+        worker_note,
+        f"    num_workers={num_workers},",
+        f"    worker_cpu_requests={worker_cpus},",
+        f"    worker_cpu_limits={worker_cpus},",
+        f"    worker_memory_requests={worker_memory_gb},",
+        f"    worker_memory_limits={worker_memory_gb},",
         "",
         '    image="quay.io/cathaloconnor/docling-ray:latest",',
         "",
@@ -341,33 +986,85 @@ def format_cluster_config(cfg: PipelineConfig) -> str:
     return "\n".join(lines)
 
 
+def _worker_group_patch(index: int, group: WorkerGroup) -> List[dict]:
+    """Patch ops that reshape the copied workerGroupSpecs entry ``index``."""
+    base = f"/spec/workerGroupSpecs/{index}"
+    resources = f"{base}/template/spec/containers/0/resources"
+    ops = [
+        {"op": "replace", "path": f"{base}/groupName", "value": group.name},
+        {"op": "replace", "path": f"{base}/replicas", "value": group.replicas},
+        {"op": "replace", "path": f"{base}/minReplicas", "value": group.replicas},
+        {"op": "replace", "path": f"{base}/maxReplicas", "value": group.replicas},
+    ]
+    for kind in ("requests", "limits"):
+        ops.append({
+            "op": "replace",
+            "path": f"{resources}/{kind}/cpu",
+            "value": group.cpus,
+        })
+        ops.append({
+            "op": "replace",
+            "path": f"{resources}/{kind}/memory",
+            "value": f"{group.memory_gb}G",
+        })
+    return ops
+
+
 def format_cluster_patch(cfg: PipelineConfig) -> str:
-    """JSON patch for oc patch to set rayStartParams (not exposed by CodeFlare SDK)."""
+    """JSON patch for oc patch to set rayStartParams (not exposed by CodeFlare SDK).
+
+    With several worker groups the SDK-created group 0 is copied once per
+    extra group and each copy is resized.  Every group advertises only the
+    CPUs of the actors placed on it, so memory-bound groups are not overpacked.
+    """
     patch = [
         {
             "op": "replace",
             "path": "/spec/enableInTreeAutoscaling",
             "value": True,
         },
-        {
-            "op": "add",
-            "path": "/spec/workerGroupSpecs/0/rayStartParams/num-cpus",
-            "value": str(cfg.schedulable_cpus),
-        },
-        {
-            "op": "add",
-            "path": "/spec/headGroupSpec/rayStartParams/num-cpus",
-            "value": str(HEAD_RAY_NUM_CPUS),
-        },
     ]
+    if cfg.worker_groups:
+        for index, group in enumerate(cfg.worker_groups[1:], start=1):
+            patch.append({
+                "op": "copy",
+                "from": "/spec/workerGroupSpecs/0",
+                "path": "/spec/workerGroupSpecs/-",
+            })
+            patch.extend(_worker_group_patch(index, group))
+        num_cpus = [g.actors_per_worker * cfg.cpus_per_actor for g in cfg.worker_groups]
+    else:
+        num_cpus = [cfg.schedulable_cpus]
+    for index, cpus in enumerate(num_cpus):
+        patch.append({
+            "op": "add",
+            "path": f"/spec/workerGroupSpecs/{index}/rayStartParams/num-cpus",
+            "value": str(cpus),
+        })
+    patch.append({
+        "op": "add",
+        "path": "/spec/headGroupSpec/rayStartParams/num-cpus",
+        "value": str(HEAD_RAY_NUM_CPUS),
+    })
     patch_json = json.dumps(patch, indent=2)
 
+    if cfg.worker_groups:
+        worker_note = "#   - Worker num-cpus per group: " + ", ".join(
+            f"{g.name}={cpus}"
+            for g, cpus in zip(cfg.worker_groups, num_cpus, strict=True)
+        )
+    else:
+        worker_note = (
+            f"#   - Worker num-cpus={cfg.schedulable_cpus} "
+            f"(reserves {OVERHEAD_CPUS} CPUs for Ray overhead)"
+        )
+
     lines = [
         "",
         "--- oc patch command (apply after cluster.apply()) ---",
         "",
         "# The CodeFlare SDK does not expose rayStartParams, so we patch these after cluster.apply():",
-        f"#   - Worker num-cpus={cfg.schedulable_cpus} (reserves {OVERHEAD_CPUS} CPUs for Ray overhead)",
+        worker_note,
         f"#   - Head num-cpus={HEAD_RAY_NUM_CPUS} (prevents actors from scheduling on head)",
         "#   - enableInTreeAutoscaling=true (ensures all workers register)",
         "",
@@ -467,6 +1164,18 @@ def interactive_mode() -> dict:
 # ─── CLI Argument Parsing ─────────────────────────────────────────────────────
 
 
+def _parse_worker_group(spec: str) -> WorkerGroup:
+    """Parse a ``NAME:REPLICAS:CPUS:MEMORY_GB`` worker group spec."""
+    parts = spec.split(":")
+    try:
+        name, replicas, cpus, memory_gb = parts[0], *map(int, parts[1:])
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME:REPLICAS:CPUS:MEMORY_GB, got {spec!r}"
+        ) from None
+    return WorkerGroup(name, replicas, cpus, memory_gb)
+
+
 def parse_args() -> argparse.Namespace:
     """Parse CLI arguments."""
     parser = argparse.ArgumentParser(
@@ -477,6 +1186,9 @@ Examples:
   %(prog)s --interactive
   %(prog)s --num-files 10000 --num-workers 8 --worker-cpus 8 --worker-memory 16
   %(prog)s --num-files 1000 --num-workers 4 --worker-cpus 8 --worker-memory 16 --show-env
+  %(prog)s --num-files 10000 --input-dir ./sample-pdfs
+  %(prog)s --num-files 10000 --benchmark ./sample-pdfs --show-env
+  %(prog)s --worker-group small:4:8:16 --worker-group large:2:32:128 --show-all
 """,
     )
 
@@ -510,6 +1222,15 @@ Examples:
         default=16,
         help="Memory per worker in GB (default: 16)",
     )
+    parser.add_argument(
+        "--worker-group",
+        dest="worker_groups",
+        action="append",
+        type=_parse_worker_group,
+        metavar="NAME:REPLICAS:CPUS:MEMORY_GB",
+        help="Add a worker group (repeatable) for clusters that mix node sizes; "
+        "replaces --num-workers/--worker-cpus/--worker-memory",
+    )
     parser.add_argument(
         "--head-cpus",
         type=int,
@@ -537,6 +1258,20 @@ Examples:
         default=False,
         help="Disable table structure detection",
     )
+    parser.add_argument(
+        "--num-spare-converters",
+        type=int,
+        default=DEFAULT_NUM_SPARE_CONVERTERS,
+        help="Warm standby converters per actor, each with its own models "
+        f"(default: {DEFAULT_NUM_SPARE_CONVERTERS})",
+    )
+    parser.add_argument(
+        "--pipeline-profile",
+        choices=["auto", "full", "fast"],
+        default=DEFAULT_PIPELINE_PROFILE,
+        help="Docling pipeline profile; auto loads both pipelines "
+        f"(default: {DEFAULT_PIPELINE_PROFILE})",
+    )
     parser.add_argument(
         "--batch-size",
         type=int,
@@ -549,6 +1284,41 @@ Examples:
         default=DEFAULT_REPARTITION_FACTOR,
         help=f"Repartition factor (default: {DEFAULT_REPARTITION_FACTOR})",
     )
+    parser.add_argument(
+        "--input-dir",
+        default=None,
+        help="Local PDF directory (or a representative sample) used to "
+        "estimate per-file cost and recommend repartition_factor",
+    )
+    parser.add_argument(
+        "--benchmark",
+        metavar="SAMPLE_DIR",
+        default=None,
+        help="Convert a local PDF sample at several cpus_per_actor settings "
+        "(requires docling) and tune cpus_per_actor, batch_size and "
+        "repartition_factor from the measured throughput",
+    )
+    parser.add_argument(
+        "--benchmark-cpus",
+        default=None,
+        help="Comma-separated cpus_per_actor settings to benchmark "
+        f"(default: {','.join(map(str, BENCHMARK_CPUS))}, up to local CPUs)",
+    )
+    parser.add_argument(
+        "--benchmark-files",
+        type=int,
+        default=BENCHMARK_MAX_FILES,
+        help=f"PDFs converted per benchmark setting (default: {BENCHMARK_MAX_FILES})",
+    )
+    parser.add_argument(
+        "--ingest-runs",
+        nargs="+",
+        metavar="PATH",
+        default=None,
+        help="Run summaries written by ray_data_process (JSON files or the "
+        "output's _summaries directory): adds their measured throughput to "
+        "the time model and flags CPU-, memory- or straggler-bound runs",
+    )
     parser.add_argument(
         "--object-store-proportion",
         type=float,
@@ -617,13 +1387,48 @@ def main():
             "cpus_per_actor": args.cpus_per_actor,
             "do_ocr": args.ocr,
             "do_table_structure": not args.no_table_structure,
+            "num_spare_converters": args.num_spare_converters,
+            "pipeline_profile": args.pipeline_profile,
             "batch_size": args.batch_size,
             "repartition_factor": args.repartition_factor,
             "object_store_proportion": args.object_store_proportion,
+            "worker_groups": args.worker_groups or [],
         }
+        if args.input_dir:
+            inputs["file_costs"] = scan_file_costs(args.input_dir, args.num_files)
+        if args.benchmark:
+            if args.benchmark_cpus:
+                cpus_options = [int(c) for c in args.benchmark_cpus.split(",")]
+            else:
+                local_cpus = os.cpu_count() or 1
+                cpus_options = [c for c in BENCHMARK_CPUS if c <= local_cpus] or [1]
+            samples, pages_per_file = run_benchmark(
+                args.benchmark,
+                cpus_options,
+                args.benchmark_files,
+                inputs["do_ocr"],
+                inputs["do_table_structure"],
+            )
+            inputs["benchmark_samples"] = samples
+            inputs["benchmark_pages_per_file"] = pages_per_file
+            if not args.input_dir:
+                inputs["file_costs"] = scan_file_costs(args.benchmark, args.num_files)
+        if args.ingest_runs:
+            runs = [summarize_run(s) for s in load_run_summaries(args.ingest_runs)]
+            inputs["past_runs"] = runs
+            measured = [r for r in runs if r["pages_per_s_per_actor"] > 0]
+            inputs["benchmark_samples"] = inputs.get("benchmark_samples", []) + [
+                (r["cpus_per_actor"], r["pages_per_s_per_actor"]) for r in measured
+            ]
+            if measured and not args.benchmark:
+                inputs["benchmark_pages_per_file"] = sum(
+                    r["pages_per_file"] for r in measured
+                ) / len(measured)
 
     cfg = PipelineConfig(**inputs)
     cfg = calculate(cfg)
+    if cfg.benchmark_samples:
+        cfg = autotune(cfg)
     cfg = validate(cfg)
 
     if args.json:
@@ -639,9 +1444,20 @@ def main():
                 "cpus_per_actor": cfg.cpus_per_actor,
                 "do_ocr": cfg.do_ocr,
                 "do_table_structure": cfg.do_table_structure,
+                "num_spare_converters": cfg.num_spare_converters,
+                "pipeline_profile": cfg.pipeline_profile,
                 "batch_size": cfg.batch_size,
                 "repartition_factor": cfg.repartition_factor,
                 "object_store_proportion": cfg.object_store_proportion,
+                "worker_groups": [
+                    {
+                        "name": g.name,
+                        "replicas": g.replicas,
+                        "cpus": g.cpus,
+                        "memory_gb": g.memory_gb,
+                    }
+                    for g in cfg.worker_groups
+                ],
             },
             "derived": {
                 "schedulable_cpus": cfg.schedulable_cpus,
@@ -657,7 +1473,27 @@ def main():
                 "total_cluster_memory_gb": cfg.total_cluster_memory_gb,
                 "estimated_time_fast_s": round(cfg.estimated_time_fast_s, 1),
                 "estimated_time_slow_s": round(cfg.estimated_time_slow_s, 1),
+                "estimated_time_model_s": round(cfg.estimated_time_model_s, 1),
+                "max_block_cost_s": round(cfg.max_block_cost_s, 1),
+                "recommended_repartition_factor": cfg.recommended_repartition_factor,
+                "fitted_serial_s": round(cfg.fitted_serial_s, 4),
+                "fitted_parallel_s": round(cfg.fitted_parallel_s, 4),
+                "cluster_pages_per_s": round(cfg.cluster_pages_per_s, 2),
+                "worker_groups": [
+                    {
+                        "name": g.name,
+                        "actors_per_worker": g.actors_per_worker,
+                        "memory_per_actor_gb": round(g.memory_per_actor_gb, 1),
+                        "ray_num_cpus": g.actors_per_worker * cfg.cpus_per_actor,
+                    }
+                    for g in cfg.worker_groups
+                ],
             },
+            "benchmark": [
+                {"cpus_per_actor": cpus, "pages_per_s": round(rate, 3)}
+                for cpus, rate in cfg.benchmark_samples
+            ],
+            "past_runs": cfg.past_runs,
             "errors": cfg.errors,
             "warnings": cfg.warnings,
         }
@@ -8,17 +8,33 @@ hardcoded values.  See the companion notebooks for how these variables are
 set at submission time.
 """
 
-import glob
+import functools
+import hashlib
+import itertools
+import json
 import multiprocessing as mp
 import os
 import queue
+import resource
+import shutil
+import sqlite3
 import subprocess
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import ray
+from configure import (
+    EST_SECONDS_PER_FILE,
+    EST_SECONDS_PER_PAGE,
+    estimate_file_cost,
+    pack_blocks,
+)
 
 # ---------------------------------------------------------------------------
 # Parameters (passed as environment variables from the job submission)
@@ -33,10 +49,72 @@ PVC_MOUNT_PATH = os.environ.get("PVC_MOUNT_PATH", "/mnt/data")
 INPUT_PATH = os.environ.get("INPUT_PATH", "input/pdfs/10000")
 OUTPUT_PATH = os.environ.get("OUTPUT_PATH", "output")
 WRITE_JSON = os.environ.get("WRITE_JSON", "1").lower() in ("1", "true", "yes")
+# First NUM_FILES pending PDFs in listing order (0 = all)
 NUM_FILES = int(os.environ.get("NUM_FILES", "10000"))
+# Optional file listing the input PDFs, one path per line (absolute or
+# relative to INPUT_PATH); when unset the input tree is walked in parallel
+INPUT_LISTING = os.environ.get("INPUT_LISTING", "")
+LISTING_BLOCK_SIZE = 1000  # paths per block while listing for packing
+LISTING_THREADS = 16  # directories walked concurrently by the listing task
 
 FILE_TIMEOUT = int(os.environ.get("FILE_TIMEOUT", "600"))
+# Per-file deadlines from expected pages and the observed seconds per page,
+# clamped to [TIMEOUT_FLOOR, FILE_TIMEOUT] (0 = FILE_TIMEOUT for every file)
+ADAPTIVE_TIMEOUT = os.environ.get("ADAPTIVE_TIMEOUT", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+TIMEOUT_FLOOR = int(os.environ.get("TIMEOUT_FLOOR", "60"))
+TIMEOUT_SLACK = float(os.environ.get("TIMEOUT_SLACK", "4"))
 MAX_ERRORED_BLOCKS = int(os.environ.get("MAX_ERRORED_BLOCKS", "100"))
+# Requests kept in flight per converter (1 = strict request/response)
+PIPELINE_DEPTH = max(1, int(os.environ.get("PIPELINE_DEPTH", "2")))
+# Pre-initialised converters kept per actor to take over after a timeout
+NUM_SPARE_CONVERTERS = int(os.environ.get("NUM_SPARE_CONVERTERS", "0"))
+CONVERTER_READY_TIMEOUT = 300  # Docling model loading can take minutes
+# Documents whose outputs may be waiting to be written while the converter
+# moves on to the next request (0 = write before the next conversion)
+WRITE_QUEUE_DEPTH = int(os.environ.get("WRITE_QUEUE_DEPTH", "2"))
+# "files": one Markdown (and JSON) file per document.  "parquet": documents
+# are markdown/doc_json columns of compressed Parquet shards in PARQUET_DIR.
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "files").lower()
+PARQUET_DIR = "parquet"  # relative to the output directory
+PARQUET_ROWS_PER_FILE = int(os.environ.get("PARQUET_ROWS_PER_FILE", "50"))
+# Return Markdown/JSON as dataset columns (via shared memory) instead of files
+RETURN_PAYLOADS = OUTPUT_FORMAT == "parquet" or os.environ.get(
+    "RETURN_PAYLOADS", "0"
+).lower() in ("1", "true", "yes")
+
+# Split PDFs longer than this many pages into page-range work items (0 = off)
+SHARD_PAGES = int(os.environ.get("SHARD_PAGES", "0"))
+SHARDS_DIR = "_shards"  # page-range parts, relative to the output directory
+
+# Pack blocks by estimated cost (configure.estimate_file_cost) instead of
+# count; the whole (path, cost) table is built before conversion starts
+PACK_BLOCKS = os.environ.get("PACK_BLOCKS", "0").lower() in ("1", "true", "yes")
+# Read page counts for the cost estimate (sharding always reads them)
+ESTIMATE_PAGES = os.environ.get("ESTIMATE_PAGES", "0").lower() in ("1", "true", "yes")
+
+# Skip inputs the completion manifest already records as converted
+RESUME = os.environ.get("RESUME", "1").lower() in ("1", "true", "yes")
+MANIFEST_NAME = "_manifest.sqlite"  # relative to the output directory
+RESULTS_DIR = "_results"  # per-file results, one Parquet dataset per run
+SUMMARIES_DIR = "_summaries"  # run summaries for configure.py --ingest-runs
+
+# Content-addressed cache of conversion outputs, shared by all actors
+CACHE_DIR = os.environ.get(
+    "CACHE_DIR", os.path.join(PVC_MOUNT_PATH, ".cache", "docling-outputs")
+)
+CACHE_MAX_GB = float(os.environ.get("CACHE_MAX_GB", "10"))  # 0 = disabled
+
+# Docling pipeline per document: "full" (table structure model), "fast"
+# (no table model) or "auto" (classify each document's text layer)
+PIPELINE_PROFILE = os.environ.get("PIPELINE_PROFILE", "auto").lower()
+CLASSIFY_PAGES = 32  # pages sampled per document by the classifier
+
+# Export live per-actor metrics through Ray's Prometheus endpoint
+ENABLE_METRICS = os.environ.get("ENABLE_METRICS", "1").lower() in ("1", "true", "yes")
 
 
 def _mkdir(path: Path):
@@ -44,10 +122,14 @@ def _mkdir(path: Path):
 
 
 def _write(path, data, retries=3, delay=0.5):
+    # Write then rename, so readers never see a partial file and outputs
+    # hard-linked from the conversion cache are replaced, not overwritten.
+    tmp_path = f"{path}.tmp"
     for attempt in range(retries):
         try:
-            with open(path, "wb") as f:
+            with open(tmp_path, "wb") as f:
                 f.write(data)
+            os.replace(tmp_path, path)
             return
         except OSError:
             if attempt < retries - 1:
@@ -56,17 +138,405 @@ def _write(path, data, retries=3, delay=0.5):
                 raise
 
 
+def _count_pages(path: str) -> int:
+    """Read the page count from the PDF header without parsing page content."""
+    import pypdfium2 as pdfium
+
+    try:
+        pdf = pdfium.PdfDocument(path)
+    except Exception:
+        return 0
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _shard_name(fname_base: str, page_range: Tuple[int, int]) -> str:
+    return f"{fname_base}.{page_range[0]:05d}-{page_range[1]:05d}"
+
+
+def _output_paths(fname_base: str) -> List[str]:
+    """Final output files of one document, relative to the output directory."""
+    paths = [f"markdown/{fname_base}.md"]
+    if WRITE_JSON:
+        paths.append(f"json/{fname_base}.json")
+    return paths
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline profiles
+# ---------------------------------------------------------------------------
+
+# Table structure inference is what "full" adds over "fast"
+PROFILE_TABLE_STRUCTURE = {"full": True, "fast": False}
+TABLE_GAP_PT = 10  # horizontal gap that separates table cells on a line
+
+
+def _looks_tabular(page, textpage) -> bool:
+    """Guess from text positions and ruling lines whether a page has a table.
+
+    pdfium returns a text line as several rectangles, split at large gaps
+    and font changes.  A line with two or more gaps wider than
+    ``TABLE_GAP_PT`` is a candidate table row; the page looks tabular when
+    the edges around those gaps line up across rows in at least two
+    columns, or when candidate rows come with many drawn ruling lines.
+    Justified or two-column prose has gaps too, but they do not align.
+    """
+    import pypdfium2.raw as pdfium_c
+
+    rows = {}
+    for i in range(textpage.count_rects()):
+        left, bottom, right, top = textpage.get_rect(i)
+        rows.setdefault(round((bottom + top) / 4), []).append((left, right))  # 2pt
+    edges, split_rows = {}, 0
+    for segments in rows.values():
+        segments.sort()
+        row_edges = set()
+        for (_, prev_right), (left, _) in zip(segments, segments[1:], strict=False):
+            if left - prev_right > TABLE_GAP_PT:
+                row_edges.update({
+                    ("right", round(prev_right / 5)),
+                    ("left", round(left / 5)),
+                })
+        if len(row_edges) >= 4:
+            split_rows += 1
+            for edge in row_edges:
+                edges[edge] = edges.get(edge, 0) + 1
+    if sum(1 for count in edges.values() if count >= 3) >= 2:
+        return True
+    if split_rows < 2:
+        return False
+    paths = page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_PATH], max_depth=1)
+    return sum(1 for _ in paths) >= 30
+
+
+def _classify_document(
+    file_bytes: bytes, page_range: Optional[Tuple[int, int]] = None
+) -> str:
+    """Pick the pipeline profile for a PDF from its text layer.
+
+    Samples up to CLASSIFY_PAGES pages evenly (within ``page_range`` if
+    given).  Returns "fast" only when every sampled page has text and none
+    looks tabular; files that cannot be read or lack a text layer get
+    "full".
+    """
+    import pypdfium2 as pdfium
+
+    try:
+        pdf = pdfium.PdfDocument(file_bytes)
+    except Exception:
+        return "full"
+    try:
+        first, last = page_range if page_range else (1, len(pdf))
+        indices = list(range(first - 1, min(last, len(pdf))))
+        step = max(1, len(indices) // CLASSIFY_PAGES)
+        for index in indices[::step][:CLASSIFY_PAGES]:
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                if textpage.count_chars() == 0 or _looks_tabular(page, textpage):
+                    return "full"
+            finally:
+                textpage.close()
+                page.close()
+        return "fast" if indices else "full"
+    except Exception:
+        return "full"
+    finally:
+        pdf.close()
+
+
+# ---------------------------------------------------------------------------
+# Conversion cache
+# ---------------------------------------------------------------------------
+
+
+class _OutputCache:
+    """Content-addressed store of conversion outputs on the shared PVC.
+
+    Entries are keyed on the input bytes' hash, the Docling pipeline options
+    and the page range, so byte-identical PDFs under different names are
+    converted once.  A hit hard-links (or copies, across filesystems) the
+    cached files to the requested output paths.  Every converter evicts
+    least-recently-used entries once the cache grows past ``max_gb``;
+    concurrent sweeps from other actors are harmless.
+    """
+
+    SWEEP_FRACTION = 0.05  # sweep after adding this share of max_gb
+    TARGET_FRACTION = 0.9  # evict down to this share of max_gb
+
+    def __init__(self, root: Path, max_gb: float, options: Tuple):
+        self.root = root
+        self.max_bytes = int(max_gb * 1024**3)
+        self.options = repr(options)
+        self._added_bytes = 0
+        _mkdir(self.root)
+
+    def key(self, content_hash: str, page_range: Optional[Tuple[int, int]]) -> str:
+        return _content_hash(f"{content_hash}|{self.options}|{page_range}".encode())
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def fetch(self, key: str, outputs: List[Path]) -> Optional[Dict]:
+        """Materialise a cached entry at ``outputs``; None on a miss."""
+        entry = self._entry(key)
+        meta_path = entry.with_suffix(".meta")
+        try:
+            meta = json.loads(meta_path.read_bytes())
+            for out in outputs:
+                _link_or_copy(entry.with_suffix(out.suffix), out)
+            os.utime(meta_path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def store(self, key: str, outputs: List[Path], meta: Dict):
+        entry = self._entry(key)
+        try:
+            _mkdir(entry.parent)
+            for out in outputs:
+                _link_or_copy(out, entry.with_suffix(out.suffix))
+                self._added_bytes += out.stat().st_size
+            # The meta file is written last: its presence marks the entry
+            # complete and its mtime is the LRU clock.
+            _write(entry.with_suffix(".meta"), json.dumps(meta).encode())
+        except OSError:
+            return
+        if self._added_bytes > self.max_bytes * self.SWEEP_FRACTION:
+            self._added_bytes = 0
+            self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until under the size target.
+
+        Files are grouped into entries by their key, the name up to the
+        first dot.  In-flight ``*.tmp`` files belong to a writer and are
+        never touched.  An entry's age is its meta file's mtime, or, while
+        it has no meta file yet, its newest file's, so an entry another
+        actor is still storing is not the first to go.
+        """
+        entries, total = {}, 0  # key -> [meta mtime, newest mtime, size, files]
+        for sub in self.root.iterdir():
+            if not sub.is_dir():
+                continue
+            for f in sub.iterdir():
+                if f.suffix == ".tmp":
+                    continue
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                total += st.st_size
+                info = entries.setdefault(f.name.split(".", 1)[0], [0.0, 0.0, 0, []])
+                info[1] = max(info[1], st.st_mtime)
+                info[2] += st.st_size
+                info[3].append(f)
+                if f.suffix == ".meta":
+                    info[0] = st.st_mtime
+        if total <= self.max_bytes:
+            return
+        for _, _, size, files in sorted(
+            entries.values(), key=lambda info: info[0] or info[1]
+        ):
+            for f in files:
+                f.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes * self.TARGET_FRACTION:
+                break
+
+
+def _link_or_copy(src: Path, dst: Path):
+    """Replace ``dst`` with a hard link to ``src``, copying across devices."""
+    tmp = Path(f"{dst}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        if not src.exists():
+            raise
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
 # ---------------------------------------------------------------------------
 # Converter subprocess
 # ---------------------------------------------------------------------------
 
 
-def _converter_worker(req_q, res_q, cpus_per_actor, output_base_str, write_json):
+class _OutputWriter:
+    """Writes converter outputs on a background thread.
+
+    One thread writes queued documents in order, so output I/O (and its
+    retry sleeps) overlaps the next ``converter.convert``.  A document's
+    result is only sent once its outputs are on disk and in the cache, so a
+    write failure is reported for that file and the parent never counts a
+    file whose outputs are missing.  At most ``depth`` documents are queued
+    or being written; ``submit`` blocks while that many are outstanding and
+    records the time it waited as ``write_wait_s``.  With ``depth=0`` writes
+    happen inline.
+    """
+
+    def __init__(self, res_q, cache: Optional["_OutputCache"], depth: int):
+        self.res_q = res_q
+        self.cache = cache
+        self._jobs = None
+        if depth > 0:
+            self._slots = threading.Semaphore(depth)
+            self._jobs = queue.Queue()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def submit(self, req_id, writes: List[Tuple[Path, bytes]], info: Dict, cache_key):
+        """Write ``writes`` then send ``info`` as the result of ``req_id``."""
+        job = (req_id, writes, info, cache_key)
+        if self._jobs is None:
+            self._complete(*job)
+            return
+        t_wait = time.time()
+        self._slots.acquire()
+        info["write_wait_s"] = time.time() - t_wait
+        self._jobs.put(job)
+
+    def close(self):
+        """Finish outstanding writes."""
+        if self._jobs is not None:
+            self._jobs.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                self._complete(*job)
+            finally:
+                self._slots.release()
+
+    def _complete(self, req_id, writes, info, cache_key):
+        try:
+            t_write = time.time()
+            for path, data in writes:
+                _write(path, data)
+            info["write_s"] = time.time() - t_write
+            if self.cache:
+                meta = {k: info[k] for k in ("page_count", "md_kb", "js_kb", "profile")}
+                self.cache.store(cache_key, [path for path, _ in writes], meta)
+        except Exception as e:
+            self.res_q.put((req_id, "error", {"error": f"Write failed: {e}"[:150]}))
+            return
+        self.res_q.put((req_id, "success", info))
+
+
+def _payload_name(owner_pid: int, req_id: int) -> str:
+    """Shared-memory segment name for the payload of one request."""
+    return f"docling-{owner_pid}-{req_id}"
+
+
+def _put_payload(name: str, *parts: bytes) -> List[int]:
+    """Copy ``parts`` into a new shared-memory segment and return their sizes.
+
+    Only the name and sizes travel through the result queue, so large
+    documents are not pickled through its pipe.  The segment is handed to
+    the parent, which unlinks it in ``_take_payload``; it is untracked here
+    so that this process exiting does not remove it first.
+    """
+    from multiprocessing import resource_tracker, shared_memory
+
+    sizes = [len(part) for part in parts]
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(sum(sizes), 1))
+    offset = 0
+    for part in parts:
+        shm.buf[offset : offset + len(part)] = part
+        offset += len(part)
+    shm.close()
+    # The tracker records POSIX segments under their name with a leading slash
+    resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+    return sizes
+
+
+def _take_payload(name: str, sizes: List[int]) -> List[str]:
+    """Decode the UTF-8 parts stored by ``_put_payload`` and free the segment.
+
+    Each part is decoded straight from the shared buffer, without first
+    copying it out as bytes.
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        parts, offset = [], 0
+        for size in sizes:
+            # Released before close(), which fails while views are exported
+            with shm.buf[offset : offset + size] as view:
+                parts.append(str(view, "utf-8"))
+            offset += size
+    finally:
+        shm.close()
+        shm.unlink()
+    return parts
+
+
+def _discard_payload(name: str):
+    """Free a payload segment nobody will read, if it was created."""
+    from multiprocessing import shared_memory
+
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def _profiled_seconds(timings: Dict, scope: str) -> float:
+    """Total seconds Docling's profiler recorded for ``scope``, or 0."""
+    item = timings.get(scope)
+    return float(sum(item.times)) if item is not None else 0.0
+
+
+def _converter_worker(
+    req_q,
+    res_q,
+    cpus_per_actor,
+    output_base_str,
+    write_json,
+    write_queue_depth,
+    return_payloads,
+):
     """Long-running subprocess that owns the DocumentConverter.
 
-    Initialises Docling once, then loops on a request queue converting one
-    file at a time.  Output files (markdown, JSON) are written directly
+    Initialises Docling once, including its models, then loops on a request
+    queue converting one file at a time.  Output files (markdown, JSON) are written directly
     from this process to avoid passing large data through the queue.
+
+    Requests are ``(req_id, file_path, page_range)`` tuples.  Results are
+    ``(req_id, status, info)`` where ``info`` holds the fields of
+    ``_RESULT_DEFAULTS`` that apply; echoing ``req_id`` lets the parent keep
+    several requests in flight and match results back to their inputs.
+    When ``page_range`` is set only those pages are converted and the
+    outputs go to the shards directory, to be stitched together by the
+    driver.  Outputs of byte-identical inputs are served from the
+    conversion cache instead of being converted again.  Outputs are written
+    by an ``_OutputWriter`` while the next request is converted.
+
+    With ``return_payloads`` nothing is written: the Markdown and JSON bytes
+    are handed to the parent in a shared-memory segment (``_put_payload``)
+    and the cache is bypassed.
+
+    Every result carries the wall time of each stage (``STAGE_COLUMNS``);
+    ``layout_s`` and ``table_s`` come from Docling's pipeline profiler and
+    are summed over pages.
+
+    One converter is initialised per pipeline profile in use.  With
+    ``PIPELINE_PROFILE=auto`` each request is routed by
+    ``_classify_document`` and the chosen profile is returned with it.
     """
     os.environ["OMP_NUM_THREADS"] = str(cpus_per_actor)
     os.environ["MKL_NUM_THREADS"] = str(cpus_per_actor)
@@ -78,70 +548,430 @@ def _converter_worker(req_q, res_q, cpus_per_actor, output_base_str, write_json)
         AcceleratorOptions,
         PdfPipelineOptions,
     )
+    from docling.datamodel.settings import settings
     from docling.document_converter import DocumentConverter, PdfFormatOption
 
-    pipeline_options = PdfPipelineOptions()
-    pipeline_options.do_ocr = False
-    pipeline_options.do_table_structure = True
-    pipeline_options.accelerator_options = AcceleratorOptions(
-        num_threads=cpus_per_actor,
-        device="cpu",
-    )
-    converter = DocumentConverter(
-        format_options={
-            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-        }
+    settings.debug.profile_pipeline_timings = True
+
+    def make_converter(do_table_structure: bool) -> DocumentConverter:
+        pipeline_options = PdfPipelineOptions()
+        pipeline_options.do_ocr = False
+        pipeline_options.do_table_structure = do_table_structure
+        pipeline_options.accelerator_options = AcceleratorOptions(
+            num_threads=cpus_per_actor,
+            device="cpu",
+        )
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+            }
+        )
+
+    profiles = (
+        list(PROFILE_TABLE_STRUCTURE)
+        if PIPELINE_PROFILE == "auto"
+        else [PIPELINE_PROFILE]
     )
+    converters = {
+        profile: make_converter(PROFILE_TABLE_STRUCTURE[profile])
+        for profile in profiles
+    }
+    # Docling loads the layout and table models on first use; load them now
+    # so a warm spare is ready to convert the moment it takes over
+    for converter in converters.values():
+        converter.initialize_pipeline(InputFormat.PDF)
 
     output_base = Path(output_base_str)
     markdown_dir = output_base / "markdown"
     json_dir = output_base / "json" if write_json else None
+    shards_dir = output_base / SHARDS_DIR
 
     if write_json:
         import orjson
 
+    cache = (
+        _OutputCache(
+            Path(CACHE_DIR),
+            CACHE_MAX_GB,
+            # "auto" routing is a function of the input bytes, so the
+            # profile setting (not the per-document choice) keys the cache
+            options=(False, PIPELINE_PROFILE),
+        )
+        if CACHE_MAX_GB > 0 and not return_payloads
+        else None
+    )
+
+    writer = _OutputWriter(res_q, cache, write_queue_depth)
+
     # Signal parent that initialisation is complete
     res_q.put(("ready",))
 
     while True:
         msg = req_q.get()
         if msg is None:
+            writer.close()
             break
 
-        file_path = msg
+        req_id, file_path, page_range = msg
         try:
+            t_stage = time.time()
             with open(file_path, "rb") as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
                 file_bytes = f.read()
 
             file_size = len(file_bytes)
             if file_size == 0:
-                res_q.put(("error", 0, 0, 0.0, 0.0, "File empty"))
+                res_q.put((req_id, "error", {"error": "File empty"}))
                 continue
+            content_hash = _content_hash(file_bytes)
+            read_s = time.time() - t_stage
 
             fname = os.path.basename(file_path)
             fname_base = fname.rsplit(".", 1)[0]
 
+            if page_range is None:
+                md_path = markdown_dir / f"{fname_base}.md"
+                json_path = json_dir / f"{fname_base}.json" if json_dir else None
+                convert_kwargs = {}
+            else:
+                part = _shard_name(fname_base, page_range)
+                md_path = shards_dir / f"{part}.md"
+                json_path = shards_dir / f"{part}.json" if json_dir else None
+                convert_kwargs = {"page_range": page_range}
+
+            outputs = [md_path] if json_path is None else [md_path, json_path]
+            cache_key = cache.key(content_hash, page_range) if cache else None
+            cached = cache.fetch(cache_key, outputs) if cache else None
+            if cached is not None:
+                res_q.put((
+                    req_id,
+                    "success",
+                    {
+                        **cached,
+                        "file_size": file_size,
+                        "content_hash": content_hash,
+                        "mtime_ns": mtime_ns,
+                        "cache_hit": True,
+                        "read_s": read_s,
+                    },
+                ))
+                continue
+
+            t_stage = time.time()
+            profile = (
+                _classify_document(file_bytes, page_range)
+                if PIPELINE_PROFILE == "auto"
+                else PIPELINE_PROFILE
+            )
+            classify_s = time.time() - t_stage
+
+            t_stage = time.time()
             stream = DocumentStream(name=fname, stream=io.BytesIO(file_bytes))
-            result = converter.convert(stream)
+            result = converters[profile].convert(stream, **convert_kwargs)
             doc = result.document
+            convert_s = time.time() - t_stage
+            timings = getattr(result, "timings", None) or {}
 
             pages = getattr(doc, "pages", None)
             page_count = len(pages) if pages is not None else 0
 
+            t_stage = time.time()
             md_bytes = doc.export_to_markdown().encode("utf-8")
             md_kb = round(len(md_bytes) / 1024, 2)
-            _write(markdown_dir / f"{fname_base}.md", md_bytes)
+            markdown_s = time.time() - t_stage
+            writes = [(md_path, md_bytes)]
 
+            json_bytes = b""
             js_kb = 0.0
-            if write_json and json_dir is not None:
+            json_s = 0.0
+            if json_path is not None:
+                t_stage = time.time()
                 json_bytes = orjson.dumps(doc.export_to_dict())
                 js_kb = round(len(json_bytes) / 1024, 2)
-                _write(json_dir / f"{fname_base}.json", json_bytes)
-
-            res_q.put(("success", page_count, file_size, md_kb, js_kb, ""))
+                json_s = time.time() - t_stage
+                writes.append((json_path, json_bytes))
+
+            info = {
+                "page_count": page_count,
+                "file_size": file_size,
+                "md_kb": md_kb,
+                "js_kb": js_kb,
+                "content_hash": content_hash,
+                "mtime_ns": mtime_ns,
+                "profile": profile,
+                "read_s": read_s,
+                "classify_s": classify_s,
+                "convert_s": convert_s,
+                "layout_s": _profiled_seconds(timings, "layout"),
+                "table_s": _profiled_seconds(timings, "table_structure"),
+                "markdown_s": markdown_s,
+                "json_s": json_s,
+                # High-water mark of this converter process (Linux reports KB)
+                "peak_rss_mb": round(
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+                ),
+            }
+            if return_payloads:
+                name = _payload_name(os.getppid(), req_id)
+                info["payload"] = _put_payload(name, md_bytes, json_bytes)
+                res_q.put((req_id, "success", info))
+            else:
+                writer.submit(req_id, writes, info, cache_key)
 
         except Exception as e:
-            res_q.put(("error", 0, 0, 0.0, 0.0, str(e)[:150]))
+            res_q.put((req_id, "error", {"error": str(e)[:150]}))
+
+
+_RESULT_DEFAULTS = {
+    "page_count": 0,
+    "file_size": 0,
+    "md_kb": 0.0,
+    "js_kb": 0.0,
+    "error": "",
+    "content_hash": "",
+    "mtime_ns": 0,
+    "cache_hit": False,
+    "profile": "",
+    "read_s": 0.0,
+    "classify_s": 0.0,
+    "convert_s": 0.0,
+    "layout_s": 0.0,
+    "table_s": 0.0,
+    "markdown_s": 0.0,
+    "json_s": 0.0,
+    "write_wait_s": 0.0,
+    "write_s": 0.0,
+    "peak_rss_mb": 0.0,
+    "markdown": "",
+    "doc_json": "",
+}
+
+# Per-stage wall times reported by the converter, in pipeline order.
+# write_s runs on the writer thread; write_wait_s is the time conversion
+# stalled because the writer was WRITE_QUEUE_DEPTH documents behind.
+STAGE_COLUMNS = [
+    "read_s",
+    "classify_s",
+    "convert_s",
+    "layout_s",
+    "table_s",
+    "markdown_s",
+    "json_s",
+    "write_wait_s",
+    "write_s",
+]
+# Stages that are part of convert_s rather than a step of their own
+_NESTED_STAGES = ("layout_s", "table_s")
+
+
+class _Converter:
+    """Handle on one converter subprocess and its request/result queues.
+
+    The subprocess starts loading Docling as soon as the handle is created;
+    ``wait_ready``/``poll_ready`` consume its "ready" message, so spares can
+    warm up in the background while another converter does the work.
+    """
+
+    def __init__(self, output_base: Path):
+        self.req_q = mp.Queue()
+        self.res_q = mp.Queue()
+        self.process = mp.Process(
+            target=_converter_worker,
+            args=(
+                self.req_q,
+                self.res_q,
+                CPUS_PER_ACTOR,
+                str(output_base),
+                WRITE_JSON,
+                WRITE_QUEUE_DEPTH,
+                RETURN_PAYLOADS,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        self.ready = False
+        self.warm = False  # set once it has converted a file
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def wait_ready(self, timeout: float = CONVERTER_READY_TIMEOUT):
+        if not self.ready:
+            msg = self.res_q.get(timeout=timeout)
+            assert msg[0] == "ready"
+            self.ready = True
+
+    def poll_ready(self) -> bool:
+        try:
+            self.wait_ready(timeout=0)
+        except queue.Empty:
+            pass
+        return self.ready and self.process.is_alive()
+
+    def stop(self, abandoned: Iterable[int] = ()):
+        """Terminate the subprocess without blocking the caller.
+
+        Payload segments of the ``abandoned`` requests are freed once the
+        process has exited, so one it creates while being stopped does not
+        outlive it.
+        """
+        self.req_q.cancel_join_thread()
+        if self.process.is_alive():
+            self.process.terminate()
+        threading.Thread(
+            target=self._reap, args=(list(abandoned),), daemon=True
+        ).start()
+
+    def _reap(self, abandoned: List[int]):
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        for req_id in abandoned:
+            _discard_payload(_payload_name(os.getpid(), req_id))
+
+
+class _ActorMetrics:
+    """Live per-actor metrics exported through Ray's metrics API.
+
+    Ray serves them on every node's Prometheus endpoint (the
+    ``metrics-export-port`` start parameter) with a ``ray_`` prefix, so
+    files/s and pages/s are ``rate()`` over the counters below.
+    """
+
+    SECONDS_BOUNDARIES = [0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800]
+
+    def __init__(self, actor: str):
+        from ray.util.metrics import Counter, Gauge, Histogram
+
+        def histogram(name, description):
+            return Histogram(
+                name,
+                description=description,
+                boundaries=self.SECONDS_BOUNDARIES,
+                tag_keys=("actor",),
+            )
+
+        self.files = Counter(
+            "docling_files",
+            description="Work items finished, by status.",
+            tag_keys=("actor", "status"),
+        )
+        self.pages = Counter(
+            "docling_pages", description="Pages converted.", tag_keys=("actor",)
+        )
+        self.restarts = Counter(
+            "docling_converter_restarts",
+            description="Converter subprocesses replaced after a timeout.",
+            tag_keys=("actor",),
+        )
+        self.in_flight = Gauge(
+            "docling_files_in_flight",
+            description="Requests queued on or running in the converter.",
+            tag_keys=("actor",),
+        )
+        self.queue_wait = histogram(
+            "docling_queue_wait_seconds",
+            "Time a request waited for the converter before it started.",
+        )
+        self.convert_time = histogram(
+            "docling_convert_seconds", "Time spent in converter.convert."
+        )
+        self.write_time = histogram(
+            "docling_write_seconds", "Time spent writing outputs to the PVC."
+        )
+        for metric in (
+            self.files,
+            self.pages,
+            self.restarts,
+            self.in_flight,
+            self.queue_wait,
+            self.convert_time,
+            self.write_time,
+        ):
+            metric.set_default_tags({"actor": actor})
+
+    def record_file(self, result: Dict, queue_wait: float):
+        self.files.inc(tags={"status": result["status"]})
+        if result["page_count"] > 0:
+            self.pages.inc(result["page_count"])
+        self.queue_wait.observe(queue_wait)
+        if result["status"] == "success" and not result["cache_hit"]:
+            self.convert_time.observe(result["convert_s"])
+            self.write_time.observe(result["write_s"])
+
+
+class _AdaptiveDeadline:
+    """Per-file deadlines that follow this actor's observed page throughput.
+
+    Seconds per page is a decayed ratio of convert time to pages over the
+    actor's recent conversions, kept separately for each pipeline profile
+    and seeded with the cost model's ``EST_SECONDS_PER_PAGE``.  A file's
+    deadline is ``TIMEOUT_SLACK`` times its predicted conversion time,
+    clamped to [TIMEOUT_FLOOR, FILE_TIMEOUT], so a small file that hangs is
+    abandoned early while a large one gets room to finish.
+
+    With ``PIPELINE_PROFILE=auto`` the profile is only chosen inside the
+    converter, so the slowest profile's rate predicts the time; otherwise
+    a run of fast-profile files would shrink the deadline of the next
+    file that needs table structure.  A converter that has not finished a
+    file yet gets FILE_TIMEOUT, since its first conversion also pays
+    one-off warm-up costs the rate does not describe, and so does a file
+    whose page count is unknown (``pages`` is None).
+    """
+
+    DECAY = 0.95  # weight kept by earlier conversions per new one
+    PRIOR_PAGES = 20.0  # pages' worth of weight given to the seed estimate
+
+    def __init__(self):
+        self._seconds = dict.fromkeys(
+            PROFILE_TABLE_STRUCTURE, EST_SECONDS_PER_PAGE * self.PRIOR_PAGES
+        )
+        self._pages = dict.fromkeys(PROFILE_TABLE_STRUCTURE, self.PRIOR_PAGES)
+
+    def seconds_per_page(self, profile: str) -> float:
+        return self._seconds[profile] / self._pages[profile]
+
+    def observe(self, convert_s: float, pages: int, profile: str):
+        if pages > 0 and convert_s > 0 and profile in self._seconds:
+            self._seconds[profile] = self._seconds[profile] * self.DECAY + convert_s
+            self._pages[profile] = self._pages[profile] * self.DECAY + pages
+
+    def deadline(self, pages: Optional[float], warm: bool = True) -> float:
+        if not ADAPTIVE_TIMEOUT or not warm or pages is None:
+            return float(FILE_TIMEOUT)
+        profiles = (
+            list(PROFILE_TABLE_STRUCTURE)
+            if PIPELINE_PROFILE == "auto"
+            else [PIPELINE_PROFILE]
+        )
+        rate = max(self.seconds_per_page(profile) for profile in profiles)
+        predicted = EST_SECONDS_PER_FILE + rate * pages
+        return float(min(FILE_TIMEOUT, max(TIMEOUT_FLOOR, TIMEOUT_SLACK * predicted)))
+
+
+def _timeout_summary() -> str:
+    if not ADAPTIVE_TIMEOUT:
+        return f"{FILE_TIMEOUT}s"
+    floor = min(TIMEOUT_FLOOR, FILE_TIMEOUT)
+    return f"adaptive {floor}-{FILE_TIMEOUT}s (x{TIMEOUT_SLACK:g})"
+
+
+def _expected_pages(
+    path: str, page_range: Optional[Tuple[int, int]], num_pages: int
+) -> Optional[int]:
+    """Pages a work item covers, or None if the page count cannot be read.
+
+    An unknown count is read from the PDF header, which is cheap next to a
+    conversion.  File size is no stand-in: a small text-only PDF can have
+    many pages.
+    """
+    if page_range is not None:
+        return page_range[1] - page_range[0] + 1
+    if num_pages > 0:
+        return num_pages
+    return _count_pages(path) or None
 
 
 # ---------------------------------------------------------------------------
@@ -150,110 +980,227 @@ def _converter_worker(req_q, res_q, cpus_per_actor, output_base_str, write_json)
 
 
 class DoclingProcessor:
-    """Thin actor that delegates conversion to a subprocess."""
+    """Thin actor that delegates conversion to a subprocess.
+
+    Besides the active converter, the actor keeps NUM_SPARE_CONVERTERS warm
+    standby subprocesses.  When a file times out the hung converter is
+    killed, a ready spare takes over immediately and a replacement spare
+    loads its models in the background.
+    """
 
     def __init__(self):
         import socket
 
         self.hostname = socket.gethostname()
+        self.actor_id = f"{self.hostname}:{os.getpid()}"
 
         self.output_base = Path(PVC_MOUNT_PATH) / OUTPUT_PATH
         _mkdir(self.output_base)
-        _mkdir(self.output_base / "markdown")
-        if WRITE_JSON:
-            _mkdir(self.output_base / "json")
-
-        self._start_worker()
+        if not RETURN_PAYLOADS:
+            _mkdir(self.output_base / "markdown")
+            if WRITE_JSON:
+                _mkdir(self.output_base / "json")
+            if SHARD_PAGES > 0:
+                _mkdir(self.output_base / SHARDS_DIR)
+
+        self._metrics = _ActorMetrics(self.actor_id) if ENABLE_METRICS else None
+        self._deadline = _AdaptiveDeadline()
+        self._next_req_id = 0
+        self._worker = _Converter(self.output_base)
+        self._spares = [
+            _Converter(self.output_base) for _ in range(NUM_SPARE_CONVERTERS)
+        ]
+        self._worker.wait_ready()
         print(
             f"[{self.hostname}] DoclingProcessor ready "
-            f"(converter pid={self._worker.pid}, timeout={FILE_TIMEOUT}s)"
+            f"(converter pid={self._worker.pid}, spares={NUM_SPARE_CONVERTERS}, "
+            f"timeout={_timeout_summary()}, pipeline_depth={PIPELINE_DEPTH})"
         )
 
-    def _start_worker(self):
-        self._req_q = mp.Queue()
-        self._res_q = mp.Queue()
-        self._worker = mp.Process(
-            target=_converter_worker,
-            args=(
-                self._req_q,
-                self._res_q,
-                CPUS_PER_ACTOR,
-                str(self.output_base),
-                WRITE_JSON,
-            ),
-            daemon=True,
-        )
-        self._worker.start()
-        msg = self._res_q.get(timeout=300)  # Wait up to 5 min for model loading
-        assert msg[0] == "ready"
-
-    def _restart_worker(self):
-        """Kill the hung subprocess and start a fresh one."""
-        if self._worker.is_alive():
-            self._worker.terminate()
-            self._worker.join(timeout=5)
-            if self._worker.is_alive():
-                self._worker.kill()
-                self._worker.join()
-        while True:
+    def _restart_worker(self, abandoned: Iterable[int] = ()):
+        """Kill the hung converter and hand over to a warm spare.
+
+        ``abandoned`` are the requests the hung converter will never answer;
+        their payload segments are freed once it has exited.
+        """
+        self._worker.stop(abandoned)
+        if self._metrics:
+            self._metrics.restarts.inc()
+
+        # Drop spares that died while idle; they are replaced below.
+        for spare in [c for c in self._spares if not c.process.is_alive()]:
+            spare.stop()
+            self._spares.remove(spare)
+
+        ready = [c for c in self._spares if c.poll_ready()]
+        if ready:
+            self._worker = ready[0]
+            self._spares.remove(self._worker)
+            print(
+                f"[{self.hostname}] Switched to warm converter (pid={self._worker.pid})"
+            )
+        else:
+            # No spare has finished loading: take the one that started
+            # earliest, or a fresh converter when spares are disabled.
+            self._worker = (
+                self._spares.pop(0) if self._spares else _Converter(self.output_base)
+            )
+            self._worker.wait_ready()
+            print(f"[{self.hostname}] Restarted converter (new pid={self._worker.pid})")
+
+        while len(self._spares) < NUM_SPARE_CONVERTERS:
+            self._spares.append(_Converter(self.output_base))
+
+    def _submit(self, item: Tuple[str, Optional[Tuple[int, int]]]) -> int:
+        req_id = self._next_req_id
+        self._next_req_id += 1
+        self._worker.req_q.put((req_id, *item))
+        return req_id
+
+    def __call__(self, batch: Dict[str, List]) -> Dict[str, List]:
+        """Convert a batch, keeping up to PIPELINE_DEPTH files in flight.
+
+        The converter handles requests in FIFO order, so the oldest in-flight
+        request is the one being converted.  Its clock starts when it reaches
+        the head of the queue, which gives every file its own deadline
+        regardless of how many requests are queued behind it.  Deadlines
+        come from ``_AdaptiveDeadline`` and are reported as ``deadline_s``.
+        """
+        path_list = [str(p) for p in batch["path"]]
+        # Page-range columns only exist when the sharding pre-pass ran.
+        start_pages = batch.get("start_page", [0] * len(path_list))
+        end_pages = batch.get("end_page", [0] * len(path_list))
+        source_pages = batch.get("num_pages", [0] * len(path_list))
+        est_costs = batch.get("est_cost_s", [0.0] * len(path_list))
+        items = [
+            (path, (int(start), int(end)) if start > 0 else None)
+            for path, start, end in zip(path_list, start_pages, end_pages, strict=True)
+        ]
+        results = [None] * len(items)
+        deadlines = [0.0] * len(items)  # set when the item reaches the converter
+
+        in_flight = OrderedDict()  # req_id -> index into items
+        started = {}  # req_id -> time the request reached the converter
+        submitted = [0.0] * len(items)  # first submission time per item
+        next_idx = 0
+
+        while next_idx < len(items) or in_flight:
+            while next_idx < len(items) and len(in_flight) < PIPELINE_DEPTH:
+                req_id = self._submit(items[next_idx])
+                in_flight[req_id] = next_idx
+                submitted[next_idx] = time.time()
+                next_idx += 1
+            if self._metrics:
+                self._metrics.in_flight.set(len(in_flight))
+
+            head_id = next(iter(in_flight))
+            if head_id not in started:
+                started[head_id] = time.time()
+                idx = in_flight[head_id]
+                deadlines[idx] = self._deadline.deadline(
+                    _expected_pages(*items[idx], int(source_pages[idx])),
+                    warm=self._worker.warm,
+                )
+            head_t0 = started[head_id]
+            remaining = head_t0 + deadlines[in_flight[head_id]] - time.time()
+
             try:
-                self._res_q.get_nowait()
+                result = self._worker.res_q.get(timeout=max(remaining, 0.0))
             except queue.Empty:
-                break
-        self._start_worker()
-        print(f"[{self.hostname}] Restarted converter (new pid={self._worker.pid})")
+                idx = in_flight.pop(head_id)
+                results[idx] = {
+                    **_RESULT_DEFAULTS,
+                    "status": "timeout",
+                    "error": f"Timed out after {deadlines[idx]:.0f}s",
+                    "duration": round(time.time() - head_t0, 3),
+                }
+                if self._metrics:
+                    self._metrics.record_file(results[idx], head_t0 - submitted[idx])
+                self._restart_worker((head_id, *in_flight) if RETURN_PAYLOADS else ())
+                # The new converter never saw the queued requests; resend them.
+                pending = list(in_flight.values())
+                in_flight.clear()
+                started.clear()
+                for idx in pending:
+                    in_flight[self._submit(items[idx])] = idx
+                continue
 
-    def __call__(self, batch: Dict[str, List]) -> Dict[str, List]:
-        path_list = batch["path"]
+            req_id, status_str, info = result
+            payload = info.pop("payload", None)
+            if req_id not in in_flight:
+                if payload is not None:
+                    _discard_payload(_payload_name(os.getpid(), req_id))
+                continue  # stale result from an earlier batch
+            idx = in_flight.pop(req_id)
+            t0 = started.pop(req_id, head_t0)
+            if payload is not None:
+                info["markdown"], info["doc_json"] = _take_payload(
+                    _payload_name(os.getpid(), req_id), payload
+                )
+            results[idx] = {
+                **_RESULT_DEFAULTS,
+                **info,
+                "status": "success" if status_str == "success" else "error",
+                "duration": round(time.time() - t0, 3),
+            }
+            if self._metrics:
+                self._metrics.record_file(results[idx], t0 - submitted[idx])
+            if status_str == "success" and not results[idx]["cache_hit"]:
+                self._worker.warm = True
+                self._deadline.observe(
+                    results[idx]["convert_s"],
+                    results[idx]["page_count"],
+                    results[idx]["profile"],
+                )
+
+        if self._metrics:
+            self._metrics.in_flight.set(0)
 
-        filenames, statuses, page_counts, errors = [], [], [], []
+        filenames, page_ranges, statuses, page_counts, errors = [], [], [], [], []
         docling_durations, file_sizes_mb = [], []
         output_md_kb, output_json_kb = [], []
         pages_per_second, actor_hosts = [], []
 
-        for file_path in path_list:
-            fname = os.path.basename(file_path)
-            t0 = time.time()
-
-            status, error_msg = "success", ""
-            page_count = 0
-            file_size_mb, md_kb, js_kb = 0.0, 0.0, 0.0
-
-            self._req_q.put(str(file_path))
+        for (file_path, page_range), result in zip(items, results, strict=True):
+            page_count, file_size = result["page_count"], result["file_size"]
+            duration = result["duration"]
+            file_size_mb = round(file_size / (1024 * 1024), 3) if file_size > 0 else 0.0
 
-            try:
-                result = self._res_q.get(timeout=FILE_TIMEOUT)
-                status_str, page_count, file_size, md_kb, js_kb, error_msg = result
-                file_size_mb = (
-                    round(file_size / (1024 * 1024), 3) if file_size > 0 else 0.0
-                )
-                if status_str != "success":
-                    status = "error"
-            except queue.Empty:
-                status = "timeout"
-                error_msg = f"Timed out after {FILE_TIMEOUT}s"
-                self._restart_worker()
-
-            docling_duration = round(time.time() - t0, 3)
-
-            filenames.append(fname)
-            statuses.append(status)
+            filenames.append(os.path.basename(file_path))
+            page_ranges.append(f"{page_range[0]}-{page_range[1]}" if page_range else "")
+            statuses.append(result["status"])
             page_counts.append(int(page_count))
-            errors.append(error_msg)
-            docling_durations.append(docling_duration)
+            errors.append(result["error"])
+            docling_durations.append(duration)
             file_sizes_mb.append(file_size_mb)
-            output_md_kb.append(float(md_kb))
-            output_json_kb.append(float(js_kb))
+            output_md_kb.append(float(result["md_kb"]))
+            output_json_kb.append(float(result["js_kb"]))
             pps = (
-                round(page_count / docling_duration, 2)
-                if docling_duration > 0 and page_count > 0
+                round(page_count / duration, 2)
+                if duration > 0 and page_count > 0
                 else 0.0
             )
             pages_per_second.append(pps)
             actor_hosts.append(self.hostname)
 
+        payload_columns = {}
+        if RETURN_PAYLOADS:
+            payload_columns = {
+                "markdown": [r["markdown"] for r in results],
+                "doc_json": [r["doc_json"] for r in results],
+            }
         return {
+            "path": path_list,
+            "content_hash": [r["content_hash"] for r in results],
+            "mtime_ns": [int(r["mtime_ns"]) for r in results],
+            "file_size_bytes": [int(r["file_size"]) for r in results],
+            "cache_hit": [bool(r["cache_hit"]) for r in results],
             "filename": filenames,
+            "page_range": page_ranges,
+            "source_pages": [int(n) for n in source_pages],
+            "est_cost_s": [round(float(c), 2) for c in est_costs],
+            "deadline_s": [round(d, 1) for d in deadlines],
+            "profile": [r["profile"] for r in results],
             "status": statuses,
             "page_count": page_counts,
             "error": errors,
@@ -263,30 +1210,743 @@ class DoclingProcessor:
             "output_json_kb": output_json_kb,
             "pages_per_second": pages_per_second,
             "actor_hostname": actor_hosts,
+            "actor_id": [self.actor_id] * len(results),
+            "peak_rss_mb": [float(r["peak_rss_mb"]) for r in results],
+            **{
+                col: [round(float(r[col]), 4) for r in results] for col in STAGE_COLUMNS
+            },
+            **payload_columns,
         }
 
 
+# ---------------------------------------------------------------------------
+# Input discovery
+# ---------------------------------------------------------------------------
+
+
+def _listing_sources(input_dir: str, min_sources: int) -> pd.DataFrame:
+    """Split the input tree into directories that can be listed in parallel.
+
+    Expands the tree breadth-first, at most two levels deep, until there
+    are ``min_sources`` directories to walk.  Expanded directories are only
+    listed for their own files; the rest are walked recursively.  Only the
+    entries of the expanded levels are read on the driver.  Directories
+    are ordered as ``_walk_pdfs`` visits them, so listing them in turn
+    gives the same order as walking the whole tree.
+    """
+    sources, frontier = [], [input_dir]
+    for _ in range(2):
+        if len(frontier) >= min_sources:
+            break
+        next_frontier = []
+        for directory in frontier:
+            sources.append((directory, False))
+            try:
+                with os.scandir(directory) as entries:
+                    next_frontier.extend(
+                        sorted(
+                            e.path
+                            for e in entries
+                            if e.is_dir(follow_symlinks=False)
+                            and not e.name.startswith(".")
+                        )
+                    )
+            except OSError:
+                continue
+        frontier = next_frontier
+    sources.extend((directory, True) for directory in frontier)
+    sources.sort(key=lambda source: Path(source[0]).parts)
+    return pd.DataFrame(sources, columns=["dir", "recursive"])
+
+
+def _walk_pdfs(directory: str, recursive: bool) -> Iterator[str]:
+    """Yield the PDFs under ``directory``, depth first in sorted name order.
+
+    Each directory's own PDFs come before its subdirectories.  Hidden
+    entries are skipped, as ``glob`` does.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(
+                (e for e in it if not e.name.startswith(".")), key=lambda e: e.name
+            )
+    except OSError:
+        return
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.name.endswith(".pdf"):
+            yield entry.path
+    if recursive:
+        for subdir in subdirs:
+            yield from _walk_pdfs(subdir, recursive)
+
+
+def _pending_blocks(
+    paths: Iterator[str], block_size: int, limit: int
+) -> Iterator[pd.DataFrame]:
+    """Yield ``paths`` in blocks, without converted inputs when RESUME is set.
+
+    Stops after ``limit`` paths (0 = all).
+    """
+    paths, count = iter(paths), 0
+    while not limit or count < limit:
+        chunk = list(itertools.islice(paths, block_size))
+        if not chunk:
+            break
+        block = pd.DataFrame({"path": chunk})
+        if RESUME:
+            block = _pending_paths(block)
+        if limit:
+            block = block.iloc[: limit - count]
+        if len(block):
+            yield block.reset_index(drop=True)
+        count += len(block)
+
+
+def _list_in_order(
+    producers: List[Callable[[], Iterator[pd.DataFrame]]], limit: int
+) -> Iterator[pd.DataFrame]:
+    """Run ``producers`` on threads and yield their blocks in list order.
+
+    At most LISTING_THREADS producers run ahead of the one being yielded, so
+    the first source's blocks stream out while later sources are listed.
+    Stops after ``limit`` rows in all (0 = all).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    stop = threading.Event()
+    outputs = [queue.Queue() for _ in producers]
+
+    def run(producer, out):
+        try:
+            for block in producer():
+                if stop.is_set():
+                    break
+                out.put(block)
+        except Exception as e:
+            out.put(e)
+        out.put(None)
+
+    pool = ThreadPoolExecutor(LISTING_THREADS)
+
+    def start(i):
+        if i < len(producers):
+            pool.submit(run, producers[i], outputs[i])
+
+    for i in range(LISTING_THREADS):
+        start(i)
+    count = 0
+    try:
+        for i, out in enumerate(outputs):
+            start(i + LISTING_THREADS)
+            while (block := out.get()) is not None:
+                if isinstance(block, Exception):
+                    raise block
+                if limit:
+                    block = block.iloc[: limit - count]
+                count += len(block)
+                if len(block):
+                    yield block
+                if limit and count >= limit:
+                    return
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _list_pdfs(
+    batch: pd.DataFrame, block_size: int, limit: int
+) -> Iterator[pd.DataFrame]:
+    """Yield the pending PDFs under the directories in ``batch`` as they are found.
+
+    Each yielded frame becomes a block, so conversion can start on the
+    first paths while the walk continues.  Directories are walked
+    concurrently but yielded in ``batch`` order, and the walk stops after
+    ``limit`` pending PDFs (0 = all).
+    """
+    producers = [
+        functools.partial(
+            _pending_blocks, _walk_pdfs(directory, recursive), block_size, limit
+        )
+        for directory, recursive in zip(batch["dir"], batch["recursive"], strict=True)
+    ]
+    yield from _list_in_order(producers, limit)
+
+
+def _read_listing(
+    batch: pd.DataFrame, input_dir: str, block_size: int, limit: int
+) -> Iterator[pd.DataFrame]:
+    """Yield the pending paths of a precomputed listing file, resolved
+    against ``input_dir``, in blocks.  Blank lines and ``#`` comments are
+    skipped."""
+
+    def paths(listing):
+        with open(listing) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield os.path.join(input_dir, line)
+
+    producers = [
+        functools.partial(_pending_blocks, paths(listing), block_size, limit)
+        for listing in batch["listing"]
+    ]
+    yield from _list_in_order(producers, limit)
+
+
+def _input_dataset(input_dir: str, block_size: int) -> "ray.data.Dataset":
+    """List the first NUM_FILES pending input PDFs as a dataset of ``path`` rows.
+
+    The tree is walked depth first in sorted order, split into directories
+    by ``_listing_sources``, or INPUT_LISTING is read in file order.  With
+    RESUME, converted inputs are dropped while listing, before the limit,
+    so a resumed run takes the next NUM_FILES pending PDFs (0 = all).
+
+    One listing task walks the directories on LISTING_THREADS threads and
+    yields their paths in order, stopping at NUM_FILES, so the same tree
+    and manifest always select the same files.  Blocks stream to the
+    actors as they are listed; nothing waits for the whole walk.
+    """
+    fn_kwargs = {"block_size": block_size, "limit": NUM_FILES}
+    if INPUT_LISTING:
+        sources = pd.DataFrame({"listing": [INPUT_LISTING]})
+        fn, fn_kwargs = _read_listing, {"input_dir": input_dir, **fn_kwargs}
+    else:
+        sources = _listing_sources(input_dir, min_sources=LISTING_THREADS)
+        fn = _list_pdfs
+    return ray.data.from_pandas(sources).map_batches(
+        fn, batch_size=None, batch_format="pandas", fn_kwargs=fn_kwargs
+    )
+
+
+def _pending_paths(batch: pd.DataFrame) -> pd.DataFrame:
+    """Drop the inputs the manifest records as converted."""
+    manifest = _Manifest(Path(PVC_MOUNT_PATH) / OUTPUT_PATH, read_only=True)
+    try:
+        pending = set(manifest.pending(batch["path"].tolist()))
+    finally:
+        manifest.close()
+    return batch[batch["path"].isin(pending)]
+
+
+# ---------------------------------------------------------------------------
+# Work estimation
+# ---------------------------------------------------------------------------
+
+
+def _estimate_costs(batch: pd.DataFrame) -> pd.DataFrame:
+    """Add an ``est_cost_s`` column from file size and, if known, page count.
+
+    Page-range items are costed by the pages they cover and their share of
+    the file size.
+    """
+    costs = []
+    for row in batch.itertuples(index=False):
+        try:
+            size = os.path.getsize(row.path)
+        except OSError:
+            size = 0
+        num_pages = getattr(row, "num_pages", 0)
+        if not num_pages and ESTIMATE_PAGES:
+            num_pages = _count_pages(row.path)
+        start, end = getattr(row, "start_page", 0), getattr(row, "end_page", 0)
+        if start > 0 and num_pages > 0:
+            size = size * (end - start + 1) // num_pages
+            num_pages = end - start + 1
+        costs.append(estimate_file_cost(size, num_pages))
+    batch["est_cost_s"] = costs
+    return batch
+
+
+def _packed_dataset(
+    ds: "ray.data.Dataset", num_blocks: int
+) -> Optional["ray.data.Dataset"]:
+    """Rebuild ``ds`` as ``num_blocks`` blocks of roughly equal estimated cost.
+
+    The estimate runs as a distributed map; only the (path, cost) table is
+    pulled to the driver to pack, heaviest block and longest file first.
+    Packing needs every work item's cost, so conversion starts only once
+    the whole selection is listed and estimated.  Returns None when ``ds``
+    is empty.
+    """
+    df = ds.map_batches(_estimate_costs, batch_format="pandas").to_pandas()
+    if df.empty:
+        return None
+    print(f"Estimated cost of {len(df)} work items.")
+    blocks = pack_blocks(df["est_cost_s"].tolist(), num_blocks)
+    return ray.data.from_pandas([df.iloc[idx].reset_index(drop=True) for idx in blocks])
+
+
+# ---------------------------------------------------------------------------
+# Page-range sharding
+# ---------------------------------------------------------------------------
+
+
+def _page_range_items(row: Dict) -> List[Dict]:
+    """Expand one PDF into SHARD_PAGES-sized page-range work items.
+
+    Documents at or below the threshold (or whose page count cannot be
+    read) stay a single whole-document item with ``start_page == 0``.
+    """
+    path = row["path"]
+    num_pages = _count_pages(path)
+    if num_pages <= SHARD_PAGES:
+        return [{"path": path, "start_page": 0, "end_page": 0, "num_pages": num_pages}]
+    return [
+        {
+            "path": path,
+            "start_page": start,
+            "end_page": min(start + SHARD_PAGES - 1, num_pages),
+            "num_pages": num_pages,
+        }
+        for start in range(1, num_pages + 1, SHARD_PAGES)
+    ]
+
+
+@ray.remote
+def _stitch_document(
+    fname_base: str, page_ranges: List[Tuple[int, int]], output_base_str: str
+) -> None:
+    """Merge the page-range parts of one document into its final outputs."""
+    output_base = Path(output_base_str)
+    shards_dir = output_base / SHARDS_DIR
+    parts = [_shard_name(fname_base, r) for r in sorted(page_ranges)]
+    md_parts = [shards_dir / f"{part}.md" for part in parts]
+    json_parts = [shards_dir / f"{part}.json" for part in parts]
+
+    md_bytes = b"\n\n".join(p.read_bytes() for p in md_parts)
+    _write(output_base / "markdown" / f"{fname_base}.md", md_bytes)
+
+    if WRITE_JSON:
+        import orjson
+        from docling_core.types.doc import DoclingDocument
+
+        docs = [DoclingDocument.model_validate_json(p.read_bytes()) for p in json_parts]
+        merged = DoclingDocument.concatenate(docs)
+        _write(
+            output_base / "json" / f"{fname_base}.json",
+            orjson.dumps(merged.export_to_dict()),
+        )
+
+    for part in md_parts + json_parts:
+        part.unlink(missing_ok=True)
+
+
+def _stitched_part(run_dir: Path, fname: str) -> Path:
+    """Parquet file holding the stitched row of a sharded document."""
+    return run_dir / f"stitched-{_content_hash(fname.encode())[:16]}.parquet"
+
+
+def _stitch_rows(rows: pd.DataFrame) -> pd.DataFrame:
+    """Merge the page-range result rows of one document into one row.
+
+    Markdown is joined and JSON concatenated in page order; page counts and
+    stage timings add up.  The other columns come from the first part, so
+    the row has the schema of the run's results.
+    """
+    start = rows["page_range"].str.split("-").str[0].astype(int)
+    rows = rows.iloc[np.argsort(start.to_numpy(), kind="stable")]
+    whole = rows.iloc[[0]].copy()
+    whole["page_range"] = ""
+    hashes = rows["content_hash"][rows["content_hash"] != ""]
+    whole["content_hash"] = hashes.iloc[0] if len(hashes) else ""
+    for col in ("page_count", "docling_duration_s", *STAGE_COLUMNS):
+        whole[col] = rows[col].sum()
+    whole["markdown"] = "\n\n".join(rows["markdown"])
+    if (rows["doc_json"] != "").all():
+        from docling_core.types.doc import DoclingDocument
+
+        merged = DoclingDocument.concatenate([
+            DoclingDocument.model_validate_json(js) for js in rows["doc_json"]
+        ])
+        whole["doc_json"] = json.dumps(merged.export_to_dict())
+    else:
+        whole["doc_json"] = ""
+    return whole
+
+
+@ray.remote
+def _stitch_payloads(parts: List[str], fname: str, out_path: str) -> None:
+    """Write the stitched row of one document returned as payload columns."""
+    import pyarrow as pa
+    import pyarrow.dataset as pds
+
+    dataset = pds.dataset(parts, format="parquet")
+    table = dataset.to_table(
+        filter=(pds.field("filename") == fname) & (pds.field("page_range") != "")
+    )
+    whole = _stitch_rows(table.to_pandas())
+    tmp_path = f"{out_path}.tmp"
+    pq.write_table(
+        pa.Table.from_pandas(whole, schema=table.schema, preserve_index=False),
+        tmp_path,
+        compression="zstd",
+    )
+    os.replace(tmp_path, out_path)
+
+
+def _stitch_sharded_documents(
+    shards: Dict[str, Dict], run_dir: Path
+) -> List[Tuple[str, str]]:
+    """Stitch every fully converted sharded document, in page order.
+
+    ``shards`` maps a filename to its source page count, the page ranges
+    seen in the results and whether all of them succeeded.  Returns
+    ``(filename, error)`` pairs for documents that could not be stitched.
+    With ``RETURN_PAYLOADS`` there are no part files: the page-range rows
+    of ``run_dir`` carry the Markdown and JSON, and each document's
+    stitched row is written to its own file there (``_stitched_part``).
+    """
+    output_base = str(Path(PVC_MOUNT_PATH) / OUTPUT_PATH)
+    parts = [str(p) for p in sorted(run_dir.glob("*.parquet"))]
+    failed, futures = [], {}
+    for fname, info in shards.items():
+        ranges = sorted(info["ranges"])
+        expected_start = 1
+        for start, end in ranges:
+            if start != expected_start:
+                break
+            expected_start = end + 1
+        complete = expected_start == info["num_pages"] + 1
+        if not (info["ok"] and complete):
+            failed.append((fname, "Not stitched: page-range shard failed"))
+            continue
+        if RETURN_PAYLOADS:
+            futures[fname] = _stitch_payloads.remote(
+                parts, fname, str(_stitched_part(run_dir, fname))
+            )
+            continue
+        fname_base = fname.rsplit(".", 1)[0]
+        futures[fname] = _stitch_document.remote(fname_base, ranges, output_base)
+
+    for fname, ref in futures.items():
+        try:
+            ray.get(ref)
+        except Exception as e:
+            failed.append((fname, f"Stitching failed: {str(e)[:120]}"))
+    return failed
+
+
+# ---------------------------------------------------------------------------
+# Completion manifest
+# ---------------------------------------------------------------------------
+
+
+class _Manifest:
+    """SQLite record of converted inputs, kept next to the outputs on the PVC.
+
+    Only the driver writes to it.  It is filled from the per-file results
+    Parquet that each run streams to disk, both at the end of a run and at
+    the start of the next one, so a job that dies part-way still leaves an
+    accurate record of what finished.  Listing tasks open it ``read_only``
+    to filter their paths.
+    """
+
+    def __init__(self, output_base: Path, read_only: bool = False):
+        self.output_base = output_base
+        if read_only:
+            uri = f"file:{output_base / MANIFEST_NAME}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True)
+            return
+        self.conn = sqlite3.connect(output_base / MANIFEST_NAME)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "path TEXT PRIMARY KEY, content_hash TEXT, size INTEGER, "
+            "mtime_ns INTEGER, output_paths TEXT, status TEXT, updated_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS manifest_hash ON manifest (content_hash)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ingested (run TEXT PRIMARY KEY)")
+        self.conn.commit()
+
+    def ingest(self, results_root: Path):
+        """Record whole-document results of every run not yet ingested.
+
+        Page-range rows are skipped: a sharded document only counts as done
+        once the driver has stitched it and recorded it directly.
+        """
+        seen = {row[0] for row in self.conn.execute("SELECT run FROM ingested")}
+        runs = sorted(results_root.glob("run-*")) if results_root.exists() else []
+        for run_dir in runs:
+            if run_dir.name in seen:
+                continue
+            for part in sorted(run_dir.glob("*.parquet")):
+                try:
+                    df = pd.read_parquet(part, columns=_MANIFEST_COLUMNS)
+                    has_payloads = "markdown" in pq.read_schema(part).names
+                except Exception:
+                    continue  # partially written by a job that died
+                # Returned payloads live in the results file itself
+                outputs = [str(part.relative_to(self.output_base))]
+                self.record_frame(
+                    df[df["page_range"] == ""], outputs if has_payloads else None
+                )
+            self.conn.execute("INSERT INTO ingested VALUES (?)", (run_dir.name,))
+            self.conn.commit()
+
+    def record_frame(self, df: pd.DataFrame, output_paths: Optional[List[str]] = None):
+        """Record result rows given as a DataFrame of _MANIFEST_COLUMNS.
+
+        ``output_paths`` applies to every row; by default each row's output
+        files are derived from its filename.
+        """
+        if output_paths is None:
+            fname_base = df["filename"].str.rsplit(".", n=1).str[0]
+            outputs = fname_base.map(_output_paths)
+        else:
+            outputs = [output_paths] * len(df)
+        self.record(
+            zip(
+                df["path"],
+                df["content_hash"],
+                df["file_size_bytes"].astype(int),
+                df["mtime_ns"].astype(int),
+                outputs,
+                df["status"],
+                strict=True,
+            )
+        )
+
+    def record(self, rows: Iterable[Tuple[str, str, int, int, List[str], str]]):
+        """Upsert ``(path, content_hash, size, mtime_ns, output_paths, status)``."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(*row[:4], json.dumps(row[4]), row[5], now) for row in rows],
+        )
+        self.conn.commit()
+
+    def pending(self, paths: List[str]) -> List[str]:
+        """Return the paths that still need converting.
+
+        An input is done when it has a successful entry whose outputs still
+        exist and whose content is unchanged.  Matching size and mtime is
+        taken as unchanged; otherwise the file is re-hashed and compared.
+        """
+        done = {}
+        for i in range(0, len(paths), 500):
+            chunk = paths[i : i + 500]
+            done.update(
+                (row[0], row[1:])
+                for row in self.conn.execute(
+                    "SELECT path, content_hash, size, mtime_ns, output_paths "
+                    "FROM manifest WHERE status = 'success' "
+                    f"AND path IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        pending = []
+        for path in paths:
+            entry = done.get(path)
+            if entry is None:
+                pending.append(path)
+                continue
+            content_hash, size, mtime_ns, output_paths = entry
+            outputs = [self.output_base / p for p in json.loads(output_paths)]
+            try:
+                st = os.stat(path)
+                unchanged = (st.st_size, st.st_mtime_ns) == (size, mtime_ns) or (
+                    _content_hash(Path(path).read_bytes()) == content_hash
+                )
+            except OSError:
+                unchanged = False
+            if not (unchanged and all(o.exists() for o in outputs)):
+                pending.append(path)
+        return pending
+
+    def close(self):
+        self.conn.close()
+
+
+_MANIFEST_COLUMNS = [
+    "path",
+    "filename",
+    "page_range",
+    "content_hash",
+    "file_size_bytes",
+    "mtime_ns",
+    "status",
+]
+
+
 # ---------------------------------------------------------------------------
 # Driver
 # ---------------------------------------------------------------------------
 
 
-def ray_data_process():
+def _failed_rows(batch: pd.DataFrame) -> pd.DataFrame:
+    return batch[batch["status"] != "success"][["filename", "error"]]
+
+
+def _shard_rows(batch: pd.DataFrame) -> pd.DataFrame:
+    return batch[batch["page_range"] != ""][[*_MANIFEST_COLUMNS, "source_pages"]]
+
+
+# Log-spaced bucket edges for stage percentiles: 1 ms .. 10^4 s, ~12% apart
+_STAGE_BUCKETS = np.logspace(-3, 4, 141)
+
+
+def _stage_histogram(batch: pd.DataFrame) -> pd.DataFrame:
+    """Bucket the stage timings of the files converted in ``batch``.
+
+    Emits one ``(stage, bucket, count, total_s)`` row per non-empty bucket,
+    so percentiles can be merged across blocks without collecting per-file
+    rows on the driver.  Cache hits are left out.
+    """
+    converted = batch[(batch["status"] == "success") & ~batch["cache_hit"]]
+    rows = []
+    for stage in STAGE_COLUMNS:
+        values = converted[stage].to_numpy(dtype=float)
+        buckets = np.searchsorted(_STAGE_BUCKETS, values)
+        counts = np.bincount(buckets, minlength=len(_STAGE_BUCKETS) + 1)
+        totals = np.bincount(buckets, weights=values, minlength=len(counts))
+        rows.extend(
+            (stage, int(b), int(counts[b]), float(totals[b]))
+            for b in np.flatnonzero(counts)
+        )
+    return pd.DataFrame(rows, columns=["stage", "bucket", "count", "total_s"])
+
+
+def _stage_percentiles(
+    hist: pd.DataFrame, quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99)
+) -> Dict[str, Dict[str, float]]:
+    """Merge ``_stage_histogram`` rows into per-stage percentiles and totals.
+
+    Percentiles are reported as the upper edge of the bucket they fall in.
+    """
+    merged = hist.groupby(["stage", "bucket"], as_index=False)[
+        ["count", "total_s"]
+    ].sum()
+    report = {}
+    for stage, group in merged.groupby("stage"):
+        group = group.sort_values("bucket")
+        cumulative = group["count"].cumsum().to_numpy()
+        buckets = group["bucket"].to_numpy()
+        stats = {"total_s": float(group["total_s"].sum())}
+        for q in quantiles:
+            b = buckets[np.searchsorted(cumulative, q * cumulative[-1])]
+            stats[f"p{q * 100:g}"] = float(
+                _STAGE_BUCKETS[min(b, len(_STAGE_BUCKETS) - 1)]
+            )
+        report[stage] = stats
+    return report
+
+
+def _actor_columns(batch: pd.DataFrame) -> pd.DataFrame:
+    """Per-row inputs of the per-actor run summary.
+
+    Every row counts towards an actor's busy time; only files it actually
+    converted (not cache hits) count towards its pages per second.
+    """
+    converted = (batch["status"] == "success") & ~batch["cache_hit"]
+    return pd.DataFrame({
+        "actor_id": batch["actor_id"],
+        "busy_s": batch["docling_duration_s"],
+        "converted_pages": batch["page_count"].where(converted, 0),
+        "converted_s": batch["docling_duration_s"].where(converted, 0.0),
+        "peak_rss_mb": batch["peak_rss_mb"],
+    })
+
+
+def _run_config() -> Dict:
+    """Settings of this run, as configure.py names its inputs."""
+    resources = ray.cluster_resources()
+    return {
+        "min_actors": MIN_ACTORS,
+        "max_actors": MAX_ACTORS,
+        "cpus_per_actor": CPUS_PER_ACTOR,
+        "batch_size": BATCH_SIZE,
+        "repartition_factor": REPARTITION_FACTOR,
+        "num_files": NUM_FILES,
+        "pipeline_depth": PIPELINE_DEPTH,
+        "pack_blocks": PACK_BLOCKS,
+        "shard_pages": SHARD_PAGES,
+        "pipeline_profile": PIPELINE_PROFILE,
+        "file_timeout": FILE_TIMEOUT,
+        "adaptive_timeout": ADAPTIVE_TIMEOUT,
+        "output_format": OUTPUT_FORMAT,
+        "write_json": WRITE_JSON,
+        "cluster_cpus": resources.get("CPU", 0.0),
+        # Ray's "memory" resource: node memory not reserved for the object store
+        "cluster_memory_gb": round(resources.get("memory", 0.0) / 1024**3, 1),
+    }
+
+
+def _collect_shards(shard_df: pd.DataFrame) -> Dict[str, Dict]:
+    """Group page-range result rows into the input of _stitch_sharded_documents."""
+    shards = {}
+    for fname, group in shard_df.groupby("filename"):
+        bounds = group["page_range"].str.split("-", expand=True).astype(int)
+        hashed = group[group["content_hash"] != ""]
+        shards[fname] = {
+            "num_pages": int(group["source_pages"].iloc[0]),
+            "ranges": list(zip(bounds[0], bounds[1], strict=True)),
+            "ok": bool((group["status"] == "success").all()),
+            "row": (hashed if len(hashed) else group).iloc[[0]],
+        }
+    return shards
+
+
+def ray_data_process(
+    transform: Optional[Callable[["ray.data.Dataset"], "ray.data.Dataset"]] = None,
+):
+    """Convert the input PDFs and print a performance report.
+
+    ``transform`` is applied to the per-file results dataset before it is
+    written, so further stages (chunking, embedding, ...) can be chained
+    onto the conversion in the same streaming pipeline.  With
+    ``RETURN_PAYLOADS=1`` it sees each document's ``markdown`` and
+    ``doc_json`` columns.  It may add, replace or drop payload columns but
+    must keep one row per work item and the other result columns, which
+    the report and the manifest read.
+    """
+    job_start = time.time()
     input_full_path = os.path.join(PVC_MOUNT_PATH, INPUT_PATH)
 
-    pdf_paths = glob.glob(f"{input_full_path}/**/*.pdf", recursive=True)[:NUM_FILES]
-    print(f"Found {len(pdf_paths)} PDFs to process.")
+    output_base = Path(PVC_MOUNT_PATH) / OUTPUT_PATH
+    # In parquet mode the documents and the per-file results are one dataset
+    results_root = output_base / (
+        PARQUET_DIR if OUTPUT_FORMAT == "parquet" else RESULTS_DIR
+    )
+    _mkdir(results_root)
+    manifest = _Manifest(output_base)
+    # Picks up runs that died before finishing, in either output format
+    for root in (output_base / RESULTS_DIR, output_base / PARQUET_DIR):
+        manifest.ingest(root)
 
+    # Without packing, listing blocks feed the actors directly, one batch each
     target_blocks = MAX_ACTORS * REPARTITION_FACTOR
-    ds = ray.data.from_pandas(pd.DataFrame({"path": pdf_paths}))
-    ds = ds.repartition(target_blocks)
-    print(
-        f"Repartitioned into {target_blocks} blocks "
-        f"(~{len(pdf_paths) // target_blocks} files/block) "
-        f"for {MAX_ACTORS} max actors."
+    ds = _input_dataset(
+        input_full_path, LISTING_BLOCK_SIZE if PACK_BLOCKS else BATCH_SIZE
     )
+    source = INPUT_LISTING or f"{input_full_path} (sorted walk)"
+    selection = f"the first {NUM_FILES}" if NUM_FILES else "all"
+    print(f"Listing {selection} pending PDFs from {source}.")
+    if RESUME:
+        print(f"Skipping inputs {MANIFEST_NAME} records as converted.")
+    if SHARD_PAGES > 0:
+        ds = ds.flat_map(_page_range_items)
+        print(f"Splitting PDFs longer than {SHARD_PAGES} pages into page ranges.")
+    if PACK_BLOCKS:
+        ds = _packed_dataset(ds, target_blocks)
+        if ds is None:
+            print("Nothing to convert.")
+            manifest.close()
+            return
+        print(
+            f"Packed into {target_blocks} blocks of equal estimated cost "
+            f"for {MAX_ACTORS} max actors."
+        )
+    else:
+        print(
+            f"Streaming inputs to {MAX_ACTORS} max actors ({BATCH_SIZE} files/block)."
+        )
     print(
-        f"Per-file timeout: {FILE_TIMEOUT}s  |  "
+        f"Per-file timeout: {_timeout_summary()}  |  "
+        f"pipeline depth: {PIPELINE_DEPTH}  |  "
         f"max_errored_blocks: {MAX_ERRORED_BLOCKS}"
     )
 
@@ -300,47 +1960,99 @@ def ray_data_process():
         batch_format="numpy",
         num_cpus=CPUS_PER_ACTOR,
     )
+    if transform is not None:
+        results_ds = transform(results_ds)
 
     # ------------------------------------------------------------------
-    # Collect results and print performance report
+    # Stream per-file results to Parquet; only summaries reach the driver
     # ------------------------------------------------------------------
+    run_dir = results_root / time.strftime("run-%Y%m%d-%H%M%S")
+    write_args = {}
+    if OUTPUT_FORMAT == "parquet":
+        write_args = {"min_rows_per_file": PARQUET_ROWS_PER_FILE, "compression": "zstd"}
     start_time = time.time()
-    success_count = error_count = timeout_count = 0
-    total_pages = 0
-    total_docling_time = 0.0
-    total_file_size_mb = 0.0
-    total_md_kb = 0.0
-    total_json_kb = 0.0
-    actor_distribution = {}
-    errors_list = []
-
-    for batch in results_ds.iter_batches(
-        batch_size=200,
-        prefetch_batches=2,
-        batch_format="numpy",
-    ):
-        n = len(batch["filename"])
-        for i in range(n):
-            status = str(batch["status"][i])
-            if status == "success":
-                success_count += 1
-            elif status == "timeout":
-                timeout_count += 1
-                errors_list.append((batch["filename"][i], str(batch["error"][i])))
-            else:
-                error_count += 1
-                errors_list.append((batch["filename"][i], str(batch["error"][i])))
-
-            total_pages += int(batch["page_count"][i])
-            total_docling_time += float(batch["docling_duration_s"][i])
-            total_file_size_mb += float(batch["file_size_mb"][i])
-            total_md_kb += float(batch["output_md_kb"][i])
-            total_json_kb += float(batch["output_json_kb"][i])
-
-            actor = str(batch["actor_hostname"][i])
-            actor_distribution[actor] = actor_distribution.get(actor, 0) + 1
-
+    results_ds.write_parquet(str(run_dir), **write_args)
     wall_clock = time.time() - start_time
+    if not any(run_dir.glob("*.parquet")):
+        print("Nothing to convert.")
+        manifest.close()
+        return
+    if OUTPUT_FORMAT == "parquet":
+        print(f"Documents and per-file results written to {run_dir}")
+    else:
+        print(f"Per-file results written to {run_dir}")
+
+    from ray.data.aggregate import Count, Max, Sum
+
+    results = ray.data.read_parquet(str(run_dir))
+    by_status = (
+        results.groupby("status")
+        .aggregate(
+            Count(), Sum("page_count"), Sum("cache_hit"), Sum("docling_duration_s")
+        )
+        .to_pandas()
+        .set_index("status")
+    )
+    profile_counts = (
+        results.groupby("profile").count().to_pandas().set_index("profile")["count()"]
+    )
+    profile_counts = profile_counts[profile_counts.index != ""]  # not converted
+    actor_distribution = (
+        results.groupby("actor_hostname")
+        .count()
+        .to_pandas()
+        .set_index("actor_hostname")
+    )
+    stage_stats = _stage_percentiles(
+        results.map_batches(_stage_histogram, batch_format="pandas").to_pandas()
+    )
+    actor_stats = (
+        results.map_batches(_actor_columns, batch_format="pandas")
+        .groupby("actor_id")
+        .aggregate(
+            Count(),
+            Sum("busy_s"),
+            Sum("converted_pages"),
+            Sum("converted_s"),
+            Max("busy_s"),
+            Max("peak_rss_mb"),
+        )
+        .to_pandas()
+    )
+    errors_list = [
+        (row["filename"], row["error"])
+        for row in results.map_batches(_failed_rows, batch_format="pandas").take(10)
+    ]
+
+    shards = _collect_shards(
+        results.map_batches(_shard_rows, batch_format="pandas").to_pandas()
+    )
+    stitch_errors = _stitch_sharded_documents(shards, run_dir) if shards else []
+    stitch_failed = {fname for fname, _ in stitch_errors}
+
+    # With RETURN_PAYLOADS the stitched rows are whole-document rows of the
+    # run, so ingesting it records them with their own file as the output
+    manifest.ingest(results_root)
+    if shards:
+        stitched = pd.concat([info["row"] for info in shards.values()])
+        stitched["status"] = [
+            "error" if fname in stitch_failed else "success"
+            for fname in stitched["filename"]
+        ]
+        if RETURN_PAYLOADS:
+            stitched = stitched[stitched["status"] != "success"]
+        manifest.record_frame(stitched)
+    manifest.close()
+
+    def _status_total(status: str, column: str = "count()") -> int:
+        return int(by_status[column].get(status, 0))
+
+    success_count = _status_total("success")
+    error_count = _status_total("error")
+    timeout_count = _status_total("timeout")
+    cache_hits = _status_total("success", "sum(cache_hit)")
+    timeout_seconds = float(by_status["sum(docling_duration_s)"].get("timeout", 0.0))
+    total_pages = int(by_status["sum(page_count)"].sum())
     total_files = success_count + error_count + timeout_count
     error_rate = (error_count / total_files * 100) if total_files else 0.0
     timeout_rate = (timeout_count / total_files * 100) if total_files else 0.0
@@ -349,32 +2061,102 @@ def ray_data_process():
     print("PERFORMANCE REPORT")
     print("=" * 70)
     print(f"Actors:         {MIN_ACTORS}..{MAX_ACTORS}  | CPUs/actor: {CPUS_PER_ACTOR}")
-    print(
-        f"Blocks:         {target_blocks}  "
-        f"(~{len(pdf_paths) // target_blocks} files/block)"
-    )
-    print(f"File timeout:   {FILE_TIMEOUT}s")
+    if PACK_BLOCKS:
+        print(
+            f"Blocks:         {target_blocks}  "
+            f"(~{total_files // target_blocks} work items/block)"
+        )
+    else:
+        print(f"Blocks:         streamed, {BATCH_SIZE} files/block")
+    print(f"File timeout:   {_timeout_summary()}  | Pipeline depth: {PIPELINE_DEPTH}")
     print("\n--- Results ---")
     print(f"Total:          {total_files}")
     print(f"Success:        {success_count} ({100 - error_rate - timeout_rate:.1f}%)")
     print(f"Errors:         {error_count} ({error_rate:.1f}%)")
-    print(f"Timeouts:       {timeout_count} ({timeout_rate:.1f}%)")
+    print(
+        f"Timeouts:       {timeout_count} ({timeout_rate:.1f}%, "
+        f"{timeout_seconds:.0f} actor-seconds spent before giving up)"
+    )
+    print(f"Cache hits:     {cache_hits}")
+    if len(profile_counts):
+        print(
+            "Profiles:       "
+            + ", ".join(
+                f"{name} {n}" for name, n in profile_counts.sort_index().items()
+            )
+        )
     print(f"Total pages:    {total_pages}")
+    if shards:
+        print(
+            f"Sharded docs:   {len(shards)} "
+            f"({len(shards) - len(stitch_errors)} stitched)"
+        )
     print("\n--- Throughput ---")
-    print(f"Wall clock:     {wall_clock:.1f}s")
+    print(f"Job time:       {time.time() - job_start:.1f}s  (listing to report)")
+    print(f"Wall clock:     {wall_clock:.1f}s  (conversion)")
     if wall_clock > 0:
         print(f"Files/second:   {success_count / wall_clock:.2f}")
         print(f"Pages/second:   {total_pages / wall_clock:.2f}")
+    if stage_stats:
+        step_total = sum(
+            stats["total_s"]
+            for stage, stats in stage_stats.items()
+            if stage not in _NESTED_STAGES
+        )
+        print("\n--- Stage timing (converted files, s) ---")
+        print(f"  {'stage':<12}{'p50':>9}{'p90':>9}{'p99':>9}{'total':>11}{'share':>8}")
+        for stage in STAGE_COLUMNS:
+            stats = stage_stats.get(stage)
+            if stats is None or stats["total_s"] == 0:
+                continue
+            share = stats["total_s"] / step_total * 100 if step_total else 0.0
+            label = f"  {stage}" if stage in _NESTED_STAGES else stage
+            print(
+                f"  {label:<12}{stats['p50']:>9.3f}{stats['p90']:>9.3f}"
+                f"{stats['p99']:>9.3f}{stats['total_s']:>11.1f}{share:>7.1f}%"
+            )
     print("\n--- Actor Distribution ---")
-    for actor, count in sorted(actor_distribution.items()):
+    for actor, count in actor_distribution["count()"].sort_index().items():
         pct = count / total_files * 100 if total_files else 0.0
         print(f"  {actor}: {count} files ({pct:.1f}%)")
+    errors_list = (errors_list + stitch_errors)[:10]
     if errors_list:
         print("\n--- Errors & Timeouts (first 10) ---")
-        for fname, err in errors_list[:10]:
+        for fname, err in errors_list:
             print(f"  {fname}: {err[:80]}")
     print("=" * 70)
 
+    # Machine-readable summary, read back by configure.py --ingest-runs
+    summary = {
+        "run": run_dir.name,
+        "config": _run_config(),
+        "job_time_s": round(time.time() - job_start, 1),
+        "wall_clock_s": round(wall_clock, 1),
+        "files": total_files,
+        "success": success_count,
+        "errors": error_count,
+        "timeouts": timeout_count,
+        "cache_hits": cache_hits,
+        "pages": total_pages,
+        "stages": stage_stats,
+        "actors": [
+            {
+                "actor": row["actor_id"],
+                "files": int(row["count()"]),
+                "busy_s": round(float(row["sum(busy_s)"]), 1),
+                "converted_pages": int(row["sum(converted_pages)"]),
+                "converted_s": round(float(row["sum(converted_s)"]), 1),
+                "max_file_s": round(float(row["max(busy_s)"]), 1),
+                "peak_rss_mb": float(row["max(peak_rss_mb)"]),
+            }
+            for _, row in actor_stats.sort_values("actor_id").iterrows()
+        ],
+    }
+    summary_path = output_base / SUMMARIES_DIR / f"{run_dir.name}.json"
+    _mkdir(summary_path.parent)
+    _write(summary_path, json.dumps(summary, indent=2).encode("utf-8"))
+    print(f"Run summary written to {summary_path}")
+
 
 if __name__ == "__main__":
     ray.init(ignore_reinit_error=True)
@@ -0,0 +1,29 @@
+"""Mock classes for tiktoken."""
+
+
+class MockEncoding:
+    """Mock encoding with one token per character, so decode(encode(s)) == s."""
+
+    def encode(self, text: str) -> list[int]:
+        """Mock encode method."""
+        return [ord(c) for c in text]
+
+    def decode(self, tokens: list[int]) -> str:
+        """Mock decode method."""
+        return "".join(chr(t) for t in tokens)
+
+
+class MockByteEncoding:
+    """Mock byte-level encoding with one token per UTF-8 byte, like BPE tokens."""
+
+    def encode(self, text: str) -> list[int]:
+        """Mock encode method."""
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens: list[int]) -> str:
+        """Mock decode method; split characters decode to U+FFFD like tiktoken."""
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+    def decode_single_token_bytes(self, token: int) -> bytes:
+        """Mock decode_single_token_bytes method."""
+        return bytes([token])
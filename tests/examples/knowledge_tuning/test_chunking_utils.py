@@ -0,0 +1,274 @@
+"""Tests for the Markdown chunking utilities in knowledge-tuning."""
+
+import json
+import sys
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Add the knowledge-tuning utils and the mocks to path
+repo_root = Path(__file__).parent.parent.parent.parent
+utils_path = (
+    repo_root / "examples" / "knowledge-tuning" / "02_Data_Processing" / "utils"
+)
+sys.path.insert(0, str(utils_path))
+sys.path.insert(0, str(Path(__file__).parent / "mocks"))
+
+from chunking_utils import (  # noqa: E402
+    chunk_documents,
+    chunk_markdown,
+    iter_markdown_documents,
+    markdown_blocks,
+)
+from tiktoken_mock import MockByteEncoding, MockEncoding  # noqa: E402
+
+
+def _markdown(n_paragraphs: int, words: int = 8) -> str:
+    paragraphs = [
+        " ".join(f"p{i}w{j}" for j in range(words)) for i in range(n_paragraphs)
+    ]
+    return "# Title\n\n" + "\n\n".join(paragraphs) + "\n"
+
+
+def _read_jsonl(paths):
+    records = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+class TestChunkMarkdown:
+    """Test token-based packing of Markdown blocks."""
+
+    def test_blocks(self):
+        """Test that headings, paragraphs and list items become blocks."""
+        text = "# Title\n\nFirst paragraph.\n\n- one\n- two\n"
+        assert markdown_blocks(text) == ["Title", "First paragraph.", "one", "two"]
+
+    def test_chunks_within_range(self):
+        """Test that chunks fall in the token range and end at block boundaries."""
+        text = _markdown(40)
+        chunks = chunk_markdown(
+            text, min_tokens=150, max_tokens=200, overlap=0, encoding=MockEncoding()
+        )
+
+        assert len(chunks) > 1
+        for chunk in chunks[:-1]:
+            assert 150 <= chunk["num_tokens"] <= 200
+        for chunk in chunks:
+            assert chunk["num_tokens"] == len(chunk["chunk"])
+            assert chunk["chunk"].split("\n\n")[-1] in markdown_blocks(text)
+        assert "\n\n".join(c["chunk"] for c in chunks) == "\n\n".join(
+            markdown_blocks(text)
+        )
+
+    def test_exact_overlap(self):
+        """Test that consecutive chunks share exactly overlap tokens."""
+        chunks = chunk_markdown(
+            _markdown(40),
+            min_tokens=150,
+            max_tokens=200,
+            overlap=60,
+            encoding=MockEncoding(),
+        )
+
+        assert len(chunks) > 1
+        for prev, nxt in zip(chunks[:-1], chunks[1:], strict=True):
+            assert nxt["chunk"][:60] == prev["chunk"][-60:]
+
+    def test_long_block_split(self):
+        """Test that a block longer than max_tokens is cut at max_tokens."""
+        text = "x" * 450
+        chunks = chunk_markdown(
+            text, min_tokens=100, max_tokens=200, overlap=0, encoding=MockEncoding()
+        )
+
+        assert [c["num_tokens"] for c in chunks] == [200, 200, 50]
+        assert "".join(c["chunk"] for c in chunks) == text
+
+    def test_multibyte_characters_not_split(self):
+        """Test that byte-level cuts and overlaps fall on character boundaries."""
+        text = "漢字テキスト🙂é" * 60 + "\n\n" + "ascii text 漢字 " * 40
+        encoding = MockByteEncoding()
+        chunks = chunk_markdown(
+            text, min_tokens=100, max_tokens=130, overlap=25, encoding=encoding
+        )
+
+        assert len(chunks) > 5
+        for chunk in chunks:
+            assert "\ufffd" not in chunk["chunk"]
+            assert chunk["num_tokens"] == len(encoding.encode(chunk["chunk"]))
+            assert chunk["num_tokens"] <= 130
+        for prev, nxt in zip(chunks[:-1], chunks[1:], strict=True):
+            # Overlap is at least the requested 25 tokens, never a split character
+            shared = nxt["chunk"].encode()[:25]
+            assert shared in prev["chunk"].encode()[-29:]
+
+    def test_invalid_range(self):
+        """Test that overlap must be smaller than min_tokens."""
+        with pytest.raises(ValueError):
+            chunk_markdown("text", 100, 200, overlap=100, encoding=MockEncoding())
+        with pytest.raises(ValueError):
+            chunk_markdown("text", 300, 200, overlap=0, encoding=MockEncoding())
+
+
+class TestMarkdownDocuments:
+    """Test reading Markdown documents from Docling Ray outputs."""
+
+    def test_docling_output_dir(self, tmp_path):
+        """Test Markdown files and successful whole-document Parquet rows."""
+        (tmp_path / "markdown").mkdir()
+        (tmp_path / "markdown" / "a.md").write_text("# A\n")
+        for run, text in (
+            ("run-20250101-000000", "old"),
+            ("run-20250102-000000", "new"),
+        ):
+            (tmp_path / "parquet" / run).mkdir(parents=True)
+            table = pa.table({
+                "filename": ["b.pdf", "c.pdf", "d.pdf", "d.pdf"],
+                "page_range": ["", "", "11-12", "1-10"],
+                "status": ["success", "error", "success", "success"],
+                "source_pages": [0, 0, 12, 12],
+                "markdown": [f"# B {text}\n", "", f"D2 {text}\n", f"D1 {text}\n"],
+            })
+            pq.write_table(table, tmp_path / "parquet" / run / "0.parquet")
+
+        docs = dict(iter_markdown_documents(tmp_path))
+
+        assert docs == {
+            "b.pdf": "# B new\n",
+            "d.pdf": "D1 new\n\n\nD2 new\n",
+            "a.md": "# A\n",
+        }
+
+    def test_incomplete_page_ranges(self, tmp_path):
+        """Test a sharded document missing a page range is not dropped silently."""
+        (tmp_path / "parquet" / "run-20250101-000000").mkdir(parents=True)
+        table = pa.table({
+            "filename": ["d.pdf", "d.pdf"],
+            "page_range": ["1-10", "11-12"],
+            "status": ["success", "timeout"],
+            "source_pages": [12, 12],
+            "markdown": ["D1\n", ""],
+        })
+        pq.write_table(
+            table, tmp_path / "parquet" / "run-20250101-000000" / "0.parquet"
+        )
+
+        with pytest.raises(ValueError, match="d.pdf"):
+            dict(iter_markdown_documents(tmp_path))
+
+    def test_iterable_source(self):
+        """Test that plain strings get generated filenames."""
+        docs = list(iter_markdown_documents(["# A", ("b.md", "# B")]))
+        assert docs == [("document-00000", "# A"), ("b.md", "# B")]
+
+
+class TestChunkDocuments:
+    """Test parallel chunking into incrementally written shards."""
+
+    def test_shards_and_resume(self, tmp_path):
+        """Test that shards hold every chunk and finished documents are skipped."""
+        docs = [(f"doc{i}.md", _markdown(20)) for i in range(5)]
+        output_dir = tmp_path / "chunks"
+
+        shards = chunk_documents(
+            docs[:3], output_dir, 150, 200, 50, encoding=MockEncoding(), shard_size=5
+        )
+        assert len(shards) > 1
+        records = _read_jsonl(shards)
+        assert {r["filename"] for r in records} == {"doc0.md", "doc1.md", "doc2.md"}
+
+        shards = chunk_documents(
+            docs, output_dir, 150, 200, 50, encoding=MockEncoding(), shard_size=5
+        )
+        records = _read_jsonl(shards)
+        per_doc = chunk_markdown(_markdown(20), 150, 200, 50, MockEncoding())
+        assert len(records) == 5 * len(per_doc)
+        assert [r["chunk"] for r in records if r["filename"] == "doc4.md"] == [
+            c["chunk"] for c in per_doc
+        ]
+
+    def test_new_shards_after_gap(self, tmp_path):
+        """Test that a missing earlier shard does not get an existing shard's name."""
+        docs = [(f"doc{i}.md", _markdown(20)) for i in range(4)]
+        shards = chunk_documents(
+            docs[:2], tmp_path, 150, 200, 50, encoding=MockEncoding(), shard_size=1
+        )
+        shards[0].unlink()
+        kept = {p: p.read_text() for p in shards[1:]}
+
+        shards = chunk_documents(
+            docs, tmp_path, 150, 200, 50, encoding=MockEncoding(), shard_size=1
+        )
+
+        assert all(p.read_text() == text for p, text in kept.items())
+        records = _read_jsonl(shards)
+        assert {r["filename"] for r in records} == {f"doc{i}.md" for i in range(4)}
+
+    def test_changed_settings_or_content_rechunked(self, tmp_path):
+        """Test that stale chunks are replaced, not reused."""
+        docs = [(f"doc{i}.md", _markdown(20)) for i in range(3)]
+        chunk_documents(docs, tmp_path, 150, 200, 50, encoding=MockEncoding())
+
+        docs[1] = ("doc1.md", _markdown(30))
+        shards = chunk_documents(docs, tmp_path, 150, 200, 50, encoding=MockEncoding())
+        records = _read_jsonl(shards)
+        assert [r["chunk"] for r in records if r["filename"] == "doc1.md"] == [
+            c["chunk"]
+            for c in chunk_markdown(_markdown(30), 150, 200, 50, MockEncoding())
+        ]
+        assert len({r["source_key"] for r in records}) == 2
+
+        shards = chunk_documents(docs, tmp_path, 100, 150, 0, encoding=MockEncoding())
+        records = _read_jsonl(shards)
+        expected = [
+            c["chunk"]
+            for _, text in docs
+            for c in chunk_markdown(text, 100, 150, 0, MockEncoding())
+        ]
+        assert sorted(r["chunk"] for r in records) == sorted(expected)
+
+    def test_process_pool_matches_serial(self, tmp_path):
+        """Test that chunking in worker processes gives the same shards."""
+        docs = [(f"doc{i}.md", _markdown(10 + i)) for i in range(6)]
+
+        serial = chunk_documents(
+            docs, tmp_path / "serial", 100, 150, 40, encoding=MockEncoding()
+        )
+        parallel = chunk_documents(
+            docs,
+            tmp_path / "parallel",
+            100,
+            150,
+            40,
+            encoding=MockEncoding(),
+            num_proc=2,
+        )
+
+        assert _read_jsonl(serial) == _read_jsonl(parallel)
+
+    def test_parquet_shards(self, tmp_path):
+        """Test writing Parquet shards."""
+        shards = chunk_documents(
+            [("a.md", _markdown(20))],
+            tmp_path,
+            150,
+            200,
+            0,
+            encoding=MockEncoding(),
+            output_format="parquet",
+        )
+
+        table = pq.read_table(shards[0])
+        assert table.column_names == [
+            "filename",
+            "chunk_index",
+            "chunk",
+            "num_tokens",
+            "source_key",
+        ]
+        assert table["chunk_index"].to_pylist() == list(range(table.num_rows))
@@ -19,7 +19,11 @@ from knowledge_utils import (  # noqa: E402
     count_len_in_tokens,
     generate_knowledge_qa_dataset,
     get_avg_summaries_per_raw_doc,
+    knowledge_qa_cuts,
     sample_doc_qa,
+    sample_doc_qa_cuts,
+    scan_generated_data,
+    sink_training_mix,
 )
 
 
@@ -101,6 +105,30 @@ class TestSampleDocQa:
         result = sample_doc_qa(df, n_docs_per_raw=1, qa_per_doc=1)
         assert isinstance(result, pl.DataFrame)
 
+    def test_seeded_sampling(self):
+        """Test per-raw-document sampling is bounded and reproducible."""
+        df = pl.DataFrame({
+            "question": [f"q{i}" for i in range(200)],
+            "response": [f"r{i}" for i in range(200)],
+            "document": [f"doc{i // 2}" for i in range(200)],
+            "raw_document": [f"raw{i // 20}" for i in range(200)],
+            "document_outline": ["outline"] * 200,
+        })
+
+        result = sample_doc_qa(df, n_docs_per_raw=3, qa_per_doc=1, seed=7)
+        per_raw = result.group_by("raw_document").agg(pl.col("document").n_unique())
+        assert per_raw["document"].to_list() == [3] * 10
+
+        shuffled = df.sample(fraction=1.0, shuffle=True, seed=1)
+        again = sample_doc_qa(shuffled, n_docs_per_raw=3, qa_per_doc=1, seed=7)
+        assert again["document"].to_list() == result["document"].to_list()
+
+        other = sample_doc_qa(df, n_docs_per_raw=3, qa_per_doc=1, seed=8)
+        assert other["document"].to_list() != result["document"].to_list()
+
+        lazy = sample_doc_qa(shuffled.lazy(), n_docs_per_raw=3, qa_per_doc=1, seed=7)
+        assert lazy.collect()["document"].to_list() == result["document"].to_list()
+
 
 class TestGenerateKnowledgeQaDataset:
     """Test generate_knowledge_qa_dataset function."""
@@ -201,6 +229,46 @@ class TestGenerateKnowledgeQaDataset:
         result_no_pretrain = generate_knowledge_qa_dataset(df, pre_training=False)
         assert result_no_pretrain["unmask"][0] is False
 
+    def test_message_contents(self):
+        """Test user and assistant messages with and without the document."""
+        df = pl.DataFrame({
+            "question": ["q1"],
+            "response": ["[ANSWER] r1 [END]"],
+            "document": ["doc1"],
+            "document_outline": ["outline1"],
+            "raw_document": ["raw1"],
+            "reasoning": ["reason1"],
+        })
+
+        messages = generate_knowledge_qa_dataset(df)["messages"][0].to_list()
+        assert messages == [
+            {"role": "user", "content": "In outline1, q1", "thinking": None},
+            {"role": "assistant", "content": "r1", "thinking": "reason1"},
+        ]
+
+        messages = generate_knowledge_qa_dataset(
+            df.drop("reasoning"), keep_document_in_context=True
+        )["messages"][0].to_list()
+        assert messages[0]["content"] == "outline1\ndoc1\n\nq1"
+        assert messages[1]["thinking"] == ""
+
+    def test_metadata_escaping(self):
+        """Test metadata stays valid JSON for quotes and newlines."""
+        df = pl.DataFrame({
+            "question": ["q1"],
+            "response": ["r1"],
+            "document": ['a "quoted"\nsummary'],
+            "document_outline": ["outline1"],
+            "raw_document": ["raw1"],
+        })
+
+        result = generate_knowledge_qa_dataset(df)
+        assert json.loads(result["metadata"][0]) == {
+            "sdg_document": 'a "quoted"\nsummary',
+            "dataset": "document_knowledge_qa",
+            "raw_document": "raw1",
+        }
+
 
 class TestCountLenInTokens:
     """Test count_len_in_tokens function."""
@@ -242,6 +310,64 @@ class TestCountLenInTokens:
         assert "token_length" in result.columns
         assert len(result) == 2
 
+    def test_batched_matches_per_row(self):
+        """Test batched encoding gives the same lengths as encode per row."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        class BatchTokenizer(MockTokenizer):
+            def __call__(self, texts):
+                return {"input_ids": [self.encode(t) for t in texts]}
+
+        df = pl.DataFrame({
+            "messages": [[{"role": "user", "content": "a b " * n}] for n in range(7)],
+        })
+        expected = [
+            len(MockTokenizer().encode(str(m))) for m in df["messages"].to_list()
+        ]
+
+        result = count_len_in_tokens(df, BatchTokenizer(), batch_size=3)
+        assert result["token_length"].to_list() == expected
+        assert result["token_length"].dtype == pl.Int32
+
+        result = count_len_in_tokens(df, MockTokenizer(), batch_size=3, num_proc=2)
+        assert result["token_length"].to_list() == expected
+
+    def test_cache_reuses_lengths(self, tmp_path):
+        """Test cached rows are not tokenized again."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        df = pl.DataFrame({
+            "messages": [
+                [{"role": "user", "content": "one two"}],
+                [{"role": "user", "content": "three"}],
+            ],
+        })
+        tokenizer = MockTokenizer()
+        first = count_len_in_tokens(df, tokenizer, cache_dir=str(tmp_path))
+
+        tokenizer.apply_chat_template = MagicMock(side_effect=AssertionError)
+        second = count_len_in_tokens(df, tokenizer, cache_dir=str(tmp_path))
+        assert second["token_length"].to_list() == first["token_length"].to_list()
+
+        extended = pl.concat([
+            df,
+            pl.DataFrame({"messages": [[{"role": "user", "content": "four"}]]}),
+        ])
+        tokenizer.apply_chat_template = MagicMock(return_value="four")
+        result = count_len_in_tokens(extended, tokenizer, cache_dir=str(tmp_path))
+        assert tokenizer.apply_chat_template.call_count == 1
+        assert result["token_length"].to_list()[:2] == first["token_length"].to_list()
+
     def test_tokenizer_mock_behavior(self):
         """Test that tokenizer mocks work correctly."""
         import sys
@@ -263,3 +389,210 @@ class TestCountLenInTokens:
         messages = [{"role": "user", "content": "test"}]
         template = tokenizer.apply_chat_template(messages, tokenize=False)
         assert isinstance(template, str)
+
+
+class TestLazyMixing:
+    """Test LazyFrame inputs, scanning and sinking."""
+
+    @staticmethod
+    def _write_generated(path):
+        rows = [
+            {
+                "question": f"q{i}",
+                "response": f"r{i}",
+                "document": f"doc{i % 4}",
+                "raw_document": f"raw{i % 2}",
+                "document_outline": "outline",
+                "unused": "x",
+            }
+            for i in range(12)
+        ]
+        path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+
+    def test_scan_pushes_down_columns(self, tmp_path):
+        """Test scanning a directory of JSON lines keeps only selected columns."""
+        self._write_generated(tmp_path / "gen.jsonl")
+
+        lf = scan_generated_data(tmp_path, columns=["question", "raw_document"])
+        assert isinstance(lf, pl.LazyFrame)
+        assert lf.collect_schema().names() == ["question", "raw_document"]
+        assert lf.collect().height == 12
+
+    def test_scan_missing_files(self, tmp_path):
+        """Test scanning an empty directory raises."""
+        with pytest.raises(FileNotFoundError):
+            scan_generated_data(tmp_path)
+
+    def test_lazy_matches_eager(self, tmp_path):
+        """Test lazy inputs stay lazy and give the eager results."""
+        self._write_generated(tmp_path / "gen.jsonl")
+        lf = scan_generated_data(tmp_path)
+        df = lf.collect()
+
+        assert get_avg_summaries_per_raw_doc(lf) == get_avg_summaries_per_raw_doc(df)
+
+        lazy = generate_knowledge_qa_dataset(lf, keep_columns=["question"])
+        assert isinstance(lazy, pl.LazyFrame)
+        eager = generate_knowledge_qa_dataset(df, keep_columns=["question"])
+        assert lazy.collect().equals(eager)
+
+        sampled = sample_doc_qa(lf, n_docs_per_raw=1, qa_per_doc=1)
+        assert isinstance(sampled, pl.LazyFrame)
+        assert sampled.collect()["raw_document"].n_unique() == 2
+
+    def test_lazy_sampling_skips_feasibility_pass(self, tmp_path, monkeypatch, capsys):
+        """Test sampling a LazyFrame does not collect it to check cut sizes."""
+        import knowledge_utils
+
+        self._write_generated(tmp_path / "gen.jsonl")
+        lf = scan_generated_data(tmp_path)
+
+        sample_doc_qa(lf.collect(), n_docs_per_raw=5, qa_per_doc=1)
+        assert "Cut size 5 exceeds" in capsys.readouterr().out
+
+        monkeypatch.setattr(
+            knowledge_utils, "get_avg_summaries_per_raw_doc", MagicMock()
+        )
+        sampled = sample_doc_qa(lf, n_docs_per_raw=5, qa_per_doc=1)
+        knowledge_utils.get_avg_summaries_per_raw_doc.assert_not_called()
+        assert sampled.collect()["document"].n_unique() == 4
+
+    def test_lazy_token_counting(self):
+        """Test token counting on a LazyFrame."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        df = pl.DataFrame({
+            "messages": [
+                [{"role": "user", "content": "test"}],
+                [{"role": "user", "content": "test two"}],
+            ],
+        })
+        lazy = count_len_in_tokens(df.lazy(), MockTokenizer())
+        assert isinstance(lazy, pl.LazyFrame)
+        assert lazy.collect().equals(count_len_in_tokens(df, MockTokenizer()))
+
+    def test_sink_training_mix(self, tmp_path):
+        """Test mixing eager and lazy datasets straight to disk."""
+        self._write_generated(tmp_path / "gen.jsonl")
+        lf = scan_generated_data(tmp_path)
+        qa = generate_knowledge_qa_dataset(lf, keep_columns=["document"])
+        other = generate_knowledge_qa_dataset(lf.collect())
+
+        sink_training_mix([qa, other], tmp_path / "out" / "mix.jsonl")
+        mix = pl.read_ndjson(tmp_path / "out" / "mix.jsonl")
+        assert mix.height == 24
+        assert mix["document"].null_count() == 12
+
+        sink_training_mix([qa], tmp_path / "mix.parquet")
+        assert pl.read_parquet(tmp_path / "mix.parquet").height == 12
+
+
+class TestMultiCut:
+    """Test producing several cut sizes in one pass."""
+
+    @staticmethod
+    def _generated():
+        return pl.DataFrame({
+            "question": [f"q{i}" for i in range(120)],
+            "response": [f"r{i}" for i in range(120)],
+            "document": [f"doc{i // 2}" for i in range(120)],
+            "raw_document": [f"raw{i // 30}" for i in range(120)],
+            "document_outline": ["outline"] * 120,
+        })
+
+    def test_cuts_are_nested_samples(self):
+        """Test each cut equals the single-cut sample with the same seed."""
+        df = self._generated()
+        rows = sample_doc_qa_cuts(df, [10, 2, 5], qa_per_doc=1, seed=3)
+
+        for cut in (2, 5, 10):
+            expected = sample_doc_qa(df, n_docs_per_raw=cut, qa_per_doc=1, seed=3)
+            assert (
+                rows.filter(pl.col("min_cut") <= cut).drop("min_cut").equals(expected)
+            )
+
+    def test_tokenizes_each_row_once(self):
+        """Test one pass builds every cut with its statistics."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        df = self._generated()
+        tokenizer = MockTokenizer()
+        tokenizer.apply_chat_template = MagicMock(wraps=tokenizer.apply_chat_template)
+
+        results = knowledge_qa_cuts(
+            df, tokenizer, [2, 5], qa_per_doc=1, keep_columns=["question"]
+        )
+        assert tokenizer.apply_chat_template.call_count == 5 * 4
+
+        for cut in (2, 5):
+            dataset, stats = results[cut]
+            expected = count_len_in_tokens(
+                generate_knowledge_qa_dataset(
+                    sample_doc_qa(df, n_docs_per_raw=cut, qa_per_doc=1),
+                    keep_columns=["question"],
+                ),
+                MockTokenizer(),
+            )
+            assert dataset.equals(expected)
+            assert stats["samples"] == cut * 4
+            assert stats["unique_raw_docs"] == 4
+            assert stats["avg_docs_per_raw"] == cut
+            assert stats["total_tokens"] == expected["token_length"].sum()
+
+    def test_lazy_cuts_spill_once(self, tmp_path):
+        """Test lazy cuts scan one spilled, tokenized pass and cache it once."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        df = self._generated()
+        tokenizer = MockTokenizer()
+        tokenizer.apply_chat_template = MagicMock(wraps=tokenizer.apply_chat_template)
+
+        results = knowledge_qa_cuts(
+            df.lazy(),
+            tokenizer,
+            [2, 5],
+            qa_per_doc=1,
+            keep_columns=["question"],
+            spill_dir=tmp_path / "spill",
+            cache_dir=str(tmp_path / "cache"),
+            batch_size=3,
+        )
+        assert tokenizer.apply_chat_template.call_count == 5 * 4
+        assert len(list((tmp_path / "cache").rglob("*.parquet"))) == 1
+
+        eager = knowledge_qa_cuts(
+            df, MockTokenizer(), [2, 5], qa_per_doc=1, keep_columns=["question"]
+        )
+        for cut in (2, 5):
+            dataset, stats = results[cut]
+            assert isinstance(dataset, pl.LazyFrame)
+            assert dataset.collect().equals(eager[cut][0])
+            assert stats == eager[cut][1]
+
+    def test_unsampled_rows_in_every_cut(self):
+        """Test sample=False puts every row in every cut."""
+        import sys
+        from pathlib import Path
+
+        mocks_path = Path(__file__).parent / "mocks"
+        sys.path.insert(0, str(mocks_path))
+        from transformers_mock import MockTokenizer
+
+        df = self._generated()
+        results = knowledge_qa_cuts(df.lazy(), MockTokenizer(), [2, 5], sample=False)
+        assert [results[cut][1]["samples"] for cut in (2, 5)] == [120, 120]
@@ -0,0 +1 @@
+# Ray Data Docling example tests
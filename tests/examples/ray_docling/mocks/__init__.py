@@ -0,0 +1 @@
+"""Mock modules for Ray."""
@@ -0,0 +1,78 @@
+"""Mock of the parts of Ray that ray_data_process uses at import time."""
+
+import sys
+import types
+
+
+class MockRemoteFunction:
+    """Mock of a ``@ray.remote`` function: ``.remote`` runs it in-process."""
+
+    def __init__(self, fn):
+        self._fn = fn
+
+    def remote(self, *args, **kwargs):
+        return self._fn(*args, **kwargs)
+
+
+class MockMetric:
+    """Mock of a ``ray.util.metrics`` metric that records what it emits."""
+
+    def __init__(self, name, description="", tag_keys=(), **kwargs):
+        self.name = name
+        self.description = description
+        self.tag_keys = tuple(tag_keys)
+        self.options = kwargs
+        self.default_tags = {}
+        self.records = []  # (value, tags) per inc/set/observe
+
+    def set_default_tags(self, tags):
+        self.default_tags = dict(tags)
+
+    def _record(self, value, tags):
+        tags = {**self.default_tags, **(tags or {})}
+        assert set(tags) == set(self.tag_keys), f"{self.name}: tags {tags}"
+        self.records.append((value, tags))
+
+    def inc(self, value=1.0, tags=None):
+        self._record(value, tags)
+
+    def set(self, value, tags=None):
+        self._record(value, tags)
+
+    def observe(self, value, tags=None):
+        self._record(value, tags)
+
+
+def metrics_module():
+    """A fresh ``ray.util.metrics`` whose metrics are listed in ``created``."""
+    module = types.ModuleType("ray.util.metrics")
+    module.created = []
+
+    def metric_class(kind):
+        def init(self, name, *args, **kwargs):
+            MockMetric.__init__(self, name, *args, **kwargs)
+            module.created.append(self)
+
+        return type(kind, (MockMetric,), {"__init__": init})
+
+    module.Counter = metric_class("Counter")
+    module.Gauge = metric_class("Gauge")
+    module.Histogram = metric_class("Histogram")
+    return module
+
+
+def install():
+    """Register the mock as ``ray`` when Ray itself is not installed."""
+    try:
+        import ray  # noqa: F401
+    except ImportError:
+        ray = types.ModuleType("ray")
+        ray.remote = MockRemoteFunction
+        ray.get = lambda value: value
+        ray.util = types.ModuleType("ray.util")
+        ray.util.metrics = metrics_module()
+        sys.modules.update({
+            "ray": ray,
+            "ray.util": ray.util,
+            "ray.util.metrics": ray.util.metrics,
+        })
@@ -0,0 +1,331 @@
+"""Tests for the Ray Data Docling configuration calculator."""
+
+import json
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the Docling example to path
+repo_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(repo_root / "examples" / "ray" / "data" / "docling"))
+
+import configure  # noqa: E402
+from configure import (  # noqa: E402
+    MIN_MEMORY_PER_PIPELINE_GB,
+    PipelineConfig,
+    WorkerGroup,
+    autotune,
+    calculate,
+    fit_throughput_curve,
+    format_cluster_patch,
+    load_run_summaries,
+    pack_blocks,
+    recommend_repartition_factor,
+    summarize_run,
+    validate,
+)
+
+
+class TestFitThroughputCurve:
+    """Test fitting seconds per page = serial + parallel / cpus."""
+
+    def test_single_sample_is_parallel(self):
+        """Test one sample is taken as perfectly parallel."""
+        assert fit_throughput_curve([(4, 2.0)]) == (0.0, 2.0)
+
+    def test_one_cpus_value_matches_single_sample(self):
+        """Test repeated samples at one cpus value fit like a single sample."""
+        single = fit_throughput_curve([(4, 2.0)])
+        assert fit_throughput_curve([(4, 2.0), (4, 2.0)]) == single
+
+        serial, parallel = fit_throughput_curve([(4, 1.0), (4, 4.0)])
+        assert serial == 0.0
+        assert parallel == pytest.approx(4 * (1.0 + 0.25) / 2)
+
+    def test_two_cpus_values(self):
+        """Test distinct cpus values separate the serial and parallel terms."""
+        serial, parallel = fit_throughput_curve([(1, 1 / 1.5), (4, 1 / 0.75)])
+        assert serial == pytest.approx(0.5)
+        assert parallel == pytest.approx(1.0)
+
+
+class TestPackBlocks:
+    """Test longest-processing-time-first block packing."""
+
+    def test_balanced_blocks(self):
+        """Test every file is packed once and block costs stay within one file."""
+        costs = [float(c) for c in (9, 7, 6, 5, 5, 4, 3, 3, 2, 1, 1, 1)]
+
+        blocks = pack_blocks(costs, 4)
+
+        assert sorted(i for block in blocks for i in block) == list(range(12))
+        loads = [sum(costs[i] for i in block) for block in blocks]
+        assert loads == sorted(loads, reverse=True)  # heaviest first
+        assert loads[0] - loads[-1] <= max(costs)
+        assert loads[0] == 12  # the optimum for these costs
+        for block in blocks:
+            block_costs = [costs[i] for i in block]
+            assert block_costs == sorted(block_costs, reverse=True)
+
+    def test_more_blocks_than_files(self):
+        """Test empty blocks are not returned."""
+        assert pack_blocks([2.0, 1.0], 8) == [[0], [1]]
+        assert pack_blocks([], 8) == []
+
+
+class TestRecommendRepartitionFactor:
+    """Test the binary search for the smallest sufficient repartition factor."""
+
+    @staticmethod
+    def _target(costs, max_actors):
+        share = sum(costs) / max_actors
+        return max(share * configure.STRAGGLER_TAIL_FRACTION, max(costs))
+
+    def test_uniform_costs(self):
+        """Test uniform files need one block per tail fraction of the share."""
+        assert recommend_repartition_factor([1.0] * 2000, 4) == 20
+
+    def test_smallest_factor_within_target(self):
+        """Test the factor meets the tail target and one less does not."""
+        costs = [1.0 + (i * 37 % 101) / 10 for i in range(3000)]
+        factor = recommend_repartition_factor(costs, 6)
+        target = self._target(costs, 6)
+
+        assert configure._max_block_cost(costs, 6 * factor) <= target
+        assert configure._max_block_cost(costs, 6 * (factor - 1)) > target
+
+    def test_bounds(self):
+        """Test the search stays between the tail bound and one file per block."""
+        assert recommend_repartition_factor([], 4) == (
+            configure.DEFAULT_REPARTITION_FACTOR
+        )
+        assert recommend_repartition_factor([1.0] * 40, 4) == 10  # files / actors
+        # One huge file dominates the target; the tail bound is still applied
+        lower = math.ceil(1 / configure.STRAGGLER_TAIL_FRACTION)
+        assert recommend_repartition_factor([1000.0] + [1.0] * 999, 4) == lower
+
+
+class TestAutotune:
+    """Test the actor shape search."""
+
+    @staticmethod
+    def _config(samples):
+        return calculate(
+            PipelineConfig(
+                num_files=1000,
+                num_workers=4,
+                worker_cpus=32,
+                worker_memory_gb=128,
+                cpus_per_actor=4,
+                benchmark_samples=samples,
+            )
+        )
+
+    def test_repeated_run_keeps_estimate(self):
+        """Test ingesting an identical second run changes neither shape nor rate."""
+        once = autotune(self._config([(4, 2.0)]))
+        twice = autotune(self._config([(4, 2.0), (4, 2.0)]))
+
+        assert once.cpus_per_actor == twice.cpus_per_actor == 4
+        assert once.cluster_pages_per_s == twice.cluster_pages_per_s
+
+    def test_shape_searched_with_two_cpus_values(self):
+        """Test the shape is retuned once scaling has been measured."""
+        # Mostly serial work: more, smaller actors win
+        tuned = autotune(self._config([(1, 1.0), (4, 1.1)]))
+        assert tuned.cpus_per_actor < 4
+
+
+class TestConverterMemory:
+    """Test that actors are sized for every converter and pipeline they load."""
+
+    @staticmethod
+    def _config(**kwargs):
+        inputs = {"num_workers": 2, "worker_cpus": 18, "worker_memory_gb": 40}
+        return validate(calculate(PipelineConfig(**{**inputs, **kwargs})))
+
+    @pytest.mark.parametrize(
+        ("spares", "profile", "converters"),
+        [(0, "full", 1), (0, "auto", 2), (1, "full", 2), (1, "auto", 4)],
+    )
+    def test_spares_and_profiles_counted(self, spares, profile, converters):
+        """Test the need per actor scales with spares and profiles."""
+        cfg = self._config(num_spare_converters=spares, pipeline_profile=profile)
+
+        need = MIN_MEMORY_PER_PIPELINE_GB * converters
+        assert cfg.min_memory_per_actor_gb == need
+        # 36 GB usable per worker; 8 actors would fit by CPUs alone
+        assert cfg.actors_per_worker == min(8, 36 // need)
+        assert cfg.memory_per_actor_gb >= need
+        assert not cfg.errors
+
+    def test_no_actor_fits(self):
+        """Test a worker too small for one actor's converters is an error."""
+        cfg = self._config(
+            worker_memory_gb=16, num_spare_converters=1, pipeline_profile="auto"
+        )
+
+        assert cfg.max_actors == 0
+        assert any("16 GB per actor" in e for e in cfg.errors)
+
+    def test_worker_groups(self):
+        """Test heterogeneous groups use the same per-actor need."""
+        cfg = self._config(
+            worker_groups=[WorkerGroup("small", 2, 10, 20)],
+            num_spare_converters=1,
+            pipeline_profile="full",
+        )
+
+        assert cfg.worker_groups[0].actors_per_worker == 2  # 18 GB usable / 8 GB
+
+
+class TestWorkerGroupPatch:
+    """Test actor placement and the cluster patch for several worker groups."""
+
+    @staticmethod
+    def _config():
+        return validate(
+            calculate(
+                PipelineConfig(
+                    cpus_per_actor=4,
+                    pipeline_profile="full",
+                    worker_groups=[
+                        WorkerGroup("big", 3, 34, 128),
+                        WorkerGroup("lean", 2, 18, 12),  # memory-bound
+                        WorkerGroup("tiny", 1, 6, 3),  # fits no actor
+                    ],
+                )
+            )
+        )
+
+    def test_groups_placed_by_cpus_and_memory(self):
+        """Test each group hosts what both its CPUs and memory allow."""
+        cfg = self._config()
+
+        assert [g.actors_per_worker for g in cfg.worker_groups] == [8, 2, 0]
+        assert cfg.num_workers == 6
+        assert cfg.max_actors == 3 * 8 + 2 * 2
+        assert cfg.min_actors == max(5, cfg.max_actors // 3)
+        assert cfg.memory_per_actor_gb == pytest.approx(5.4)  # tightest group
+        assert not cfg.errors
+        assert any("'tiny'" in w and "sit idle" in w for w in cfg.warnings)
+
+    def test_patch_copies_and_resizes_groups(self):
+        """Test group 0 is copied per extra group and num-cpus set per group."""
+        patch = format_cluster_patch(self._config())
+        ops = json.loads(patch.split("-p '", 1)[1].rsplit("'", 1)[0])
+
+        copies = [op for op in ops if op["op"] == "copy"]
+        assert len(copies) == 2
+        assert all(op["from"] == "/spec/workerGroupSpecs/0" for op in copies)
+        values = {op["path"]: op["value"] for op in ops if "value" in op}
+        base = "/spec/workerGroupSpecs"
+        resources = "template/spec/containers/0/resources"
+        for index, (name, replicas, cpus, memory) in enumerate(
+            [("lean", 2, 18, "12G"), ("tiny", 1, 6, "3G")], start=1
+        ):
+            assert values[f"{base}/{index}/groupName"] == name
+            assert values[f"{base}/{index}/replicas"] == replicas
+            assert values[f"{base}/{index}/maxReplicas"] == replicas
+            assert values[f"{base}/{index}/{resources}/limits/cpu"] == cpus
+            assert values[f"{base}/{index}/{resources}/requests/memory"] == memory
+        num_cpus = [
+            values[f"{base}/{index}/rayStartParams/num-cpus"] for index in range(3)
+        ]
+        assert num_cpus == ["32", "8", "0"]  # only the placed actors' CPUs
+        assert f"{base}/0/groupName" not in values
+
+
+def _run_summary(run, cpus, actors, wall_clock=100.0, timeouts=0):
+    """A run summary as ray_data_process writes it."""
+    return {
+        "run": run,
+        "config": {"cpus_per_actor": cpus, "max_actors": 2, "cluster_memory_gb": 32},
+        "wall_clock_s": wall_clock,
+        "success": 10,
+        "timeouts": timeouts,
+        "pages": 200,
+        "actors": [
+            {
+                "actor": f"a{i}",
+                "busy_s": busy,
+                "converted_pages": pages,
+                "converted_s": seconds,
+                "max_file_s": 5.0,
+                "peak_rss_mb": 1024.0,
+            }
+            for i, (busy, pages, seconds) in enumerate(actors)
+        ],
+    }
+
+
+class TestRunSummaries:
+    """Test reading past run summaries back into the calculator."""
+
+    def test_summarize_run(self):
+        """Test throughput counts converted work only and bounds are flagged."""
+        run = summarize_run(
+            _run_summary("run-1", 4, [(90.0, 100, 40.0), (95.0, 60, 40.0)])
+        )
+
+        assert run["pages_per_s_per_actor"] == pytest.approx(160 / 80)
+        assert run["pages_per_file"] == 20
+        assert run["utilization"] == pytest.approx(185 / 200)
+        assert [b.split(":")[0] for b in run["bounds"]] == ["CPU-bound"]
+
+    def test_memory_and_straggler_bounds(self):
+        """Test a near-limit peak RSS and an unbalanced actor are flagged."""
+        summary = _run_summary(
+            "run-2",
+            4,
+            [(20.0, 10, 10.0), (20.0, 10, 10.0), (90.0, 10, 10.0)],
+            timeouts=3,
+        )
+        summary["actors"][2]["peak_rss_mb"] = 15 * 1024.0  # 16 GB per actor
+
+        bounds = summarize_run(summary)["bounds"]
+
+        assert bounds[0].startswith("memory-bound")
+        assert "3 timeouts may be OOM kills" in bounds[0]
+        assert bounds[1].startswith("straggler-bound: busiest actor")
+
+    def test_load_files_and_directories(self, tmp_path):
+        """Test directories are read in name order alongside single files."""
+        (tmp_path / "runs").mkdir()
+        for name in ("run-2", "run-1"):
+            summary = _run_summary(name, 2, [(1.0, 1, 1.0)])
+            (tmp_path / "runs" / f"{name}.json").write_text(json.dumps(summary))
+        (tmp_path / "runs" / "notes.txt").write_text("")
+        extra = tmp_path / "extra.json"
+        extra.write_text(json.dumps(_run_summary("run-0", 2, [])))
+
+        summaries = load_run_summaries([str(tmp_path / "runs"), str(extra)])
+
+        assert [s["run"] for s in summaries] == ["run-1", "run-2", "run-0"]
+
+    def test_ingested_runs_feed_benchmark_samples(self, tmp_path, monkeypatch, capsys):
+        """Test measured runs become throughput samples; idle runs do not."""
+        for name, cpus, actors in (
+            ("run-1", 2, [(50.0, 100, 50.0)]),
+            ("run-2", 8, [(50.0, 300, 50.0)]),
+            ("run-3", 4, [(10.0, 0, 0.0)]),  # all cache hits
+        ):
+            summary = _run_summary(name, cpus, actors)
+            (tmp_path / f"{name}.json").write_text(json.dumps(summary))
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["configure.py", "--json", "--ingest-runs", str(tmp_path)],
+        )
+
+        configure.main()
+
+        out = json.loads(capsys.readouterr().out)
+        assert out["benchmark"] == [
+            {"cpus_per_actor": 2, "pages_per_s": 2.0},
+            {"cpus_per_actor": 8, "pages_per_s": 6.0},
+        ]
+        assert [r["run"] for r in out["past_runs"]] == ["run-1", "run-2", "run-3"]
+        assert out["derived"]["fitted_parallel_s"] > 0
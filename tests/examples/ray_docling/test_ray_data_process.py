@@ -0,0 +1,465 @@
+"""Tests for the Ray Data Docling processing script's pure helpers."""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the Docling example and the mocks to path
+repo_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(repo_root / "examples" / "ray" / "data" / "docling"))
+sys.path.insert(0, str(Path(__file__).parent / "mocks"))
+
+import ray_mock  # noqa: E402
+
+ray_mock.install()
+
+import ray_data_process as rdp  # noqa: E402
+
+requires_mock_ray = pytest.mark.skipif(
+    not isinstance(rdp._stitch_payloads, ray_mock.MockRemoteFunction),
+    reason="remote functions only run in-process with the Ray mock",
+)
+
+
+def _result_row(filename, page_range, markdown, **overrides):
+    row = {
+        **rdp._RESULT_DEFAULTS,
+        "path": f"/in/{filename}",
+        "filename": filename,
+        "page_range": page_range,
+        "status": "success",
+        "content_hash": "h",
+        "file_size_bytes": 100,
+        "mtime_ns": 1,
+        "source_pages": 4,
+        "docling_duration_s": 1.0,
+        "markdown": markdown,
+        "doc_json": "",
+    }
+    row.pop("file_size")
+    return {**row, **overrides}
+
+
+class TestStitchPayloads:
+    """Test stitching page-range payload rows into one document row."""
+
+    def test_rows_joined_in_page_order(self):
+        """Test Markdown is joined by page order and totals add up."""
+        rows = pd.DataFrame([
+            _result_row("a.pdf", "3-4", "second", page_count=2, content_hash=""),
+            _result_row("a.pdf", "1-2", "first", page_count=2),
+        ])
+
+        whole = rdp._stitch_rows(rows)
+
+        assert len(whole) == 1
+        row = whole.iloc[0]
+        assert row["page_range"] == ""
+        assert row["markdown"] == "first\n\nsecond"
+        assert row["page_count"] == 4
+        assert row["docling_duration_s"] == 2.0
+        assert row["content_hash"] == "h"
+        assert list(whole.columns) == list(rows.columns)
+
+    @requires_mock_ray
+    def test_stitched_row_recorded_by_manifest(self, tmp_path, monkeypatch):
+        """Test a parquet-mode sharded document is stitched and recorded."""
+        monkeypatch.setattr(rdp, "RETURN_PAYLOADS", True)
+        run_dir = tmp_path / "parquet" / "run-1"
+        run_dir.mkdir(parents=True)
+        pdf = tmp_path / "a.pdf"
+        pdf.write_bytes(b"x" * 100)
+        rows = pd.DataFrame([
+            _result_row("a.pdf", "1-2", "first", path=str(pdf), page_count=2),
+            _result_row("a.pdf", "3-4", "second", path=str(pdf), page_count=2),
+        ])
+        rows["mtime_ns"] = pdf.stat().st_mtime_ns
+        rows.to_parquet(run_dir / "0.parquet")
+
+        shards = rdp._collect_shards(rdp._shard_rows(rows))
+        assert rdp._stitch_sharded_documents(shards, run_dir) == []
+
+        stitched = pd.read_parquet(rdp._stitched_part(run_dir, "a.pdf"))
+        assert stitched["markdown"].tolist() == ["first\n\nsecond"]
+        manifest = rdp._Manifest(tmp_path)
+        manifest.ingest(tmp_path / "parquet")
+        assert manifest.pending([str(pdf)]) == []
+        rdp._stitched_part(run_dir, "a.pdf").unlink()
+        assert manifest.pending([str(pdf)]) == [str(pdf)]
+        manifest.close()
+
+    def test_incomplete_document_not_stitched(self, tmp_path):
+        """Test a document with a missing page range is reported, not stitched."""
+        rows = pd.DataFrame([_result_row("a.pdf", "1-2", "first")])
+
+        shards = rdp._collect_shards(rdp._shard_rows(rows))
+        failed = rdp._stitch_sharded_documents(shards, tmp_path)
+
+        assert [fname for fname, _ in failed] == ["a.pdf"]
+        assert not list(tmp_path.iterdir())
+
+
+class TestAdaptiveDeadline:
+    """Test per-file deadlines from pages and observed seconds per page."""
+
+    @pytest.fixture(autouse=True)
+    def _settings(self, monkeypatch):
+        monkeypatch.setattr(rdp, "ADAPTIVE_TIMEOUT", True)
+        monkeypatch.setattr(rdp, "FILE_TIMEOUT", 600)
+        monkeypatch.setattr(rdp, "TIMEOUT_FLOOR", 60)
+        monkeypatch.setattr(rdp, "TIMEOUT_SLACK", 4.0)
+        monkeypatch.setattr(rdp, "PIPELINE_PROFILE", "auto")
+
+    def test_floor_and_slack(self):
+        """Test deadlines are slack times the prediction, within the bounds."""
+        deadline = rdp._AdaptiveDeadline()
+        rate = deadline.seconds_per_page("full")
+
+        assert deadline.deadline(1) == 60  # floor
+        assert deadline.deadline(50) == pytest.approx(
+            4 * (rdp.EST_SECONDS_PER_FILE + 50 * rate)
+        )
+        assert deadline.deadline(10_000) == 600  # FILE_TIMEOUT
+
+    def test_cold_converter_and_unknown_pages(self):
+        """Test a converter's first file and an unknown page count get FILE_TIMEOUT."""
+        deadline = rdp._AdaptiveDeadline()
+
+        assert deadline.deadline(1, warm=False) == 600
+        assert deadline.deadline(None) == 600
+
+    def test_rates_per_profile(self, monkeypatch):
+        """Test fast conversions do not shrink the deadline of auto routing."""
+        deadline = rdp._AdaptiveDeadline()
+        before = deadline.deadline(50)
+        for _ in range(100):
+            deadline.observe(1.0, 100, "fast")
+
+        assert deadline.seconds_per_page("fast") < 0.1
+        assert deadline.deadline(50) == before  # full is still the slower rate
+        monkeypatch.setattr(rdp, "PIPELINE_PROFILE", "fast")
+        assert deadline.deadline(50) == 60
+
+    def test_expected_pages_from_header(self, tmp_path):
+        """Test the page count is read from the PDF, not guessed from its size."""
+        pdfium = pytest.importorskip("pypdfium2")
+        pdf = pdfium.PdfDocument.new()
+        for _ in range(30):
+            pdf.new_page(612, 792)
+        path = tmp_path / "small.pdf"
+        pdf.save(str(path))
+        pdf.close()
+
+        assert rdp._expected_pages(str(path), None, 0) == 30
+        assert rdp._expected_pages(str(path), (11, 20), 30) == 10
+        (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+        assert rdp._expected_pages(str(tmp_path / "broken.pdf"), None, 0) is None
+
+
+class TestListing:
+    """Test the ordered, limited listing of input PDFs."""
+
+    @pytest.fixture
+    def tree(self, tmp_path):
+        for directory in ("b", "a/y", "a/x", "c"):
+            (tmp_path / directory).mkdir(parents=True, exist_ok=True)
+        names = ("z.pdf", "a/x/2.pdf", "a/x/1.pdf", "a/y/3.pdf", "a/w.pdf", "b/4.pdf")
+        for name in (*names, "c/5.pdf"):
+            (tmp_path / name).write_bytes(b"%PDF")
+        (tmp_path / "c" / ".hidden.pdf").write_bytes(b"%PDF")
+        (tmp_path / "c" / "notes.txt").write_text("")
+        return tmp_path
+
+    def _paths(self, root, sources, limit, block_size=2):
+        blocks = list(rdp._list_pdfs(sources, block_size, limit))
+        return [str(Path(p).relative_to(root)) for b in blocks for p in b["path"]]
+
+    def test_sorted_order_across_sources(self, tree, monkeypatch):
+        """Test split directories are yielded in the order of one sorted walk."""
+        monkeypatch.setattr(rdp, "RESUME", False)
+        monkeypatch.setattr(rdp, "LISTING_THREADS", 2)
+        sources = rdp._listing_sources(str(tree), min_sources=4)
+
+        assert len(sources) > 1
+        expected = [
+            str(Path(p).relative_to(tree)) for p in rdp._walk_pdfs(str(tree), True)
+        ]
+        assert (
+            self._paths(tree, sources, 0)
+            == expected
+            == [
+                "z.pdf",
+                "a/w.pdf",
+                "a/x/1.pdf",
+                "a/x/2.pdf",
+                "a/y/3.pdf",
+                "b/4.pdf",
+                "c/5.pdf",
+            ]
+        )
+
+    def test_limit_takes_first_paths(self, tree, monkeypatch):
+        """Test the limit selects the same first files on every run."""
+        monkeypatch.setattr(rdp, "RESUME", False)
+        sources = rdp._listing_sources(str(tree), min_sources=4)
+
+        for _ in range(3):
+            assert self._paths(tree, sources, 3) == ["z.pdf", "a/w.pdf", "a/x/1.pdf"]
+
+    def test_listing_file(self, tmp_path, monkeypatch):
+        """Test a listing file is read in order, skipping blanks and comments."""
+        monkeypatch.setattr(rdp, "RESUME", False)
+        listing = tmp_path / "files.txt"
+        listing.write_text("# inputs\nb.pdf\n\n/abs/a.pdf\nc.pdf\n")
+        batch = pd.DataFrame({"listing": [str(listing)]})
+
+        blocks = list(rdp._read_listing(batch, "/in", 2, 2))
+
+        paths = [p for b in blocks for p in b["path"]]
+        assert paths == ["/in/b.pdf", "/abs/a.pdf"]
+
+
+class TestManifest:
+    """Test which recorded inputs still need converting."""
+
+    @pytest.fixture
+    def manifest(self, tmp_path):
+        (tmp_path / "out" / "markdown").mkdir(parents=True)
+        manifest = rdp._Manifest(tmp_path / "out")
+        yield manifest
+        manifest.close()
+
+    @staticmethod
+    def _record(manifest, pdf, status="success", **overrides):
+        st = pdf.stat()
+        row = {
+            "content_hash": rdp._content_hash(pdf.read_bytes()),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            **overrides,
+        }
+        output = f"markdown/{pdf.stem}.md"
+        (manifest.output_base / output).write_text("# done")
+        manifest.record([
+            (
+                str(pdf),
+                row["content_hash"],
+                row["size"],
+                row["mtime_ns"],
+                [output],
+                status,
+            )
+        ])
+
+    def test_unchanged_size_and_mtime_skipped(self, tmp_path, manifest):
+        """Test a matching size and mtime is done without re-hashing."""
+        pdf = tmp_path / "a.pdf"
+        pdf.write_bytes(b"%PDF a")
+        self._record(manifest, pdf, content_hash="stale")
+
+        assert manifest.pending([str(pdf)]) == []
+
+    def test_touched_file_rehashed(self, tmp_path, manifest):
+        """Test a changed mtime falls back to the content hash."""
+        same, edited = tmp_path / "same.pdf", tmp_path / "edited.pdf"
+        for pdf in (same, edited):
+            pdf.write_bytes(b"%PDF 1")
+            self._record(manifest, pdf, mtime_ns=1)
+        edited.write_bytes(b"%PDF 2")
+
+        assert manifest.pending([str(same), str(edited)]) == [str(edited)]
+
+    def test_missing_outputs_and_failures_pending(self, tmp_path, manifest):
+        """Test deleted outputs, failed entries and unknown paths are pending."""
+        paths = []
+        for name in ("deleted", "failed", "done"):
+            pdf = tmp_path / f"{name}.pdf"
+            pdf.write_bytes(b"%PDF")
+            self._record(
+                manifest, pdf, status="error" if name == "failed" else "success"
+            )
+            paths.append(str(pdf))
+        (manifest.output_base / "markdown" / "deleted.md").unlink()
+        paths.append(str(tmp_path / "new.pdf"))
+
+        assert manifest.pending(paths) == [paths[0], paths[1], paths[3]]
+
+
+class TestOutputCacheEvict:
+    """Test least-recently-used eviction of the shared output cache."""
+
+    @staticmethod
+    def _entry(cache, key, mtime, meta=True):
+        sub = cache.root / key[:2]
+        sub.mkdir(exist_ok=True)
+        files = [sub / f"{key}.md"]
+        files[0].write_bytes(b"x" * 900)
+        if meta:
+            files.append(sub / f"{key}.meta")
+            files[1].write_bytes(b"{}".ljust(100))
+        for f in files:
+            os.utime(f, (mtime, mtime))
+        return files
+
+    def test_oldest_entries_evicted_to_target(self, tmp_path):
+        """Test entries go oldest first until the cache is under the target."""
+        cache = rdp._OutputCache(tmp_path / "cache", max_gb=1, options=())
+        cache.max_bytes = 2500
+        old = self._entry(cache, "aa01", 100)
+        used = self._entry(cache, "aa02", 200)
+        storing = self._entry(cache, "bb03", 50, meta=False)
+        os.utime(storing[0], (300, 300))  # no meta yet: age is its newest file
+
+        cache.evict()
+
+        assert not any(f.exists() for f in old)
+        assert all(f.exists() for f in used + storing)
+
+    def test_other_writers_temp_files_spared(self, tmp_path):
+        """Test in-flight temp files are neither counted nor deleted."""
+        cache = rdp._OutputCache(tmp_path / "cache", max_gb=1, options=())
+        cache.max_bytes = 2500
+        entries = [self._entry(cache, f"aa0{i}", 100 + i) for i in range(2)]
+        tmp = cache.root / "aa" / "aa09.md.tmp"
+        tmp.write_bytes(b"x" * 10_000)
+        os.utime(tmp, (1, 1))
+
+        cache.evict()
+
+        assert tmp.exists()
+        assert all(f.exists() for files in entries for f in files)
+
+
+class TestStagePercentiles:
+    """Test stage timing percentiles merged from per-block histograms."""
+
+    @staticmethod
+    def _batch(values, **columns):
+        batch = pd.DataFrame({stage: 0.01 for stage in rdp.STAGE_COLUMNS}, index=[0])
+        batch = batch.loc[[0] * len(values)].reset_index(drop=True)
+        batch["convert_s"] = values
+        batch["status"] = columns.get("status", "success")
+        batch["cache_hit"] = columns.get("cache_hit", False)
+        return batch
+
+    def test_merged_blocks_match_one_pass(self):
+        """Test percentiles of merged block histograms are those of all files."""
+        values = np.arange(1, 101) / 10
+        blocks = [self._batch(values[:30]), self._batch(values[30:])]
+
+        merged = rdp._stage_percentiles(
+            pd.concat([rdp._stage_histogram(b) for b in blocks])
+        )
+
+        one_pass = rdp._stage_percentiles(rdp._stage_histogram(self._batch(values)))
+        assert merged.keys() == one_pass.keys()
+        for stage, stats in one_pass.items():
+            assert merged[stage] == pytest.approx(stats)
+        convert = merged["convert_s"]
+        assert convert["total_s"] == pytest.approx(values.sum())
+        for key, exact in (("p50", 5.0), ("p90", 9.0), ("p99", 9.9)):
+            assert exact <= convert[key] < exact * 1.13  # upper bucket edge
+        assert merged["read_s"]["p99"] == pytest.approx(0.01, rel=0.13)
+
+    def test_cache_hits_and_failures_left_out(self):
+        """Test only converted files are bucketed."""
+        batch = pd.concat([
+            self._batch([1.0]),
+            self._batch([100.0], cache_hit=True),
+            self._batch([100.0], status="error"),
+        ])
+
+        report = rdp._stage_percentiles(rdp._stage_histogram(batch))
+
+        assert report["convert_s"]["total_s"] == 1.0
+        assert report["convert_s"]["p99"] < 1.13
+
+
+class TestActorMetrics:
+    """Test the per-actor metrics exported through Ray's metrics API."""
+
+    @pytest.fixture
+    def metrics(self, monkeypatch):
+        module = ray_mock.metrics_module()
+        monkeypatch.setitem(sys.modules, "ray.util.metrics", module)
+        actor_metrics = rdp._ActorMetrics("actor-1")
+        return actor_metrics, {metric.name: metric for metric in module.created}
+
+    def test_names_kinds_and_tags(self, metrics):
+        """Test every metric is created once, tagged with its actor."""
+        _, created = metrics
+        kinds = {name: type(metric).__name__ for name, metric in created.items()}
+
+        assert kinds == {
+            "docling_files": "Counter",
+            "docling_pages": "Counter",
+            "docling_converter_restarts": "Counter",
+            "docling_files_in_flight": "Gauge",
+            "docling_queue_wait_seconds": "Histogram",
+            "docling_convert_seconds": "Histogram",
+            "docling_write_seconds": "Histogram",
+        }
+        assert created["docling_files"].tag_keys == ("actor", "status")
+        for name, metric in created.items():
+            assert metric.default_tags == {"actor": "actor-1"}
+            if kinds[name] == "Histogram":
+                assert metric.options["boundaries"] == (
+                    rdp._ActorMetrics.SECONDS_BOUNDARIES
+                )
+
+    def test_record_file(self, metrics):
+        """Test converted files record pages and times; cache hits only count."""
+        actor_metrics, created = metrics
+        converted = {
+            "status": "success",
+            "page_count": 12,
+            "cache_hit": False,
+            "convert_s": 3.0,
+            "write_s": 0.5,
+        }
+        actor_metrics.record_file(converted, queue_wait=0.2)
+        actor_metrics.record_file({**converted, "cache_hit": True}, queue_wait=0.1)
+        actor_metrics.record_file(
+            {**converted, "status": "timeout", "page_count": 0}, queue_wait=0.3
+        )
+        actor_metrics.in_flight.set(2)
+
+        def records(name):
+            return [
+                (value, tags.get("status")) for value, tags in created[name].records
+            ]
+
+        assert records("docling_files") == [
+            (1.0, "success"),
+            (1.0, "success"),
+            (1.0, "timeout"),
+        ]
+        assert records("docling_pages") == [(12, None), (12, None)]
+        assert records("docling_queue_wait_seconds") == [
+            (0.2, None),
+            (0.1, None),
+            (0.3, None),
+        ]
+        assert records("docling_convert_seconds") == [(3.0, None)]
+        assert records("docling_write_seconds") == [(0.5, None)]
+        assert records("docling_files_in_flight") == [(2, None)]
+
+
+class TestPayloads:
+    """Test handing converter outputs to the parent in shared memory."""
+
+    def test_round_trip_frees_segment(self):
+        """Test parts are decoded in order and the segment is unlinked."""
+        name = rdp._payload_name(os.getpid(), 1)
+        markdown, doc_json = "# Tïtle\n\n" * 1000, '{"pages": []}'
+
+        sizes = rdp._put_payload(name, markdown.encode(), doc_json.encode(), b"")
+
+        assert rdp._take_payload(name, sizes) == [markdown, doc_json, ""]
+        with pytest.raises(FileNotFoundError):
+            rdp._take_payload(name, sizes)
+        rdp._discard_payload(name)  # already freed: a no-op